@@ -1,9 +1,12 @@
-from typing import Generator, Optional
+from typing import Generator, Optional, Union
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..core.security import verify_token
-from ..db.database import get_db
+from ..core.security import decode_token, token_revocations, verify_token
+from ..core.user_cache import UserSnapshot, user_cache
+from ..db.database import get_db, get_async_db
 from ..models.user import User
 
 security = HTTPBearer()
@@ -12,7 +15,7 @@ security = HTTPBearer()
 def get_current_user(
     db: Session = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> User:
+) -> UserSnapshot:
     """
     Get current authenticated user from JWT token
     """
@@ -26,6 +29,14 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    return _load_user(int(user_id), db)
+
+
+def _load_user(user_id: int, db: Session) -> UserSnapshot:
+    snapshot, generation = user_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+    
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
         raise HTTPException(
@@ -34,10 +45,47 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    return user
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.put(snapshot, generation)
+    return snapshot
+
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> UserSnapshot:
+    """
+    Get current authenticated user from JWT token without using a threadpool slot
+    """
+    token = credentials.credentials
+    user_id = verify_token(token)
+    
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    snapshot, generation = user_cache.get(int(user_id))
+    if snapshot is not None:
+        return snapshot
+    
+    result = await db.execute(select(User).where(User.id == int(user_id)))
+    user = result.scalars().first()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.put(snapshot, generation)
+    return snapshot
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(current_user: UserSnapshot = Depends(get_current_user)) -> UserSnapshot:
     """
     Get current active user (not suspended or inactive)
     """
@@ -49,7 +97,80 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
     return current_user
 
 
-def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
+async def get_current_active_user_async(
+    current_user: UserSnapshot = Depends(get_current_user_async)
+) -> UserSnapshot:
+    """
+    Get current active user (not suspended or inactive) on the async session path
+    """
+    if current_user.status != "active":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail="Inactive user"
+        )
+    return current_user
+
+
+class TokenPrincipal:
+    """
+    Caller identity taken from access token claims, without a users lookup
+    """
+    __slots__ = ("id", "role", "status", "token_version")
+
+    def __init__(self, id: int, role: str, status: str, token_version: int):
+        self.id = id
+        self.role = role
+        self.status = status
+        self.token_version = token_version
+
+
+# What the principal dependencies return: claims for current tokens, the cached
+# user for tokens issued without them. Only id, role and status are common.
+Principal = Union[TokenPrincipal, UserSnapshot]
+
+
+def get_current_principal(
+    db: Session = Depends(get_db),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> Principal:
+    """
+    Authorize from the token's role/status claims; tokens issued without them fall back to the user lookup
+    """
+    payload = decode_token(credentials.credentials)
+    if payload is None or payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user_id = int(payload["sub"])
+    if "ver" not in payload or "role" not in payload or "status" not in payload:
+        return _load_user(user_id, db)
+    
+    if token_revocations.is_revoked(user_id, payload["ver"], payload.get("iat")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return TokenPrincipal(user_id, payload["role"], payload["status"], payload["ver"])
+
+
+def get_current_active_principal(current_user: Principal = Depends(get_current_principal)) -> Principal:
+    """
+    Get current active caller (not suspended or inactive) from token claims
+    """
+    if current_user.status != "active":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail="Inactive user"
+        )
+    return current_user
+
+
+def get_current_admin_user(current_user: Principal = Depends(get_current_active_principal)) -> Principal:
     """
     Get current admin user
     """
@@ -61,7 +182,7 @@ def get_current_admin_user(current_user: User = Depends(get_current_active_user)
     return current_user
 
 
-def get_current_mentor_user(current_user: User = Depends(get_current_active_user)) -> User:
+def get_current_mentor_user(current_user: Principal = Depends(get_current_active_principal)) -> Principal:
     """
     Get current mentor user
     """
@@ -70,4 +191,4 @@ def get_current_mentor_user(current_user: User = Depends(get_current_active_user
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions - mentor access required"
         )
-    return current_user
\ No newline at end of file
+    return current_user
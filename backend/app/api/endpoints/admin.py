@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from ...db import slow_queries
+from ...models.user import User
+from ...api.deps import get_current_admin_user
+
+router = APIRouter()
+
+
+def _get_recorder():
+    if slow_queries.slow_query_recorder is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Slow query log is disabled (set SLOW_QUERY_LOG_ENABLED)"
+        )
+    return slow_queries.slow_query_recorder
+
+
+@router.get("/slow-queries")
+def get_slow_queries(
+    limit: int = Query(50, ge=1, le=1000),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Most recent slow SQL statements with redacted parameters and query plans (admin only)
+    """
+    recorder = _get_recorder()
+    return {
+        "threshold_ms": recorder.threshold_seconds * 1000,
+        "entries": recorder.recent(limit)
+    }
+
+
+@router.delete("/slow-queries")
+def clear_slow_queries(current_user: User = Depends(get_current_admin_user)):
+    """
+    Clear the in-memory slow query buffer (admin only)
+    """
+    _get_recorder().clear()
+    return {"message": "Slow query buffer cleared"}
@@ -1,37 +1,40 @@
-from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ...core.config import settings
-from ...core.security import create_access_token, verify_password, get_password_hash
-from ...db.database import get_db
+from ...core.rate_limit import client_ip, login_throttle
+from ...core.security import create_access_token, password_hasher
+from ...db.database import get_async_db
+from ...db.write_behind import last_login_buffer
 from ...models.user import User
 from ...schemas.user import UserCreate, UserResponse, UserLogin, Token
-from ...api.deps import get_current_active_user
+from ...api.deps import get_current_active_user, get_current_active_user_async
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=Token)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Register a new user
     """
     # Check if user already exists
-    if db.query(User).filter(User.email == user_data.email).first():
+    if (await db.execute(select(User.id).where(User.email == user_data.email))).first():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    if db.query(User).filter(User.username == user_data.username).first():
+    if (await db.execute(select(User.id).where(User.username == user_data.username))).first():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -41,13 +44,14 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        subject=str(db_user.id), expires_delta=access_token_expires
+        subject=str(db_user.id), expires_delta=access_token_expires,
+        role=db_user.role, status=db_user.status, token_version=db_user.token_version
     )
     
     return {
@@ -57,14 +61,35 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     }
 
 
+async def check_login_throttle(request: Request, email: str) -> None:
+    """
+    Reject throttled attempts before any password work
+    """
+    retry_after = await login_throttle.check(email, client_ip(request))
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
 @router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(
+    user_credentials: UserLogin,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Login user with email and password
     """
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+    await check_login_throttle(request, user_credentials.email)
     
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    user = (await db.execute(select(User).where(User.email == user_credentials.email))).scalars().first()
+    
+    if not user or not await password_hasher.verify(
+        user_credentials.password, user.hashed_password, reserve=settings.PASSWORD_HASH_LOGIN_RESERVE
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -80,32 +105,39 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        subject=str(user.id), expires_delta=access_token_expires
+        subject=str(user.id), expires_delta=access_token_expires,
+        role=user.role, status=user.status, token_version=user.token_version
     )
     
-    # Update last login
-    from datetime import datetime
-    user.last_login = datetime.utcnow()
-    db.commit()
+    # Update last login (written behind in batches; the login stays read-only)
+    user_response = UserResponse.from_orm(user)
+    user_response.last_login = datetime.utcnow()
+    last_login_buffer.record(user.id, user_response.last_login)
+    await login_throttle.reset_email(user.email)
     
     return {
         "access_token": access_token,
         "token_type": "bearer",
-        "user": UserResponse.from_orm(user)
+        "user": user_response
     }
 
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     OAuth2 compatible token login, get access token for future requests
     """
-    user = db.query(User).filter(User.email == form_data.username).first()
+    await check_login_throttle(request, form_data.username)
+    
+    user = (await db.execute(select(User).where(User.email == form_data.username))).scalars().first()
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await password_hasher.verify(
+        form_data.password, user.hashed_password, reserve=settings.PASSWORD_HASH_LOGIN_RESERVE
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -120,23 +152,25 @@ def login_for_access_token(
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        subject=str(user.id), expires_delta=access_token_expires
+        subject=str(user.id), expires_delta=access_token_expires,
+        role=user.role, status=user.status, token_version=user.token_version
     )
     
-    # Update last login
-    from datetime import datetime
-    user.last_login = datetime.utcnow()
-    db.commit()
+    # Update last login (written behind in batches; the login stays read-only)
+    user_response = UserResponse.from_orm(user)
+    user_response.last_login = datetime.utcnow()
+    last_login_buffer.record(user.id, user_response.last_login)
+    await login_throttle.reset_email(user.email)
     
     return {
         "access_token": access_token,
         "token_type": "bearer", 
-        "user": UserResponse.from_orm(user)
+        "user": user_response
     }
 
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_active_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_active_user_async)):
     """
     Get current user information
     """
@@ -150,7 +184,8 @@ def refresh_token(current_user: User = Depends(get_current_active_user)):
     """
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        subject=str(current_user.id), expires_delta=access_token_expires
+        subject=str(current_user.id), expires_delta=access_token_expires,
+        role=current_user.role, status=current_user.status, token_version=current_user.token_version
     )
     
     return {
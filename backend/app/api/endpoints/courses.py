@@ -1,61 +1,140 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
-from ...db.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy import and_, select
+from sqlalchemy.exc import IntegrityError
+from ...core.encoding import dumps, join_array
+from ...core.http_cache import etag_matches, make_etag, not_modified, validator_headers
+from ...core.pagination import NEXT_CURSOR_HEADER, InvalidCursor, decode_cursor, next_page
+from ...db.database import get_db, get_async_db
 from ...models.user import User
-from ...models.course import Course, CourseEnrollment, CourseProgress
+from ...models.course import Course, CourseEnrollment, CourseProgress, CourseTag
 from ...schemas.course import (
-    CourseCreate, CourseResponse, CourseUpdate, 
+    CourseCreate, CourseResponse, CourseSearchResult, CourseUpdate, 
     CourseEnrollmentCreate, CourseEnrollmentResponse,
-    CourseProgressUpdate
+    CourseProgressBatch, CourseProgressUpdate
 )
-from ...api.deps import get_current_active_user, get_current_admin_user
+from ...services.catalog import course_catalog
+from ...services.progress import apply_progress_delta, completion_delta, ingest_progress_events
+from ...services.search import search_courses
+from ...api.deps import get_current_active_user, get_current_active_user_async, get_current_admin_user
+from datetime import datetime
 import json
 
 router = APIRouter()
 
 
+def split_tags(tags: List[str]) -> List[str]:
+    return [tag for value in tags for tag in value.split(",")]
+
+
 @router.get("/", response_model=List[CourseResponse])
-def get_courses(
+async def get_courses(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    search: Optional[str] = Query(None, description="Search in title and description"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; replaces skip"),
+    search: Optional[str] = Query(None, description="Case-insensitive substring of the title, description or instructor name; /search ranks results"),
     level: Optional[str] = Query(None, description="Filter by course level"),
     featured: Optional[bool] = Query(None, description="Filter featured courses"),
-    db: Session = Depends(get_db)
+    tags: List[str] = Query([], description="Filter by tag (repeatable or comma-separated)"),
+    tags_mode: str = Query("any", pattern="^(any|all)$", description="Match any or all of the tags")
 ):
     """
     Get all published courses with optional filtering
     """
-    query = db.query(Course).filter(Course.status == "published")
-    
-    if search:
-        query = query.filter(
-            or_(
-                Course.title.ilike(f"%{search}%"),
-                Course.description.ilike(f"%{search}%"),
-                Course.instructor_name.ilike(f"%{search}%")
+    catalog = await course_catalog.get()
+    # The listing is a function of the catalog content and the URL
+    headers = validator_headers(make_etag(f"catalog-{catalog.version}"))
+    headers["X-Catalog-Version"] = str(catalog.version)
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    
+    courses = catalog.query(
+        search=search, level=level, featured=featured, tags=split_tags(tags), tags_mode=tags_mode
+    )
+    if cursor:
+        try:
+            courses = catalog.after(courses, decode_cursor(cursor, "courses", (datetime, int)))
+        except InvalidCursor as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
             )
-        )
-    
-    if level:
-        query = query.filter(Course.level == level)
-    
-    if featured is not None:
-        query = query.filter(Course.is_featured == featured)
+    else:
+        courses = courses[max(skip, 0):]
     
-    courses = query.order_by(Course.created_at.desc()).offset(skip).limit(limit).all()
+    page, next_cursor = next_page(courses, limit, "courses", lambda course: course.sort_key)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    return Response(content=join_array(course.body for course in page), media_type="application/json", headers=headers)
+
+
+@router.get("/facets")
+async def get_course_facets(
+    request: Request,
+    search: Optional[str] = Query(None, description="Case-insensitive substring of the title, description or instructor name"),
+    level: Optional[str] = Query(None, description="Filter by course level"),
+    featured: Optional[bool] = Query(None, description="Filter featured courses"),
+    tags: List[str] = Query([], description="Filter by tag (repeatable or comma-separated)"),
+    tags_mode: str = Query("any", pattern="^(any|all)$", description="Match any or all of the tags")
+):
+    """
+    Published course counts per level, tag and price band for the given filters
+    """
+    catalog = await course_catalog.get()
+    headers = validator_headers(make_etag(f"catalog-{catalog.version}"))
+    headers["X-Catalog-Version"] = str(catalog.version)
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    
+    tags = split_tags(tags)
+    if search or level or featured is not None or tags:
+        facets = catalog.facets(catalog.query(
+            search=search, level=level, featured=featured, tags=tags, tags_mode=tags_mode
+        ))
+    else:
+        facets = catalog.facets()
+    return Response(content=dumps(facets), media_type="application/json", headers=headers)
+
+
+@router.get("/search", response_model=List[CourseSearchResult])
+async def search_course_catalog(
+    q: str = Query("", max_length=200, description="Search words; partial words match as prefixes"),
+    tag: List[str] = Query([], description="Only courses with this tag (repeatable)"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Full-text search of published courses, best matches first
+    """
+    if not q.strip() and not any(t.strip() for t in tag):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide a search query or at least one tag"
+        )
     
-    return [CourseResponse.from_orm(course) for course in courses]
+    return await search_courses(db, q, tag, skip=skip, limit=limit)
 
 
 @router.get("/{course_id}", response_model=CourseResponse)
-def get_course(course_id: int, db: Session = Depends(get_db)):
+async def get_course(course_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Get course by ID
     """
-    course = db.query(Course).filter(Course.id == course_id).first()
+    # Published courses come from the catalog snapshot without touching the DB
+    catalog = await course_catalog.get()
+    entry = catalog.by_id.get(course_id)
+    if entry is not None:
+        headers = validator_headers(make_etag(entry.digest))
+        if etag_matches(request, headers["ETag"]):
+            return not_modified(headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+    
+    result = await db.execute(select(Course).where(Course.id == course_id))
+    course = result.scalars().first()
     if not course:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -64,7 +143,18 @@ def get_course(course_id: int, db: Session = Depends(get_db)):
     
     # Only show published courses to non-admin users
     # For now, we'll show all courses - add user role check later if needed
-    return CourseResponse.from_orm(course)
+    changed = course.updated_at or course.created_at
+    headers = validator_headers(
+        make_etag(f"course-{course.id}-{changed.timestamp() if changed else 0}"),
+        cache_control="private, no-cache",  # unpublished: never shared by the CDN
+    )
+    if etag_matches(request, headers["ETag"]):
+        return not_modified(headers)
+    return Response(
+        content=dumps(CourseResponse.from_orm(course).model_dump(mode="json")),
+        media_type="application/json",
+        headers=headers,
+    )
 
 
 @router.post("/", response_model=CourseResponse)
@@ -93,11 +183,14 @@ def create_course(
         course_dict['tags'] = json.dumps(course_dict['tags'])
     
     course = Course(**course_dict)
+    course.tag_index = [CourseTag(tag=tag) for tag in CourseTag.normalize(course_data.tags)]
     db.add(course)
     db.commit()
     db.refresh(course)
+    response = CourseResponse.from_orm(course)
+    course_catalog.rebuild(db)
     
-    return CourseResponse.from_orm(course)
+    return response
 
 
 @router.put("/{course_id}", response_model=CourseResponse)
@@ -130,11 +223,16 @@ def update_course(
     
     for field, value in update_data.items():
         setattr(course, field, value)
+    if 'tags' in update_data:
+        existing = {row.tag: row for row in course.tag_index}
+        course.tag_index = [existing.get(tag) or CourseTag(tag=tag) for tag in CourseTag.normalize(course_update.tags)]
     
     db.commit()
     db.refresh(course)
+    response = CourseResponse.from_orm(course)
+    course_catalog.rebuild(db)
     
-    return CourseResponse.from_orm(course)
+    return response
 
 
 @router.delete("/{course_id}")
@@ -163,6 +261,7 @@ def delete_course(
     
     db.delete(course)
     db.commit()
+    course_catalog.rebuild(db)
     
     return {"message": "Course deleted successfully"}
 
@@ -221,20 +320,49 @@ def enroll_in_course(
 
 
 @router.get("/enrollments/my", response_model=List[CourseEnrollmentResponse])
-def get_my_enrollments(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+async def get_my_enrollments(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user_async)
 ):
     """
     Get current user's course enrollments
     """
-    enrollments = db.query(CourseEnrollment).filter(
-        CourseEnrollment.user_id == current_user.id
-    ).join(Course).all()
+    # Lazy loading is unavailable on AsyncSession, so load the course in the same join
+    result = await db.execute(
+        select(CourseEnrollment)
+        .join(CourseEnrollment.course)
+        .options(contains_eager(CourseEnrollment.course))
+        .where(CourseEnrollment.user_id == current_user.id)
+    )
+    enrollments = result.scalars().all()
     
     return [CourseEnrollmentResponse.from_orm(enrollment) for enrollment in enrollments]
 
 
+@router.post("/enrollments/progress/batch")
+def ingest_course_progress(
+    batch: CourseProgressBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Apply many lesson progress events, across the current user's enrollments, in one transaction
+    """
+    for attempt in range(2):
+        try:
+            report = ingest_progress_events(db, current_user.id, batch.events)
+            db.commit()
+            return report
+        except IntegrityError:
+            # A concurrent request created one of the lessons first; retry against it
+            db.rollback()
+            if attempt:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Progress changed concurrently, please retry"
+                )
+
+
 @router.put("/enrollments/{enrollment_id}/progress")
 def update_course_progress(
     enrollment_id: int,
@@ -258,55 +386,50 @@ def update_course_progress(
             detail="Enrollment not found"
         )
     
-    # Check if progress record exists for this lesson
-    progress = db.query(CourseProgress).filter(
-        and_(
-            CourseProgress.enrollment_id == enrollment_id,
-            CourseProgress.lesson_id == progress_data.lesson_id
-        )
-    ).first()
-    
-    if progress:
-        # Update existing progress
-        for field, value in progress_data.dict(exclude_unset=True).items():
-            setattr(progress, field, value)
-        
-        if progress_data.completed:
-            from datetime import datetime
-            progress.completion_date = datetime.utcnow()
-    else:
-        # Create new progress record
-        progress_dict = progress_data.dict()
-        progress_dict['enrollment_id'] = enrollment_id
-        
-        if progress_data.completed:
-            from datetime import datetime
-            progress_dict['completion_date'] = datetime.utcnow()
+    for attempt in range(2):
+        try:
+            # Check if progress record exists for this lesson
+            progress = db.query(CourseProgress).filter(
+                and_(
+                    CourseProgress.enrollment_id == enrollment_id,
+                    CourseProgress.lesson_id == progress_data.lesson_id
+                )
+            ).first()
             
-        progress = CourseProgress(**progress_dict)
-        db.add(progress)
-    
-    # Calculate overall progress percentage
-    total_lessons = db.query(CourseProgress).filter(
-        CourseProgress.enrollment_id == enrollment_id
-    ).count()
-    
-    completed_lessons = db.query(CourseProgress).filter(
-        and_(
-            CourseProgress.enrollment_id == enrollment_id,
-            CourseProgress.completed == True
-        )
-    ).count()
-    
-    if total_lessons > 0:
-        enrollment.progress_percentage = (completed_lessons / total_lessons) * 100
-        
-        # Mark course as completed if 100% progress
-        if enrollment.progress_percentage >= 100:
-            enrollment.status = "completed"
-            from datetime import datetime
-            enrollment.completion_date = datetime.utcnow()
-    
-    db.commit()
-    
-    return {"message": "Progress updated successfully", "progress_percentage": enrollment.progress_percentage}
\ No newline at end of file
+            if progress:
+                # Update existing progress
+                was_completed = progress.completed
+                for field, value in progress_data.dict(exclude_unset=True).items():
+                    setattr(progress, field, value)
+                
+                if progress_data.completed:
+                    from datetime import datetime
+                    progress.completion_date = datetime.utcnow()
+            else:
+                # Create new progress record
+                was_completed = None
+                progress_dict = progress_data.dict()
+                progress_dict['enrollment_id'] = enrollment_id
+                
+                if progress_data.completed:
+                    from datetime import datetime
+                    progress_dict['completion_date'] = datetime.utcnow()
+                
+                progress = CourseProgress(**progress_dict)
+                db.add(progress)
+            
+            # Counters move only when a lesson is new or its completion flips
+            apply_progress_delta(db, enrollment, *completion_delta(was_completed, progress.completed))
+            progress_percentage = enrollment.progress_percentage
+            db.commit()
+            break
+        except IntegrityError:
+            # A concurrent first write created this lesson; retry as an update of its row
+            db.rollback()
+            if attempt:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Progress changed concurrently, please retry"
+                )
+    
+    return {"message": "Progress updated successfully", "progress_percentage": progress_percentage}
\ No newline at end of file
@@ -1,13 +1,16 @@
-from typing import Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from ...db.database import get_db
+from ...db.replica import get_routed_db
 from ...models.user import User
 from ...models.course import Course
 from ...models.payment import Payment, PaymentStatus, PaymentMethod, PaymentType
 from ...schemas.payment import PaymentCreate, PaymentResponse
-from ...core.security import get_password_hash
+from ...core.security import PasswordHashQueueFull, password_hasher
 from ...core.config import settings
+from ...core.pagination import NEXT_CURSOR_HEADER, InvalidCursor, decode_cursor, next_page
+from ...core.metrics import STRIPE_REQUEST_DURATION
 import stripe
 import secrets
 import string
@@ -54,18 +57,19 @@ def create_payment_intent(
             )
 
         # Create Stripe payment intent
-        intent = stripe.PaymentIntent.create(
-            amount=payment_data.amount,
-            currency=payment_data.currency,
-            metadata={
-                'course_id': str(payment_data.course_id),
-                'course_title': course.title,
-                'payment_type': payment_data.payment_type,
-                'customer_first_name': payment_data.customer_info.get('first_name'),
-                'customer_last_name': payment_data.customer_info.get('last_name'),
-                'customer_email': payment_data.customer_info.get('email'),
-            }
-        )
+        with STRIPE_REQUEST_DURATION.time(operation="payment_intent.create"):
+            intent = stripe.PaymentIntent.create(
+                amount=payment_data.amount,
+                currency=payment_data.currency,
+                metadata={
+                    'course_id': str(payment_data.course_id),
+                    'course_title': course.title,
+                    'payment_type': payment_data.payment_type,
+                    'customer_first_name': payment_data.customer_info.get('first_name'),
+                    'customer_last_name': payment_data.customer_info.get('last_name'),
+                    'customer_email': payment_data.customer_info.get('email'),
+                }
+            )
 
         return {
             "client_secret": intent.client_secret,
@@ -97,7 +101,8 @@ def confirm_payment(
     """
     try:
         # Retrieve payment intent from Stripe
-        intent = stripe.PaymentIntent.retrieve(payment_data.payment_intent_id)
+        with STRIPE_REQUEST_DURATION.time(operation="payment_intent.retrieve"):
+            intent = stripe.PaymentIntent.retrieve(payment_data.payment_intent_id)
         
         if intent.status != 'succeeded':
             raise HTTPException(
@@ -122,7 +127,7 @@ def confirm_payment(
                 email=user_email,
                 username=username,
                 full_name=f"{metadata.get('customer_first_name')} {metadata.get('customer_last_name')}",
-                hashed_password=get_password_hash(temporary_password),
+                hashed_password=password_hasher.hash_sync(temporary_password),
                 role="student",
                 is_verified=True  # Auto-verify paid users
             )
@@ -154,17 +159,24 @@ def confirm_payment(
         # Auto-enroll user in the course
         from ...models.course import CourseEnrollment
         
-        enrollment = CourseEnrollment(
-            user_id=user.id,
-            course_id=course_id,
-            status="active"
-        )
-        
-        db.add(enrollment)
+        # Check if already enrolled
+        enrollment = db.query(CourseEnrollment).filter(
+            CourseEnrollment.user_id == user.id,
+            CourseEnrollment.course_id == course_id
+        ).first()
         
-        # Update course enrollment count
-        course = db.query(Course).filter(Course.id == course_id).first()
-        course.enrollment_count += 1
+        if not enrollment:
+            enrollment = CourseEnrollment(
+                user_id=user.id,
+                course_id=course_id,
+                status="active"
+            )
+            
+            db.add(enrollment)
+            
+            # Update course enrollment count
+            course = db.query(Course).filter(Course.id == course_id).first()
+            course.enrollment_count += 1
         
         db.commit()
 
@@ -185,6 +197,9 @@ def confirm_payment(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Stripe error: {str(e)}"
         )
+    except PasswordHashQueueFull:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -310,16 +325,17 @@ async def create_payment_intent_new(request: PaymentIntentRequest):
     Create Stripe payment intent - NEW ENDPOINT
     """
     try:
-        intent = stripe.PaymentIntent.create(
-            amount=request.amount,
-            currency=request.currency,
-            metadata={
-                'course_id': request.course_id,
-                'customer_name': request.customer_name,
-                'customer_email': request.customer_email,
-                'customer_phone': request.customer_phone
-            }
-        )
+        with STRIPE_REQUEST_DURATION.time(operation="payment_intent.create"):
+            intent = stripe.PaymentIntent.create(
+                amount=request.amount,
+                currency=request.currency,
+                metadata={
+                    'course_id': request.course_id,
+                    'customer_name': request.customer_name,
+                    'customer_email': request.customer_email,
+                    'customer_phone': request.customer_phone
+                }
+            )
         return {"client_secret": intent.client_secret}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -331,7 +347,8 @@ async def confirm_payment_new(request: PaymentConfirmRequest, db: Session = Depe
     """
     try:
         # Verify payment intent was successful
-        intent = stripe.PaymentIntent.retrieve(request.payment_intent_id)
+        with STRIPE_REQUEST_DURATION.time(operation="payment_intent.retrieve"):
+            intent = stripe.PaymentIntent.retrieve(request.payment_intent_id)
         
         if intent.status != 'succeeded':
             raise HTTPException(status_code=400, detail="Payment not successful")
@@ -352,7 +369,7 @@ async def confirm_payment_new(request: PaymentConfirmRequest, db: Session = Depe
                 username=username,
                 full_name=request.customer_name,
                 phone=request.customer_phone,
-                hashed_password=get_password_hash(random_password),
+                hashed_password=await password_hasher.hash(random_password),
                 role="student",
                 is_verified=True  # Auto-verify paid users
             )
@@ -369,7 +386,7 @@ async def confirm_payment_new(request: PaymentConfirmRequest, db: Session = Depe
             payment_type=PaymentType.COURSE_PURCHASE,
             status=PaymentStatus.COMPLETED,
             amount=request.amount / 100,  # Convert from cents
-            currency=request.currency.upper(),
+            currency=intent.currency.upper(),
             description=f"Course purchase: Course ID {request.course_id}",
             course_id=request.course_id,
             transaction_fee=0.0,
@@ -434,6 +451,9 @@ async def confirm_payment_new(request: PaymentConfirmRequest, db: Session = Depe
             "new_user": new_user_created
         }
         
+    except PasswordHashQueueFull:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
@@ -441,12 +461,29 @@ async def confirm_payment_new(request: PaymentConfirmRequest, db: Session = Depe
 
 @router.get("/")
 def get_payments(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; replaces skip"),
+    db: Session = Depends(get_routed_db)
 ):
     """
     Get all payments (admin endpoint)
     """
-    payments = db.query(Payment).offset(skip).limit(limit).all()
-    return [PaymentResponse.from_orm(payment) for payment in payments]
\ No newline at end of file
+    query = db.query(Payment).order_by(Payment.id)
+    if cursor:
+        try:
+            (after_id,) = decode_cursor(cursor, "payments", (int,))
+        except InvalidCursor as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        query = query.filter(Payment.id > after_id)
+    else:
+        query = query.offset(skip)
+    
+    payments, next_cursor = next_page(query.limit(limit + 1).all(), limit, "payments", lambda payment: (payment.id,))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [PaymentResponse.from_orm(payment) for payment in payments]
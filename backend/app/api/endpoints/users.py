@@ -1,32 +1,99 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
 from sqlalchemy.orm import Session
-from ...db.database import get_db
-from ...models.user import User
+from ...core.config import settings
+from ...core.pagination import NEXT_CURSOR_HEADER, InvalidCursor, decode_cursor, next_page
+from ...core.security import token_revocations
+from ...core.user_cache import user_cache
+from ...db.database import async_engine, get_db
+from ...db.replica import get_routed_db
+from ...models.user import DeletedUser, User
 from ...schemas.user import UserResponse, UserUpdate
-from ...api.deps import get_current_active_user, get_current_admin_user
+from ...services.user_import import ImportFormatError, detect_format, get_import_job, start_import_job
+from ...api.deps import Principal, get_current_active_user, get_current_admin_user
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[UserResponse])
 def get_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; replaces skip"),
+    db: Session = Depends(get_routed_db),
     current_user: User = Depends(get_current_admin_user)
 ):
     """
     Get all users (admin only)
     """
-    users = db.query(User).offset(skip).limit(limit).all()
+    query = db.query(User).order_by(User.id)
+    if cursor:
+        try:
+            (after_id,) = decode_cursor(cursor, "users", (int,))
+        except InvalidCursor as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        query = query.filter(User.id > after_id)
+    else:
+        query = query.offset(skip)
+    
+    users, next_cursor = next_page(query.limit(limit + 1).all(), limit, "users", lambda user: (user.id,))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return [UserResponse.from_orm(user) for user in users]
 
 
+@router.post("/import", status_code=status.HTTP_202_ACCEPTED)
+async def import_users_file(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    current_user: Principal = Depends(get_current_admin_user)
+):
+    """
+    Start a background bulk import of users from a CSV or NDJSON upload (admin only)
+    """
+    try:
+        file_format = detect_format(file.filename, file.content_type, format)
+    except ImportFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    job = await start_import_job(async_engine, file, file_format, created_by=current_user.id)
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"{settings.API_V1_STR}/users/import/{job['id']}",
+    }
+
+
+@router.get("/import/{job_id}")
+async def get_import_status(
+    job_id: str,
+    rows: bool = Query(True, description="Include the per-row report once the job has finished"),
+    current_user: Principal = Depends(get_current_admin_user)
+):
+    """
+    Bulk import status, running totals and the per-row report (admin only)
+    """
+    job = await get_import_job(async_engine, job_id, include_rows=rows)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Import job not found"
+        )
+    return job
+
+
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_routed_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -75,11 +142,27 @@ def update_user(
     
     # Update user fields
     update_data = user_update.dict(exclude_unset=True)
+    if ("role" in update_data or "status" in update_data) and current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can change role or status"
+        )
+    
+    authorization_changed = any(
+        field in update_data and update_data[field] != getattr(user, field) for field in ("role", "status")
+    )
     for field, value in update_data.items():
         setattr(user, field, value)
     
+    # Tokens carrying the old role/status claims stop being accepted
+    if authorization_changed:
+        user.token_version = (user.token_version or 0) + 1
+    
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(user_id)
+    if authorization_changed:
+        token_revocations.revoke(user.id, user.token_version)
     
     return UserResponse.from_orm(user)
 
@@ -107,15 +190,24 @@ def delete_user(
             detail="Cannot delete your own account"
         )
     
+    # The row and its token_version go away, so record the deletion for the
+    # other workers' revocation loaders; tombstones older than a token lifetime are pruned
+    deleted_at = datetime.utcnow()
     db.delete(user)
+    db.merge(DeletedUser(user_id=user_id, deleted_at=deleted_at))
+    db.query(DeletedUser).filter(
+        DeletedUser.deleted_at < deleted_at - timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    ).delete(synchronize_session=False)
     db.commit()
+    user_cache.invalidate(user_id)
+    token_revocations.revoke_deleted(user_id, deleted_at)
     
     return {"message": "User deleted successfully"}
 
 
 @router.get("/profile/dashboard")
 def get_user_dashboard(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_routed_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -11,11 +11,76 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./techstep.db"
+    DB_ENGINE_PROFILE: str = "production"  # development, production
+    DB_POOL_SIZE: Optional[int] = None  # defaults to THREADPOOL_SIZE in production
+    DB_MAX_OVERFLOW: Optional[int] = None
+    DB_POOL_TIMEOUT: int = 30
+    ASYNC_DATABASE_URL: Optional[str] = None  # derived from DATABASE_URL when unset
+    DB_AUTO_MIGRATE: bool = True  # apply pending migrations at startup
+    LAST_LOGIN_FLUSH_SECONDS: float = 5.0  # batch interval for write-behind last_login updates
+    PROGRESS_RECONCILE_SECONDS: float = 3600.0  # enrollment lesson counter repair interval (one worker per interval); 0 disables
+    
+    # Read replica (none, readonly, snapshot)
+    READ_REPLICA_MODE: str = "none"
+    READ_REPLICA_URL: Optional[str] = None  # explicit replica URL, overrides the mode
+    READ_REPLICA_PATH: str = "./techstep.replica.db"  # snapshot mode copy
+    READ_REPLICA_REFRESH_SECONDS: float = 5.0  # minimum interval; larger files refresh less often
+    READ_REPLICA_MAX_COPY_SHARE: float = 0.1  # at most this fraction of wall time spent copying
+    READ_REPLICA_MAX_STALENESS_SECONDS: float = 15.0  # older snapshots fall back to the primary
+    
+    # Query instrumentation
+    DB_QUERY_DEBUG: bool = False  # add X-DB-Query-Count / X-DB-Time response headers
+    DB_N_PLUS_ONE_THRESHOLD: int = 5  # repeats of one statement per request logged as N+1
+    
+    # Slow query log
+    SLOW_QUERY_LOG_ENABLED: bool = False
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    SLOW_QUERY_LOG_PATH: Optional[str] = "./logs/slow_queries.jsonl"  # None = admin API buffer only
+    SLOW_QUERY_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS: int = 5
+    SLOW_QUERY_BUFFER_SIZE: int = 500
+    
+    # SQLite PRAGMA overrides (None = use the engine profile value)
+    SQLITE_JOURNAL_MODE: Optional[str] = None
+    SQLITE_SYNCHRONOUS: Optional[str] = None
+    SQLITE_BUSY_TIMEOUT_MS: Optional[int] = None
+    SQLITE_MMAP_SIZE: Optional[int] = None
+    SQLITE_CACHE_SIZE: Optional[int] = None
+    SQLITE_TEMP_STORE: Optional[str] = None
     
     # Security
     SECRET_KEY: str = "techstep-super-secret-key-for-development-only"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    TOKEN_CACHE_MAX_ENTRIES: int = 50000  # verified tokens kept until their exp; 0 disables
+    TOKEN_REVOCATION_REFRESH_SECONDS: float = 5.0  # reload token_version bumps made by other workers
+    PASSWORD_HASH_WORKERS: int = 2  # bcrypt worker processes; 0 hashes in the threadpool
+    PASSWORD_HASH_MAX_QUEUE: int = 32  # queued + running hashes before 503
+    PASSWORD_HASH_LOGIN_RESERVE: int = 8  # in-flight hash slots logins cannot take (register, payments)
+    USER_IMPORT_BATCH_SIZE: int = 500  # rows validated, hashed and inserted per transaction
+    USER_IMPORT_MAX_ROWS: int = 100000  # rows beyond this are reported as skipped
+    USER_IMPORT_STALE_SECONDS: float = 900.0  # running jobs without a batch heartbeat this long are reported interrupted
+    
+    # Login throttling (memory or redis via REDIS_URL; a limit of 0 disables that key)
+    LOGIN_THROTTLE_BACKEND: str = "memory"
+    LOGIN_THROTTLE_WINDOW_SECONDS: float = 60.0
+    LOGIN_MAX_ATTEMPTS_PER_EMAIL: int = 5
+    LOGIN_MAX_ATTEMPTS_PER_IP: int = 30
+    LOGIN_THROTTLE_MAX_KEYS: int = 100000  # in-memory keys kept before LRU eviction
+    # Comma-separated CIDRs of reverse proxies / CDN edges allowed to set X-Forwarded-For;
+    # empty means no proxy, and the per-IP limit keys on the TCP peer
+    TRUSTED_PROXIES: str = ""
+    
+    # Authenticated-user cache (per process; 0 TTL disables it)
+    USER_CACHE_TTL_SECONDS: float = 30.0
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Published course catalog snapshot; rebuilt on course writes, reloaded when older than this
+    CATALOG_MAX_AGE_SECONDS: float = 30.0
+    
+    # Cache-Control for public course endpoints; clients revalidate with ETags after max-age
+    COURSE_CACHE_MAX_AGE_SECONDS: int = 60
+    COURSE_CACHE_STALE_WHILE_REVALIDATE_SECONDS: int = 300
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = [
@@ -55,6 +120,7 @@ class Settings(BaseSettings):
     # Server
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    THREADPOOL_SIZE: int = 40  # worker threads available to sync endpoints
 
     class Config:
         env_file = ".env"
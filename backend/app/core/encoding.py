@@ -0,0 +1,27 @@
+"""
+Fast JSON encoding for pre-rendered responses.
+
+Uses orjson when it is installed and falls back to the standard library with
+the same compact output. Callers pass JSON-ready values (model_dump(mode="json")),
+so both encoders see only dicts, lists, strings, numbers, booleans and None.
+"""
+import json
+from typing import Any, Iterable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def join_array(fragments: Iterable[bytes]) -> bytes:
+    """
+    A JSON array body from already-encoded elements
+    """
+    return b"[" + b",".join(fragments) + b"]"
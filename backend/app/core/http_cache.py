@@ -0,0 +1,45 @@
+"""
+HTTP validators for the public course endpoints.
+
+Responses carry a strong ETag and a Cache-Control policy, so browsers and the
+CDN can revalidate with If-None-Match. Endpoints compute the ETag from data
+they already hold in memory (the catalog version or a catalog entry digest)
+and answer a matching request with an empty 304 before filtering, querying
+or serializing anything.
+"""
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from .config import settings
+
+
+def public_cache_control() -> str:
+    return (
+        f"public, max-age={settings.COURSE_CACHE_MAX_AGE_SECONDS}, "
+        f"stale-while-revalidate={settings.COURSE_CACHE_STALE_WHILE_REVALIDATE_SECONDS}"
+    )
+
+
+def make_etag(value: object) -> str:
+    return f'"{value}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    If-None-Match uses weak comparison, so W/ prefixes added by proxies still match
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+
+def validator_headers(etag: str, cache_control: Optional[str] = None) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": cache_control or public_cache_control()}
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
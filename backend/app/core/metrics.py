@@ -0,0 +1,282 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Deliberately dependency-free: a metric is a dict of label values to numbers
+behind a lock, so recording costs a dict lookup and, for histograms, a bisect.
+Gauges that describe external state (pools, threadpool) are refreshed by
+collector callbacks right before each scrape instead of on every request.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, values: LabelValues, extra: Sequence[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._label_values(labels), 0.0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._format_labels(k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v[0]), v[1]) for k, v in self._values.items()]
+
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = self._format_labels(key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """
+        Register a callback that refreshes gauges right before rendering
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return registry.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# --- Application metrics ----------------------------------------------------------
+
+HTTP_REQUEST_DURATION = histogram(
+    "techstep_http_request_duration_seconds",
+    "HTTP request latency by route template, method and status",
+    ["route", "method", "status"],
+)
+
+HTTP_REQUESTS_IN_FLIGHT = gauge(
+    "techstep_http_requests_in_flight",
+    "HTTP requests currently being handled",
+)
+
+THREADPOOL_TOKENS = gauge(
+    "techstep_threadpool_tokens",
+    "Threadpool capacity for sync endpoints (state: total, borrowed)",
+    ["state"],
+)
+
+DB_POOL_CONNECTIONS = gauge(
+    "techstep_db_pool_connections",
+    "Database pool connections by engine and state (size, checked_out, checked_in, overflow)",
+    ["engine", "state"],
+)
+
+DB_POOL_CHECKOUT_WAIT = histogram(
+    "techstep_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+
+STRIPE_REQUEST_DURATION = histogram(
+    "techstep_stripe_request_duration_seconds",
+    "Latency of Stripe API calls by operation",
+    ["operation"],
+)
+
+USER_CACHE_REQUESTS = counter(
+    "techstep_user_cache_requests_total",
+    "Authenticated-user cache lookups by result (hit, miss)",
+    ["result"],
+)
+
+USER_CACHE_ENTRIES = gauge(
+    "techstep_user_cache_entries",
+    "Users currently held in the authenticated-user cache",
+)
+
+TOKEN_CACHE_REQUESTS = counter(
+    "techstep_token_cache_requests_total",
+    "Verified-token cache lookups by result (hit, miss)",
+    ["result"],
+)
+
+PASSWORD_HASH_QUEUE_WAIT = histogram(
+    "techstep_password_hash_queue_wait_seconds",
+    "Time a password hash/verify waited for a worker process",
+    ["operation"],
+)
+
+PASSWORD_HASH_DURATION = histogram(
+    "techstep_password_hash_duration_seconds",
+    "CPU time of a password hash/verify inside the worker",
+    ["operation"],
+)
+
+PASSWORD_HASH_IN_FLIGHT = gauge(
+    "techstep_password_hash_in_flight",
+    "Password hashes queued or running",
+)
+
+PASSWORD_HASH_REJECTED = counter(
+    "techstep_password_hash_rejected_total",
+    "Password hashes rejected because the queue was full",
+    ["operation"],
+)
+
+LOGIN_THROTTLED = counter(
+    "techstep_login_throttled_total",
+    "Login attempts rejected by the throttle by key (email, ip)",
+    ["key"],
+)
+
+CATALOG_REBUILDS = counter(
+    "techstep_catalog_rebuilds_total",
+    "Course catalog snapshot rebuilds by reason (write, expired)",
+    ["reason"],
+)
@@ -0,0 +1,70 @@
+"""
+Request instrumentation middleware.
+
+One pure ASGI layer records per-route latency and in-flight requests for
+/metrics and counts the SQL statements each request executes, flagging N+1
+patterns. Unlike BaseHTTPMiddleware it adds no extra task or memory stream
+per request; it only wraps send() to read the status and, with
+DB_QUERY_DEBUG, add the query count headers.
+
+Both the latency histogram and the N+1 log are labelled by route template
+(e.g. /api/v1/users/{user_id}), never by raw path, to keep cardinality bounded.
+"""
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..db.query_stats import log_n_plus_one_suspects, track_request
+from .config import settings
+from .metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Path template of the route that handled the request, set by the router once it matches
+    """
+    route = scope.get("route")
+    return route.path if route is not None else UNMATCHED_ROUTE
+
+
+class RequestInstrumentationMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        started = time.perf_counter()
+        status_code = 500
+
+        with track_request(lambda: f"{method} {route_template(scope)}") as stats:
+
+            async def send_with_status(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    if settings.DB_QUERY_DEBUG:
+                        headers = MutableHeaders(scope=message)
+                        headers["X-DB-Query-Count"] = str(stats.count)
+                        headers["X-DB-Time"] = f"{stats.total_time * 1000:.3f}ms"
+                await send(message)
+
+            HTTP_REQUESTS_IN_FLIGHT.inc()
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                HTTP_REQUESTS_IN_FLIGHT.dec()
+                HTTP_REQUEST_DURATION.observe(
+                    time.perf_counter() - started,
+                    route=route_template(scope),
+                    method=method,
+                    status=status_code,
+                )
+                if stats.count >= settings.DB_N_PLUS_ONE_THRESHOLD:
+                    log_n_plus_one_suspects(stats, settings.DB_N_PLUS_ONE_THRESHOLD)
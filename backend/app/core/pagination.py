@@ -0,0 +1,64 @@
+"""
+Opaque keyset cursors for list endpoints.
+
+A cursor carries the sort key of the last row of a page, so the next page is
+a range scan starting after it (WHERE id > :last ORDER BY id) instead of an
+OFFSET that reads and discards every earlier row. Pages also stay consistent
+while rows are inserted.
+
+Cursors are URL-safe base64 JSON tagged with the list they belong to; they
+are not signed, since they only select a starting point in data the caller
+can already list. Endpoints return the next cursor in the X-Next-Cursor
+header, which is absent on the last page.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_cursor(kind: str, key: Sequence[Any]) -> str:
+    payload = json.dumps([kind, *(_encode_value(value) for value in key)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str, types: Sequence[type]) -> Tuple[Any, ...]:
+    """
+    Decode a cursor issued for `kind` into its sort key, converting each value to `types`
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+    if not isinstance(payload, list) or len(payload) != len(types) + 1 or payload[0] != kind:
+        raise InvalidCursor("Cursor does not belong to this list")
+    try:
+        return tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value_type, value in zip(types, payload[1:])
+        )
+    except (TypeError, ValueError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+
+
+def next_page(rows: Sequence[T], limit: int, kind: str, key: Callable[[T], Sequence[Any]]) -> Tuple[Sequence[T], Optional[str]]:
+    """
+    Split rows fetched with limit + 1 into the page and the cursor for the next one
+    """
+    if len(rows) <= limit or limit <= 0:
+        return rows[:max(limit, 0)], None
+    page = rows[:limit]
+    return page, encode_cursor(kind, key(page[-1]))
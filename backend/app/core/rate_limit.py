@@ -0,0 +1,233 @@
+"""
+Sliding-window throttling for the login endpoints.
+
+Each attempt is counted under its email and its client IP before any
+password work happens, so a credential-stuffing burst is rejected with a
+counter update instead of a bcrypt verification. Counting uses the sliding
+window counter approximation: the current and previous fixed windows, with
+the previous one weighted by how much of it still overlaps the sliding
+window. That is O(1) state per key and maps directly onto two Redis INCRs.
+
+The in-memory backend is per process. Set LOGIN_THROTTLE_BACKEND=redis to
+share counters between workers through settings.REDIS_URL; if Redis is
+unreachable the throttle falls back to memory rather than failing logins.
+
+Behind a reverse proxy or CDN every TCP peer is the proxy, so the client
+address comes from X-Forwarded-For, but only when the peer is listed in
+TRUSTED_PROXIES. The header is read right to left and the first hop that is
+not a trusted proxy is the client; hops further left are client-supplied
+and never used. Forwarded headers arriving from an untrusted peer are
+ignored and logged loudly, since that usually means TRUSTED_PROXIES is
+missing and all clients share one per-IP limit.
+"""
+import hashlib
+import ipaddress
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple, Union
+
+from .config import settings
+from .metrics import LOGIN_THROTTLED
+
+logger = logging.getLogger(__name__)
+
+
+def _estimate(previous: int, current: int, elapsed: float, window: float) -> float:
+    return previous * (1 - elapsed / window) + current
+
+
+def _retry_after(previous: int, current: int, elapsed: float, window: float, limit: int) -> int:
+    """
+    Seconds until one more attempt would fit under the limit
+    """
+    if current < limit:
+        # previous * (1 - (elapsed + t) / window) + current + 1 <= limit
+        wait = window * (1 - (limit - current - 1) / previous) - elapsed if previous else 0
+    else:
+        # Only once this window has become the previous one and decayed enough
+        wait = (window - elapsed) + window * (1 - (limit - 1) / current)
+    return max(1, math.ceil(wait))
+
+
+class MemoryWindowCounter:
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # key -> [window index, previous window count, current window count]
+        self._windows: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def hit(self, key: str, window: float) -> Tuple[int, int, float]:
+        """
+        Count one attempt and return (previous count, current count, elapsed in window)
+        """
+        now = time.time()
+        index = int(now // window)
+        with self._lock:
+            entry = self._windows.get(key)
+            if entry is None:
+                entry = self._windows[key] = [index, 0, 0]
+            elif entry[0] != index:
+                entry[1] = entry[2] if entry[0] == index - 1 else 0
+                entry[0], entry[2] = index, 0
+            entry[2] += 1
+            self._windows.move_to_end(key)
+            while len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+            return entry[1], entry[2], now - index * window
+
+    async def reset(self, key: str) -> None:
+        with self._lock:
+            self._windows.pop(key, None)
+
+
+class RedisWindowCounter:
+    def __init__(self, url: str, prefix: str = "techstep:throttle"):
+        import redis.asyncio as redis
+
+        self._redis = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.prefix = prefix
+
+    async def hit(self, key: str, window: float) -> Tuple[int, int, float]:
+        now = time.time()
+        index = int(now // window)
+        current_key = f"{self.prefix}:{key}:{index}"
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.incr(current_key)
+            pipe.expire(current_key, int(window * 2) + 1)
+            pipe.get(f"{self.prefix}:{key}:{index - 1}")
+            current, _, previous = await pipe.execute()
+        return int(previous or 0), int(current), now - index * window
+
+    async def reset(self, key: str) -> None:
+        index = int(time.time() // settings.LOGIN_THROTTLE_WINDOW_SECONDS)
+        await self._redis.delete(*(f"{self.prefix}:{key}:{i}" for i in (index - 1, index)))
+
+
+class LoginThrottle:
+    def __init__(self, window: float, max_per_email: int, max_per_ip: int, backend: str):
+        self.window = window
+        self.limits = {"email": max_per_email, "ip": max_per_ip}
+        self._memory = MemoryWindowCounter(settings.LOGIN_THROTTLE_MAX_KEYS)
+        self._counter = self._memory
+        if backend == "redis":
+            try:
+                self._counter = RedisWindowCounter(settings.REDIS_URL)
+            except ImportError:
+                logger.warning("LOGIN_THROTTLE_BACKEND=redis but the redis package is missing; using memory")
+
+    @staticmethod
+    def _key(kind: str, value: str) -> str:
+        # Keys may land in Redis; do not store raw emails or addresses there
+        return f"{kind}:{hashlib.sha256(value.strip().lower().encode()).hexdigest()[:32]}"
+
+    async def _hit(self, key: str) -> Tuple[int, int, float]:
+        try:
+            return await self._counter.hit(key, self.window)
+        except Exception as e:
+            if self._counter is self._memory:
+                raise
+            logger.warning(f"Login throttle backend unavailable, counting in memory: {e}")
+            return await self._memory.hit(key, self.window)
+
+    async def check(self, email: str, client_ip: Optional[str]) -> Optional[int]:
+        """
+        Count an attempt; return seconds to wait if the email or IP is over its limit
+        """
+        retry_after = None
+        attempts = [("email", email)]
+        if client_ip:
+            attempts.append(("ip", client_ip))
+
+        for kind, value in attempts:
+            limit = self.limits[kind]
+            if limit <= 0:
+                continue
+            previous, current, elapsed = await self._hit(self._key(kind, value))
+            if _estimate(previous, current, elapsed, self.window) > limit:
+                LOGIN_THROTTLED.inc(key=kind)
+                wait = _retry_after(previous, current, elapsed, self.window, limit)
+                retry_after = max(retry_after or 0, wait)
+        return retry_after
+
+    async def reset_email(self, email: str) -> None:
+        """
+        A successful login clears the email's window; the IP window keeps counting
+        """
+        key = self._key("email", email)
+        try:
+            await self._counter.reset(key)
+        except Exception as e:
+            logger.warning(f"Login throttle reset failed: {e}")
+            await self._memory.reset(key)
+
+
+login_throttle = LoginThrottle(
+    window=settings.LOGIN_THROTTLE_WINDOW_SECONDS,
+    max_per_email=settings.LOGIN_MAX_ATTEMPTS_PER_EMAIL,
+    max_per_ip=settings.LOGIN_MAX_ATTEMPTS_PER_IP,
+    backend=settings.LOGIN_THROTTLE_BACKEND,
+)
+
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_trusted_proxies(value: str) -> List[Network]:
+    """
+    Parse comma-separated CIDRs; a malformed entry raises, failing startup
+    """
+    networks = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if entry:
+            try:
+                networks.append(ipaddress.ip_network(entry, strict=False))
+            except ValueError as e:
+                raise ValueError(f"Invalid TRUSTED_PROXIES entry '{entry}': {e}") from None
+    return networks
+
+
+trusted_proxies = parse_trusted_proxies(settings.TRUSTED_PROXIES)
+_untrusted_forwarding_reported = False
+
+
+def is_trusted_proxy(address: Optional[str], networks: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except (TypeError, ValueError):
+        return False
+    return any(ip in network for network in networks)
+
+
+def forwarded_client(peer: Optional[str], forwarded_for: Optional[str], networks: List[Network]) -> Optional[str]:
+    """
+    Client address: the right-most X-Forwarded-For hop that is not a trusted
+    proxy, when the peer itself is one; otherwise the peer
+    """
+    if not forwarded_for or not is_trusted_proxy(peer, networks):
+        return peer
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not is_trusted_proxy(hop, networks):
+            return hop
+    # Every hop is one of our proxies; the left-most is the closest to the client
+    return hops[0] if hops else peer
+
+
+def client_ip(request) -> Optional[str]:
+    global _untrusted_forwarding_reported
+    peer = request.client.host if request.client else None
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if forwarded_for and not is_trusted_proxy(peer, trusted_proxies) and not _untrusted_forwarding_reported:
+        # uvicorn's --forwarded-allow-ips already replaced the peer with the last hop
+        if forwarded_for.rsplit(",", 1)[-1].strip() != peer:
+            _untrusted_forwarding_reported = True
+            logger.error(
+                f"Ignoring X-Forwarded-For from {peer}, which is not in TRUSTED_PROXIES. If the app runs "
+                f"behind a proxy or CDN, every client now shares its per-IP login limit; add its addresses "
+                f"to TRUSTED_PROXIES"
+            )
+    return forwarded_client(peer, forwarded_for, trusted_proxies)
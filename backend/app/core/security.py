@@ -1,8 +1,24 @@
-from datetime import datetime, timedelta
-from typing import Any, Union
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple, Union
+from anyio import to_thread
 from jose import jwt
 from passlib.context import CryptContext
 from .config import settings
+from .metrics import (
+    PASSWORD_HASH_DURATION, PASSWORD_HASH_IN_FLIGHT, PASSWORD_HASH_QUEUE_WAIT, PASSWORD_HASH_REJECTED,
+    TOKEN_CACHE_REQUESTS
+)
+
+logger = logging.getLogger(__name__)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -10,15 +26,28 @@ ALGORITHM = settings.ALGORITHM
 
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: timedelta = None
+    subject: Union[str, Any],
+    expires_delta: timedelta = None,
+    role: Optional[str] = None,
+    status: Optional[str] = None,
+    token_version: Optional[int] = None,
 ) -> str:
+    """
+    Issue a JWT; with role, status and token_version it is enough to authorize on its own
+    """
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {"exp": expire, "iat": datetime.utcnow(), "sub": str(subject)}
+    if role is not None:
+        to_encode["role"] = str(getattr(role, "value", role))
+    if status is not None:
+        to_encode["status"] = str(getattr(status, "value", status))
+    if token_version is not None:
+        to_encode["ver"] = int(token_version)
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -31,12 +60,299 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def verify_token(token: str) -> Union[str, None]:
+class VerifiedTokenCache:
+    """
+    LRU of already-verified token payloads, keyed by the token's SHA-256 digest.
+
+    A client reuses one bearer token for up to ACCESS_TOKEN_EXPIRE_MINUTES, so
+    after the first request its signature check becomes a dict lookup. An
+    entry is dropped once the token's exp passes; only tokens that verified
+    are stored, so a forged token can never hit.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest: bytes) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return entry[1]
+
+    def put(self, digest: bytes, payload: Dict[str, Any]) -> None:
+        expires_at = payload.get("exp")
+        if self.max_entries <= 0 or not isinstance(expires_at, (int, float)):
+            return
+        with self._lock:
+            self._entries[digest] = (float(expires_at), payload)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = VerifiedTokenCache(settings.TOKEN_CACHE_MAX_ENTRIES)
+
+
+def decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the verified payload of an access token, or None if it is invalid or expired
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(digest)
+    if payload is not None:
+        TOKEN_CACHE_REQUESTS.inc(result="hit")
+        return payload
+
+    TOKEN_CACHE_REQUESTS.inc(result="miss")
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            return None
-        return str(user_id)
     except jwt.JWTError:
-        return None
\ No newline at end of file
+        return None
+    token_cache.put(digest, payload)
+    return payload
+
+
+class TokenRevocations:
+    """
+    Per-user minimum token version still accepted.
+
+    Only users whose token_version was ever bumped (role or status change)
+    have an entry, so the map stays small. Deleted users have no row left to
+    bump, so they are tracked by deletion time instead: their tokens issued up
+    to that second are revoked, while a new user that reuses the id can still
+    log in. Changes made in this process apply immediately; the lifespan task
+    reloads changes made by other workers every TOKEN_REVOCATION_REFRESH_SECONDS.
+    """
+
+    def __init__(self):
+        self._min_versions: Dict[int, int] = {}
+        self._deleted_at: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def min_version(self, user_id: int) -> int:
+        return self._min_versions.get(user_id, 0)
+
+    def revoke(self, user_id: int, min_version: int) -> None:
+        with self._lock:
+            if min_version > self._min_versions.get(user_id, 0):
+                self._min_versions[user_id] = min_version
+
+    def load(self, rows) -> None:
+        """
+        Merge (user_id, token_version) rows; versions only ever move forward
+        """
+        with self._lock:
+            for user_id, version in rows:
+                if version > self._min_versions.get(user_id, 0):
+                    self._min_versions[user_id] = version
+
+    def revoke_deleted(self, user_id: int, deleted_at: datetime) -> None:
+        """
+        Revoke every token for user_id issued at or before deleted_at (naive UTC)
+        """
+        self.load_deleted([(user_id, deleted_at)])
+
+    def load_deleted(self, rows, expired_before: Optional[datetime] = None) -> None:
+        """
+        Merge (user_id, deleted_at) rows and forget deletions whose tokens have all expired
+        """
+        with self._lock:
+            for user_id, deleted_at in rows:
+                deleted_at = _epoch_seconds(deleted_at)
+                if deleted_at > self._deleted_at.get(user_id, 0):
+                    self._deleted_at[user_id] = deleted_at
+            if expired_before is not None:
+                cutoff = _epoch_seconds(expired_before)
+                self._deleted_at = {
+                    user_id: deleted_at for user_id, deleted_at in self._deleted_at.items() if deleted_at >= cutoff
+                }
+
+    def is_revoked(self, user_id: int, version: int, issued_at: Optional[int] = None) -> bool:
+        if version < self._min_versions.get(user_id, 0):
+            return True
+        deleted_at = self._deleted_at.get(user_id)
+        # Tokens without iat predate it and so the deletion
+        return deleted_at is not None and (issued_at is None or issued_at <= deleted_at)
+
+    def __len__(self) -> int:
+        return len(self._min_versions) + len(self._deleted_at)
+
+
+def _epoch_seconds(value: datetime) -> int:
+    # JWT iat is whole seconds since the epoch; stored datetimes are naive UTC
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+token_revocations = TokenRevocations()
+
+
+def verify_token(token: str) -> Union[str, None]:
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    user_id = payload.get("sub")
+    if user_id is None:
+        return None
+    return str(user_id)
+
+
+# --- Password hashing off the request path ---------------------------------------
+
+class PasswordHashQueueFull(Exception):
+    """
+    Raised when PASSWORD_HASH_MAX_QUEUE hashes are already queued or running
+    """
+
+
+def _timed_operation(operation: str, *args) -> Tuple[Any, float]:
+    started = time.perf_counter()
+    if operation == "verify":
+        result = verify_password(*args)
+    else:
+        result = get_password_hash(*args)
+    return result, time.perf_counter() - started
+
+
+def _warm_up() -> None:
+    pwd_context.hash("warm-up")
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a bounded pool of worker processes.
+
+    bcrypt holds a CPU for ~250ms per call; inline it pins a threadpool slot
+    and competes with every other request for the GIL. In worker processes
+    a login burst queues here instead, and once max_queue calls are queued or
+    running new ones fail fast with PasswordHashQueueFull (503).
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that runs threads can deadlock the child
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def start(self) -> None:
+        """
+        Start the worker processes so the first logins do not pay for interpreter startup
+        """
+        if self.workers > 0:
+            executor = self._get_executor()
+            for _ in range(self.workers):
+                executor.submit(_warm_up)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _acquire(self, operation: str, reserve: int = 0) -> None:
+        with self._lock:
+            if self._in_flight >= self.max_queue - reserve:
+                PASSWORD_HASH_REJECTED.inc(operation=operation)
+                raise PasswordHashQueueFull(f"{self._in_flight} password hashes already in flight")
+            self._in_flight += 1
+        PASSWORD_HASH_IN_FLIGHT.inc()
+
+    def _release(self, *_) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        PASSWORD_HASH_IN_FLIGHT.dec()
+
+    def _submit(self, operation: str, *args) -> Future:
+        try:
+            future = self._get_executor().submit(_timed_operation, operation, *args)
+        except BrokenProcessPool:
+            logger.warning("Password hash pool broken, restarting it")
+            self.shutdown()
+            future = self._get_executor().submit(_timed_operation, operation, *args)
+        # Released when the worker finishes, even if the caller stopped waiting
+        future.add_done_callback(self._release)
+        return future
+
+    def _record(self, operation: str, started: float, hash_seconds: float) -> None:
+        PASSWORD_HASH_DURATION.observe(hash_seconds, operation=operation)
+        PASSWORD_HASH_QUEUE_WAIT.observe(max(time.perf_counter() - started - hash_seconds, 0.0), operation=operation)
+
+    async def _run(self, operation: str, *args, reserve: int = 0) -> Any:
+        self._acquire(operation, reserve)
+        started = time.perf_counter()
+        if self.workers <= 0:
+            try:
+                result, hash_seconds = await to_thread.run_sync(_timed_operation, operation, *args)
+            finally:
+                self._release()
+        else:
+            try:
+                future = self._submit(operation, *args)
+            except Exception:
+                self._release()
+                raise
+            result, hash_seconds = await asyncio.wrap_future(future)
+        self._record(operation, started, hash_seconds)
+        return result
+
+    def _run_sync(self, operation: str, *args) -> Any:
+        self._acquire(operation)
+        started = time.perf_counter()
+        if self.workers <= 0:
+            try:
+                result, hash_seconds = _timed_operation(operation, *args)
+            finally:
+                self._release()
+        else:
+            try:
+                future = self._submit(operation, *args)
+            except Exception:
+                self._release()
+                raise
+            result, hash_seconds = future.result()
+        self._record(operation, started, hash_seconds)
+        return result
+
+    async def verify(self, plain_password: str, hashed_password: str, reserve: int = 0) -> bool:
+        """
+        reserve: leave this many in-flight slots free, so login storms cannot starve other hashing
+        """
+        return await self._run("verify", plain_password, hashed_password, reserve=reserve)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", password)
+
+    def verify_sync(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Blocking variant for sync endpoints; the threadpool slot waits but the CPU work is elsewhere
+        """
+        return self._run_sync("verify", plain_password, hashed_password)
+
+    def hash_sync(self, password: str) -> str:
+        return self._run_sync("hash", password)
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
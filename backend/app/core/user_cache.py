@@ -0,0 +1,109 @@
+"""
+Per-process cache of authenticated users.
+
+get_current_user resolves the token's user id through this cache, so the
+hot authenticated endpoints skip the users SELECT and ORM hydration. Entries
+are immutable UserSnapshot objects carrying every field UserResponse needs.
+
+Writes that change a user (update_user, delete_user, login stamping
+last_login) call invalidate(). Each worker process has its own cache, so a
+change made through another worker is picked up within USER_CACHE_TTL_SECONDS.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .config import settings
+from .metrics import USER_CACHE_ENTRIES, USER_CACHE_REQUESTS, registry
+
+SNAPSHOT_FIELDS = (
+    "id", "email", "username", "full_name", "role", "status", "avatar_url", "bio", "phone",
+    "linkedin_url", "github_url", "is_verified", "created_at", "updated_at", "last_login", "token_version",
+)
+
+
+class UserSnapshot:
+    """
+    Read-only view of a User row, detached from any session
+    """
+    __slots__ = SNAPSHOT_FIELDS
+
+    def __init__(self, **fields):
+        for name in SNAPSHOT_FIELDS:
+            object.__setattr__(self, name, fields.get(name))
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        return cls(**{name: getattr(user, name) for name in SNAPSHOT_FIELDS})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("UserSnapshot is read-only")
+
+    def __repr__(self) -> str:
+        return f"<UserSnapshot id={self.id} role={self.role} status={self.status}>"
+
+
+class UserCache:
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Tuple[float, UserSnapshot]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a miss that raced with one is not stored
+        self._generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, user_id: int) -> Tuple[Optional[UserSnapshot], int]:
+        """
+        Return (snapshot or None, generation to pass back to put() on a miss)
+        """
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(user_id)
+                    USER_CACHE_REQUESTS.inc(result="hit")
+                    return entry[1], generation
+                del self._entries[user_id]
+        USER_CACHE_REQUESTS.inc(result="miss")
+        return None, generation
+
+    def put(self, snapshot: UserSnapshot, generation: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[snapshot.id] = (time.monotonic() + self.ttl_seconds, snapshot)
+            self._entries.move_to_end(snapshot.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+user_cache = UserCache(settings.USER_CACHE_TTL_SECONDS, settings.USER_CACHE_MAX_ENTRIES)
+
+
+def collect_user_cache_metrics() -> None:
+    USER_CACHE_ENTRIES.set(len(user_cache))
+
+
+registry.add_collector(collect_user_cache_metrics)
@@ -1,22 +1,285 @@
-from sqlalchemy import create_engine
+import logging
+import time
+from typing import Any, Dict, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from ..core.config import settings
+from ..core.metrics import DB_POOL_CHECKOUT_WAIT, DB_POOL_CONNECTIONS, registry
+from .query_stats import instrument_engine
+
+# Engine profiles selectable via settings.DB_ENGINE_PROFILE.
+# PRAGMA values only apply to SQLite; pool settings apply to every backend.
+# A pool_size of None means "size the pool for the request threadpool".
+ENGINE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "development": {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "busy_timeout_ms": 5000,
+        "mmap_size": 0,
+        "cache_size": -2000,  # negative = KiB, i.e. ~2 MiB (SQLite default)
+        "temp_store": "default",
+        "pool_size": 5,
+        "max_overflow": 10,
+    },
+    "production": {
+        "journal_mode": "wal",
+        "synchronous": "normal",
+        "busy_timeout_ms": 15000,
+        "mmap_size": 268435456,  # 256 MiB
+        "cache_size": -65536,  # 64 MiB per connection
+        "temp_store": "memory",
+        "pool_size": None,
+        "max_overflow": 10,
+    },
+}
+
+
+def is_sqlite_url(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def get_engine_profile(profile_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Resolve the engine profile, applying any explicit overrides from settings
+    """
+    name = profile_name or settings.DB_ENGINE_PROFILE
+    if name not in ENGINE_PROFILES:
+        raise ValueError(
+            f"Unknown DB_ENGINE_PROFILE '{name}', expected one of: {', '.join(ENGINE_PROFILES)}"
+        )
+
+    profile = dict(ENGINE_PROFILES[name])
+    overrides = {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout_ms": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "temp_store": settings.SQLITE_TEMP_STORE,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+    }
+    for key, value in overrides.items():
+        if value is not None:
+            profile[key] = value
+
+    # Every sync endpoint runs in the threadpool and holds at most one
+    # connection, so one pooled connection per worker thread avoids queueing.
+    if profile["pool_size"] is None:
+        profile["pool_size"] = settings.THREADPOOL_SIZE
+
+    profile["name"] = name
+    profile["pool_timeout"] = settings.DB_POOL_TIMEOUT
+    return profile
+
+
+def apply_sqlite_pragmas(target_engine: Engine, profile: Dict[str, Any]) -> None:
+    """
+    Register a connect hook applying the profile PRAGMAs to every new pooled connection
+    """
+    # A None value leaves that PRAGMA untouched (e.g. journal_mode on read-only replicas)
+    values = [
+        ("busy_timeout", profile["busy_timeout_ms"]),
+        ("journal_mode", profile["journal_mode"]),
+        ("synchronous", profile["synchronous"]),
+        ("mmap_size", profile["mmap_size"]),
+        ("cache_size", profile["cache_size"]),
+        ("temp_store", profile["temp_store"]),
+    ]
+    pragmas = [f"PRAGMA {name} = {value}" for name, value in values if value is not None]
+
+    @event.listens_for(target_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+class _TimedCheckoutMixin:
+    """
+    Records how long each pool checkout waited for a connection
+    """
+    metrics_name = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started, engine=self.metrics_name)
+
+    def recreate(self):
+        # engine.dispose() swaps in a recreated pool; keep its metrics label
+        new_pool = super().recreate()
+        new_pool.metrics_name = self.metrics_name
+        return new_pool
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# SQLAlchemy names pool loggers after the pool class, so these subclasses log as
+# app.db.database.<class> instead of under the "sqlalchemy" logger it keeps at
+# WARNING. Quiet just those loggers; the rest of this module logs normally.
+for _pool_class in (TimedQueuePool, TimedAsyncAdaptedQueuePool):
+    logging.getLogger(f"{_pool_class.__module__}.{_pool_class.__name__}").setLevel(logging.WARNING)
+
+
+# Engines reported by the pool metrics collector, keyed by metrics name
+engines: Dict[str, Engine] = {}
+
+
+def get_async_database_url(url: str) -> str:
+    """
+    Derive the async driver URL (aiosqlite/asyncpg) from a sync database URL
+    """
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:"):
+        return url.replace("postgresql:", "postgresql+asyncpg:", 1)
+    return url
+
+
+def _engine_kwargs(url: str, profile: Dict[str, Any]) -> Dict[str, Any]:
+    engine_kwargs: Dict[str, Any] = {"pool_pre_ping": not is_sqlite_url(url)}
+
+    if is_sqlite_url(url):
+        engine_kwargs["connect_args"] = {
+            "check_same_thread": False,
+            # Let SQLite's busy handler do the waiting instead of pysqlite's timeout
+            "timeout": profile["busy_timeout_ms"] / 1000,
+        }
+
+    # In-memory SQLite uses a SingletonThreadPool/StaticPool that takes no sizing
+    if ":memory:" not in url and "mode=memory" not in url:
+        engine_kwargs.update(
+            pool_size=profile["pool_size"],
+            max_overflow=profile["max_overflow"],
+            pool_timeout=profile["pool_timeout"],
+        )
+
+    return engine_kwargs
+
+
+def build_engine(url: str, profile: Dict[str, Any], name: str = "primary", **kwargs) -> Engine:
+    """
+    Create an engine for the given URL configured from an engine profile
+    """
+    engine_kwargs = _engine_kwargs(url, profile)
+    if "pool_size" in engine_kwargs:
+        engine_kwargs["poolclass"] = TimedQueuePool
+    engine_kwargs.update(kwargs)
+    new_engine = create_engine(url, **engine_kwargs)
+    new_engine.pool.metrics_name = name
+    engines[name] = new_engine
+    instrument_engine(new_engine)
+
+    if is_sqlite_url(url):
+        apply_sqlite_pragmas(new_engine, profile)
+
+    return new_engine
+
+
+def build_async_engine(url: str, profile: Dict[str, Any], name: str = "async", **kwargs) -> AsyncEngine:
+    """
+    Create an async engine for the given URL configured from an engine profile
+    """
+    engine_kwargs = _engine_kwargs(url, profile)
+    if "pool_size" in engine_kwargs:
+        # aiosqlite defaults to NullPool; keep connections (and their PRAGMAs) pooled
+        engine_kwargs["poolclass"] = TimedAsyncAdaptedQueuePool
+    engine_kwargs.update(kwargs)
+    new_engine = create_async_engine(url, **engine_kwargs)
+    new_engine.sync_engine.pool.metrics_name = name
+    engines[name] = new_engine.sync_engine
+    instrument_engine(new_engine.sync_engine)
+
+    if is_sqlite_url(url):
+        apply_sqlite_pragmas(new_engine.sync_engine, profile)
+
+    return new_engine
+
+
+engine_profile = get_engine_profile()
 
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+engine = build_engine(settings.DATABASE_URL, engine_profile)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for endpoints that run on the event loop instead of the threadpool
+async_engine = build_async_engine(get_async_database_url(settings.DATABASE_URL), engine_profile)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
+def get_effective_engine_settings(target_engine: Engine = None) -> Dict[str, Any]:
+    """
+    Report the configured profile alongside the values SQLite actually applied
+    """
+    target_engine = target_engine or engine
+    pool = target_engine.pool
+    effective: Dict[str, Any] = {
+        "profile": engine_profile["name"],
+        "dialect": target_engine.dialect.name,
+        "pool": {
+            "class": type(pool).__name__,
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "max_overflow": getattr(pool, "_max_overflow", None),
+            "timeout": pool.timeout() if hasattr(pool, "timeout") else None,
+        },
+    }
+
+    if target_engine.dialect.name == "sqlite":
+        pragmas = {}
+        with target_engine.connect() as connection:
+            for pragma in ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size", "temp_store"):
+                pragmas[pragma] = connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+        effective["pragmas"] = pragmas
+
+    return effective
+
+
+def collect_pool_metrics() -> None:
+    for name, target_engine in engines.items():
+        pool = target_engine.pool
+        if not isinstance(pool, QueuePool):
+            continue
+        DB_POOL_CONNECTIONS.set(pool.size(), engine=name, state="size")
+        DB_POOL_CONNECTIONS.set(pool.checkedout(), engine=name, state="checked_out")
+        DB_POOL_CONNECTIONS.set(pool.checkedin(), engine=name, state="checked_in")
+        DB_POOL_CONNECTIONS.set(max(pool.overflow(), 0), engine=name, state="overflow")
+
+
+registry.add_collector(collect_pool_metrics)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,96 @@
+"""
+Named leases for work only one worker process should do at a time.
+
+A lease is a row in ``process_leases`` naming its holder and an expiry time.
+Acquiring it is a single upsert that only overwrites an expired lease or one
+the caller already holds, so two workers can never both win. A holder that
+dies simply stops renewing, and another worker takes over once the lease
+expires.
+
+Used for migration backfills (one worker recounts, the others wait for the
+version to be recorded) and for periodic maintenance such as the progress
+counter reconciler (at most one run per interval across all workers).
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import Column, Float, MetaData, String, Table, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+lease_metadata = MetaData()
+
+process_leases = Table(
+    "process_leases",
+    lease_metadata,
+    Column("name", String, primary_key=True),
+    Column("holder", String, nullable=False),
+    Column("expires_at", Float, nullable=False),  # epoch seconds
+)
+
+
+def lease_holder() -> str:
+    # Read per call: forked workers must not share the parent's pid
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(target_engine: Engine, name: str, ttl_seconds: float, holder: Optional[str] = None) -> bool:
+    """
+    Take or renew the lease for ttl_seconds; False while another holder has it
+    """
+    holder = holder or lease_holder()
+    now = time.time()
+    with target_engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO process_leases (name, holder, expires_at) VALUES (:name, :holder, :expires_at) "
+                "ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+                "WHERE process_leases.holder = excluded.holder OR process_leases.expires_at < :now"
+            ),
+            {"name": name, "holder": holder, "expires_at": now + ttl_seconds, "now": now},
+        )
+        current = connection.execute(
+            text("SELECT holder FROM process_leases WHERE name = :name"), {"name": name}
+        ).scalar()
+    return current == holder
+
+
+def release_lease(target_engine: Engine, name: str, holder: Optional[str] = None) -> None:
+    with target_engine.begin() as connection:
+        connection.execute(
+            text("DELETE FROM process_leases WHERE name = :name AND holder = :holder"),
+            {"name": name, "holder": holder or lease_holder()},
+        )
+
+
+@contextmanager
+def keep_lease(target_engine: Engine, name: str, ttl_seconds: float, holder: Optional[str] = None) -> Iterator[None]:
+    """
+    Renew an acquired lease in the background until the block exits, then release it
+    """
+    holder = holder or lease_holder()
+    stopped = threading.Event()
+
+    def _renew():
+        while not stopped.wait(ttl_seconds / 3):
+            try:
+                if not acquire_lease(target_engine, name, ttl_seconds, holder):
+                    logger.warning(f"Lease {name} was taken over by another worker")
+                    return
+            except Exception as e:
+                logger.warning(f"Error renewing lease {name}: {e}")
+
+    renewer = threading.Thread(target=_renew, name=f"lease-{name}", daemon=True)
+    renewer.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        renewer.join()
+        release_lease(target_engine, name, holder)
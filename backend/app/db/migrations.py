@@ -0,0 +1,631 @@
+"""
+Versioned schema migrations.
+
+Applied migrations are recorded in the ``schema_migrations`` table, so worker
+startup is a single ``SELECT version`` when the schema is current.
+
+Blocking migrations run their upgrade in one ``BEGIN IMMEDIATE`` transaction
+before the worker serves. Migrations marked ``online`` run in a background
+thread after startup instead, even when a blocking migration with a higher
+number is pending (unless it lists them in ``requires``), so versions can be
+recorded out of order. Their upgrade gets the engine rather than a
+connection so every step commits on its own: each index is built in its own
+short transaction and data fixes run in batches. Online upgrades and
+backfills run under a lease (app.db.leases), so one worker does the work
+while the others wait for the version to be recorded. WAL mode keeps readers
+unblocked throughout. SQLite still holds the write lock while a single
+``CREATE INDEX`` scans its table, so writers can wait for one index build
+(seconds on a multi-million row table; keep busy_timeout above that, or run
+``upgrade`` off-peak), but never for the whole migration.
+
+Usage:
+    python -m app.db.migrations status
+    python -m app.db.migrations upgrade
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Union
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from sqlalchemy.schema import CreateColumn
+
+from .database import Base, engine as default_engine
+from .leases import acquire_lease, keep_lease, process_leases
+
+logger = logging.getLogger(__name__)
+
+migration_metadata = MetaData()
+
+# A worker that dies mid-backfill stops renewing; another takes over after this
+MIGRATION_LEASE_SECONDS = 60.0
+MIGRATION_LEASE_POLL_SECONDS = 1.0
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class Migration:
+    def __init__(
+        self,
+        version: int,
+        description: str,
+        upgrade: Union[Callable[[Connection], None], Callable[[Engine], None]],
+        online: bool = False,
+        backfill: Optional[Callable[[Engine], None]] = None,
+        requires: Sequence[int] = (),
+    ):
+        self.version = version
+        self.description = description
+        # Blocking upgrades get the locked migration connection; online ones get
+        # the engine and commit each step separately, so they must be idempotent.
+        self.upgrade = upgrade
+        self.online = online
+        # Runs after the schema change commits and before the version is
+        # recorded, in one worker at a time; it must be idempotent (it re-runs
+        # if interrupted).
+        self.backfill = backfill
+        # Online migrations that must be applied before this one; startup
+        # holds back only those, the rest run in the background
+        self.requires = tuple(requires)
+
+    def __repr__(self) -> str:
+        return f"<Migration {self.version}: {self.description}>"
+
+
+# --- Online operation helpers -------------------------------------------------
+
+
+def add_column(connection: Connection, table_name: str, column: Column) -> bool:
+    """
+    Add a column if it does not exist yet.
+
+    On SQLite, ADD COLUMN with a constant (or NULL) default only rewrites the
+    schema entry, so it is O(1) regardless of table size. Use backfill() to
+    populate computed values afterwards.
+    """
+    existing = {c["name"] for c in inspect(connection).get_columns(table_name)}
+    if column.name in existing:
+        return False
+
+    column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+    connection.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN {column_ddl}")
+    return True
+
+
+def index_names(connection: Connection, table_name: str) -> set:
+    if connection.dialect.name == "sqlite":
+        # The inspector skips expression indexes such as lower(email), with a warning
+        return set(connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (table_name,)
+        ).scalars())
+    return {i["name"] for i in inspect(connection).get_indexes(table_name)}
+
+
+def create_index(connection: Connection, index: Index) -> bool:
+    """
+    Create an index if it does not exist yet
+    """
+    if index.name in index_names(connection, index.table.name):
+        return False
+
+    index.create(bind=connection)
+    return True
+
+
+def create_indexes(target_engine: Engine, indexes: Sequence[Index]) -> List[str]:
+    """
+    Create missing indexes, each in its own short write transaction
+    """
+    created = []
+    for index in indexes:
+        with _write_transaction(target_engine) as connection:
+            if create_index(connection, index):
+                created.append(index.name)
+    return created
+
+
+def find_duplicates(target_engine: Engine, table_name: str, key_columns: Sequence[str]) -> Dict[int, int]:
+    """
+    Map the id of every row sharing key_columns with a lower-id row to that
+    lowest id. A single grouped read, so it does not block writers under WAL.
+    """
+    keys = ", ".join(key_columns)
+    with target_engine.connect() as connection:
+        groups = connection.exec_driver_sql(
+            f"SELECT MIN(id), GROUP_CONCAT(id) FROM {table_name} GROUP BY {keys} HAVING COUNT(*) > 1"
+        ).all()
+
+    duplicates = {}
+    for kept, ids in groups:
+        for row_id in map(int, ids.split(",")):
+            if row_id != kept:
+                duplicates[row_id] = kept
+    return duplicates
+
+
+def run_batched(
+    target_engine: Engine, statement: str, params: List[dict], batch_size: int = 5000, pause_seconds: float = 0.05
+) -> None:
+    """
+    Execute statement for each parameter set, committing every batch_size rows
+    """
+    for start in range(0, len(params), batch_size):
+        with target_engine.begin() as connection:
+            connection.execute(text(statement), params[start:start + batch_size])
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+
+def backfill(
+    target_engine: Engine,
+    table_name: str,
+    set_clause: str,
+    where_clause: str = "1 = 1",
+    batch_size: int = 5000,
+    pause_seconds: float = 0.05,
+) -> int:
+    """
+    Run an UPDATE in rowid-ranged batches, committing after each batch.
+
+    Each batch is a short write transaction, so application writers waiting on
+    busy_timeout get the lock between batches instead of behind one huge UPDATE.
+    """
+    updated = 0
+    with target_engine.connect() as connection:
+        max_id = connection.exec_driver_sql(f"SELECT MAX(rowid) FROM {table_name}").scalar() or 0
+
+    start = 0
+    while start < max_id:
+        end = start + batch_size
+        with target_engine.begin() as connection:
+            result = connection.exec_driver_sql(
+                f"UPDATE {table_name} SET {set_clause} "
+                f"WHERE rowid > {start} AND rowid <= {end} AND ({where_clause})"
+            )
+            updated += result.rowcount or 0
+        start = end
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    return updated
+
+
+# --- Migrations -----------------------------------------------------------------
+
+
+def _baseline(connection: Connection) -> None:
+    # Creates any missing tables; databases created by the old create_all
+    # startup already have them and are adopted as-is.
+    from .. import models  # noqa: F401  (registers every model on Base)
+
+    Base.metadata.create_all(bind=connection)
+
+
+def _dedupe_enrollments_and_progress(target_engine: Engine) -> None:
+    # Databases written before migration 2 can hold duplicate enrollments
+    # (confirm_payment enrolled on every confirmation) and duplicate lesson rows
+    # (the progress upsert checked, then inserted, without a lock), which the
+    # unique indexes reject. Keep the lowest id and move progress rows over to it.
+    enrollments = find_duplicates(target_engine, "course_enrollments", ("user_id", "course_id"))
+    if enrollments:
+        with target_engine.connect() as connection:
+            moved = [
+                {"id": progress_id, "enrollment_id": enrollments[enrollment_id]}
+                for progress_id, enrollment_id in connection.exec_driver_sql(
+                    "SELECT id, enrollment_id FROM course_progress"
+                )
+                if enrollment_id in enrollments
+            ]
+        run_batched(target_engine, "UPDATE course_progress SET enrollment_id = :enrollment_id WHERE id = :id", moved)
+        run_batched(target_engine, "DELETE FROM course_enrollments WHERE id = :id",
+                    [{"id": enrollment_id} for enrollment_id in enrollments])
+
+    lessons = find_duplicates(target_engine, "course_progress", ("enrollment_id", "lesson_id"))
+    run_batched(target_engine, "DELETE FROM course_progress WHERE id = :id", [{"id": row_id} for row_id in lessons])
+    if enrollments or lessons:
+        # At startup this runs in the background, usually after migration 7
+        # added the lesson counters, which moved and deleted rows just changed
+        with target_engine.connect() as connection:
+            columns = {c["name"] for c in inspect(connection).get_columns("course_enrollments")}
+        if "completed_lessons" in columns:
+            from ..services.progress import reconcile_progress_counters
+
+            reconcile_progress_counters(target_engine, batch_size=5000, pause_seconds=0)
+        logger.warning(
+            f"Removed {len(enrollments)} duplicate enrollment(s) and {len(lessons)} duplicate lesson progress row(s)"
+        )
+
+
+def _hot_path_indexes(target_engine: Engine) -> None:
+    from ..models.course import Course, CourseEnrollment, CourseProgress
+    from ..models.mentor import MentorBooking
+    from ..models.payment import Payment
+
+    indexes = [
+        index
+        for model in (Course, CourseEnrollment, CourseProgress, MentorBooking, Payment)
+        for index in model.__table__.indexes
+    ]
+    _dedupe_enrollments_and_progress(target_engine)
+    try:
+        create_indexes(target_engine, indexes)
+    except IntegrityError:
+        # A live writer raced a duplicate in before its unique index existed
+        _dedupe_enrollments_and_progress(target_engine)
+        create_indexes(target_engine, indexes)
+
+
+def _user_token_version(connection: Connection) -> None:
+    from ..models.user import User
+
+    add_column(connection, "users", User.__table__.c.token_version)
+
+
+def _revoked_token_index(target_engine: Engine) -> None:
+    from ..models.user import User
+
+    create_indexes(
+        target_engine, [index for index in User.__table__.indexes if index.name == "ix_users_revoked_token_version"]
+    )
+
+
+COURSE_SEARCH_DDL = (
+    # External content: the index stores only tokens, the text stays in courses
+    """CREATE VIRTUAL TABLE IF NOT EXISTS courses_fts USING fts5(
+        title, short_description, description, instructor_name, tags,
+        content='courses', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS courses_fts_insert AFTER INSERT ON courses BEGIN
+        INSERT INTO courses_fts(rowid, title, short_description, description, instructor_name, tags)
+        VALUES (new.id, new.title, new.short_description, new.description, new.instructor_name, new.tags);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS courses_fts_delete AFTER DELETE ON courses BEGIN
+        INSERT INTO courses_fts(courses_fts, rowid, title, short_description, description, instructor_name, tags)
+        VALUES ('delete', old.id, old.title, old.short_description, old.description, old.instructor_name, old.tags);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS courses_fts_update AFTER UPDATE OF
+        title, short_description, description, instructor_name, tags ON courses BEGIN
+        INSERT INTO courses_fts(courses_fts, rowid, title, short_description, description, instructor_name, tags)
+        VALUES ('delete', old.id, old.title, old.short_description, old.description, old.instructor_name, old.tags);
+        INSERT INTO courses_fts(rowid, title, short_description, description, instructor_name, tags)
+        VALUES (new.id, new.title, new.short_description, new.description, new.instructor_name, new.tags);
+    END""",
+)
+
+
+def _course_search_index(target_engine: Engine) -> None:
+    # FTS5 is SQLite-only; other databases keep the ILIKE fallback in search
+    if target_engine.dialect.name != "sqlite":
+        return
+    # Schema-only statements; the index is filled by the backfill
+    with _write_transaction(target_engine) as connection:
+        for statement in COURSE_SEARCH_DDL:
+            connection.exec_driver_sql(statement)
+
+
+def _course_search_rebuild(target_engine: Engine) -> None:
+    if target_engine.dialect.name != "sqlite":
+        return
+    with target_engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO courses_fts(courses_fts) VALUES ('rebuild')")
+
+
+def _course_tags(connection: Connection) -> None:
+    from ..models.course import CourseTag
+
+    CourseTag.__table__.create(bind=connection, checkfirst=True)
+
+
+def _course_tags_backfill(target_engine: Engine) -> None:
+    from ..models.course import Course, CourseTag
+
+    with target_engine.connect() as connection:
+        courses = connection.execute(select(Course.id, Course.tags).where(Course.tags.isnot(None))).all()
+
+    rows = []
+    for course_id, tags in courses:
+        try:
+            parsed = json.loads(tags)
+        except ValueError:
+            continue
+        if isinstance(parsed, list):
+            rows.extend({"course_id": course_id, "tag": tag} for tag in CourseTag.normalize(parsed))
+
+    with target_engine.begin() as connection:
+        # Idempotent: a re-run after an interruption skips rows already copied
+        for start in range(0, len(rows), 5000):
+            connection.execute(
+                CourseTag.__table__.insert().prefix_with("OR IGNORE", dialect="sqlite"), rows[start:start + 5000]
+            )
+
+
+def _enrollment_progress_counters(connection: Connection) -> None:
+    from ..models.course import CourseEnrollment
+
+    add_column(connection, "course_enrollments", CourseEnrollment.__table__.c.completed_lessons)
+    add_column(connection, "course_enrollments", CourseEnrollment.__table__.c.total_lessons)
+
+
+def _enrollment_progress_backfill(target_engine: Engine) -> None:
+    from ..services.progress import reconcile_progress_counters
+
+    reconcile_progress_counters(target_engine, batch_size=5000, pause_seconds=0)
+
+
+def _deleted_users(connection: Connection) -> None:
+    from ..models.user import DeletedUser
+
+    DeletedUser.__table__.create(bind=connection, checkfirst=True)
+
+
+def _user_import_jobs(connection: Connection) -> None:
+    from ..models.user import UserImportJob
+
+    UserImportJob.__table__.create(bind=connection, checkfirst=True)
+
+
+def _process_leases(connection: Connection) -> None:
+    # apply_migration creates the table already; recorded so every database at
+    # this version has it for the maintenance tasks in app.main
+    process_leases.create(bind=connection, checkfirst=True)
+
+
+def _user_lower_indexes(target_engine: Engine) -> None:
+    from ..models.user import User
+
+    create_indexes(
+        target_engine,
+        [index for index in User.__table__.indexes if index.name in ("ix_users_email_lower", "ix_users_username_lower")],
+    )
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Baseline schema", _baseline),
+    Migration(2, "Hot-path composite indexes", _hot_path_indexes, online=True),
+    # Blocking: every users SELECT names the column, but ADD COLUMN is O(1)
+    Migration(3, "User token_version for access token revocation", _user_token_version),
+    Migration(4, "Revoked token version index", _revoked_token_index, online=True),
+    Migration(5, "Course full-text search index", _course_search_index, online=True, backfill=_course_search_rebuild),
+    # Blocking: create_course/update_course write tags as soon as the app serves
+    Migration(6, "Normalized course tags", _course_tags, backfill=_course_tags_backfill),
+    # Blocking, backfill included: progress deltas applied to unfilled zero
+    # counters would mark half-done enrollments completed
+    Migration(7, "Enrollment lesson counters", _enrollment_progress_counters, backfill=_enrollment_progress_backfill),
+    # Blocking: delete_user and the revocation loader use the table as soon as the app serves
+    Migration(8, "Deleted user tombstones for token revocation", _deleted_users),
+    # Blocking: the import endpoint records jobs as soon as the app serves
+    Migration(9, "Bulk user import jobs", _user_import_jobs),
+    Migration(10, "Case-insensitive user email and username indexes", _user_lower_indexes, online=True),
+    # Blocking: the progress reconciler takes its lease as soon as the app serves
+    Migration(11, "Process leases for single-worker maintenance", _process_leases),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# --- Runner ---------------------------------------------------------------------
+
+
+def get_applied_versions(target_engine: Engine = None) -> Set[int]:
+    """
+    Return the recorded migration versions (empty for an unmanaged database)
+    """
+    target_engine = target_engine or default_engine
+    try:
+        with target_engine.connect() as connection:
+            return set(connection.exec_driver_sql("SELECT version FROM schema_migrations").scalars())
+    except (OperationalError, ProgrammingError):
+        return set()
+
+
+def schema_version(applied: Set[int]) -> int:
+    # Online migrations can finish after later blocking ones, so versions may
+    # be recorded out of order; the schema version is the last gap-free one
+    version = 0
+    for migration in MIGRATIONS:
+        if migration.version not in applied:
+            break
+        version = migration.version
+    return version
+
+
+def get_schema_version(target_engine: Engine = None) -> int:
+    """
+    Return the highest version up to which every migration is applied (0 for an unmanaged database)
+    """
+    return schema_version(get_applied_versions(target_engine))
+
+
+@contextmanager
+def _write_transaction(target_engine: Engine) -> Iterator[Connection]:
+    """
+    Transaction that takes the write lock up front.
+
+    On SQLite a plain BEGIN defers locking until the first write, so two
+    workers could both decide a migration is pending; BEGIN IMMEDIATE
+    serializes them and the loser re-reads the version after the winner commits.
+    """
+    if target_engine.dialect.name != "sqlite":
+        with target_engine.begin() as connection:
+            yield connection
+        return
+
+    with target_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except Exception:
+            connection.exec_driver_sql("ROLLBACK")
+            raise
+        connection.exec_driver_sql("COMMIT")
+
+
+def apply_migration(migration: Migration, target_engine: Engine = None) -> bool:
+    """
+    Apply a single migration unless another worker already did
+    """
+    target_engine = target_engine or default_engine
+    # Under the write lock: workers booting together on a new file would race CREATE TABLE
+    with _write_transaction(target_engine) as connection:
+        migration_metadata.create_all(bind=connection)
+        process_leases.create(bind=connection, checkfirst=True)
+    started = time.perf_counter()
+
+    def _is_applied(connection: Connection) -> bool:
+        return connection.execute(
+            schema_migrations.select().where(schema_migrations.c.version == migration.version)
+        ).first() is not None
+
+    def _record(connection: Connection) -> None:
+        connection.execute(
+            schema_migrations.insert().values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.utcnow(),
+            )
+        )
+
+    def _applied() -> bool:
+        with target_engine.connect() as connection:
+            return _is_applied(connection)
+
+    if not migration.online:
+        with _write_transaction(target_engine) as connection:
+            if _is_applied(connection):
+                return False
+            migration.upgrade(connection)
+            if migration.backfill is None:
+                _record(connection)
+
+    if migration.online or migration.backfill is not None:
+        # Every booting worker gets here; one does the slow part, the others
+        # wait for it to record the version (or for its lease to expire)
+        lease = f"migration-{migration.version}"
+        while not acquire_lease(target_engine, lease, MIGRATION_LEASE_SECONDS):
+            if _applied():
+                return False
+            time.sleep(MIGRATION_LEASE_POLL_SECONDS)
+        with keep_lease(target_engine, lease, MIGRATION_LEASE_SECONDS):
+            if _applied():
+                return False
+            if migration.online:
+                migration.upgrade(target_engine)
+            if migration.backfill is not None:
+                migration.backfill(target_engine)
+            with _write_transaction(target_engine) as connection:
+                if _is_applied(connection):
+                    return False
+                _record(connection)
+
+    logger.info(
+        f"Applied migration {migration.version} ({migration.description}) "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return True
+
+
+def pending_migrations(applied: Set[int]) -> List[Migration]:
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+
+def _startup_migrations(pending: List[Migration]) -> List[Migration]:
+    """
+    The pending migrations a worker must apply before serving: every blocking
+    one plus the online migrations they require, transitively
+    """
+    by_version = {m.version: m for m in pending}
+    needed = {m.version for m in pending if not m.online}
+    stack = list(needed)
+    while stack:
+        for version in by_version[stack.pop()].requires:
+            if version in by_version and version not in needed:
+                needed.add(version)
+                stack.append(version)
+    return [m for m in pending if m.version in needed]
+
+
+def upgrade(target_engine: Engine = None, target_version: Optional[int] = None) -> int:
+    """
+    Apply all pending migrations in order and return the resulting version
+    """
+    target_engine = target_engine or default_engine
+    for migration in pending_migrations(get_applied_versions(target_engine)):
+        if target_version is not None and migration.version > target_version:
+            break
+        apply_migration(migration, target_engine)
+    return get_schema_version(target_engine)
+
+
+def run_startup_migrations(target_engine: Engine = None, auto_migrate: bool = True) -> int:
+    """
+    Bring the schema up to date at worker startup.
+
+    When the schema is current this is a single version query. Blocking
+    migrations (and any online migration one of them requires) run inline;
+    all other online migrations are handed to a background thread, even
+    ones numbered below a blocking migration, so the worker can start
+    serving immediately.
+    """
+    target_engine = target_engine or default_engine
+    applied = get_applied_versions(target_engine)
+    current_version = schema_version(applied)
+    pending = pending_migrations(applied)
+
+    if not pending:
+        return current_version
+
+    if not auto_migrate:
+        logger.warning(
+            f"Database schema is at version {current_version}, latest is {LATEST_VERSION}; "
+            f"run 'python -m app.db.migrations upgrade'"
+        )
+        return current_version
+
+    inline = _startup_migrations(pending)
+    for migration in inline:
+        apply_migration(migration, target_engine)
+
+    online = [m for m in pending if m not in inline]
+    if online:
+        def _run_online():
+            for migration in online:
+                try:
+                    apply_migration(migration, target_engine)
+                except Exception as e:
+                    logger.error(f"Online migration {migration.version} failed: {e}")
+                    return
+
+        threading.Thread(target=_run_online, name="online-migrations", daemon=True).start()
+        logger.info(f"Running {len(online)} online migration(s) in the background")
+
+    return get_schema_version(target_engine)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+
+    if command == "upgrade":
+        print(f"Schema version: {upgrade()}")
+    elif command == "status":
+        applied = get_applied_versions()
+        print(f"Schema version: {schema_version(applied)} (latest {LATEST_VERSION})")
+        for migration in pending_migrations(applied):
+            print(f"  pending: {migration.version} {migration.description}{' [online]' if migration.online else ''}")
+    else:
+        print("Usage: python -m app.db.migrations [status|upgrade]")
+        sys.exit(1)
@@ -0,0 +1,147 @@
+"""
+Per-request SQL statement counting and N+1 detection.
+
+Every engine built by app.db.database is instrumented. The middleware in
+app.core.middleware opens a QueryStats for each request; statements executed
+while handling it (on the event loop or in the threadpool, which copies the
+context) are counted against it. Statements repeated at least
+DB_N_PLUS_ONE_THRESHOLD times in one request are logged as N+1 suspects.
+
+Tests can assert on statement counts with query_budget():
+
+    with query_budget(3) as stats:
+        client.get("/api/v1/users/profile/dashboard", headers=headers)
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional, Set, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    __slots__ = ("_route", "count", "total_time", "statements")
+
+    def __init__(self, route: Union[str, Callable[[], str], None] = None):
+        # A callable is resolved when read, e.g. the route template once routing matched
+        self._route = route
+        self.count = 0
+        self.total_time = 0.0
+        self.statements: Counter = Counter()
+
+    @property
+    def route(self) -> Optional[str]:
+        return self._route() if callable(self._route) else self._route
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.statements[statement] += 1
+
+    def repeated_statements(self, threshold: int) -> List[tuple]:
+        return [(s, n) for s, n in self.statements.most_common() if n >= threshold]
+
+
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+
+# Budgets are global rather than context-bound so that a test thread can
+# observe statements executed by the app running in TestClient's thread
+_budgets: Set[QueryStats] = set()
+_budgets_lock = threading.Lock()
+
+# Callbacks invoked with (connection, statement, parameters, duration, executemany)
+# after every timed statement, e.g. the slow query recorder
+_statement_listeners: List[Callable] = []
+
+
+def add_statement_listener(listener: Callable) -> None:
+    _statement_listeners.append(listener)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _request_stats.get()
+
+
+@contextmanager
+def track_request(route: Union[str, Callable[[], str], None] = None) -> Iterator[QueryStats]:
+    """
+    Count statements executed in this context (and threads copying it) until the block exits
+    """
+    stats = QueryStats(route)
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+def log_n_plus_one_suspects(stats: QueryStats, threshold: int) -> None:
+    for statement, count in stats.repeated_statements(threshold):
+        logger.warning(
+            f"N+1 suspect on {stats.route}: statement executed {count}x: {' '.join(statement.split())[:300]}"
+        )
+
+
+def instrument_engine(target_engine: Engine) -> None:
+    """
+    Attach statement timing hooks to an engine (use engine.sync_engine for async engines)
+    """
+
+    @event.listens_for(target_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(target_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_start_time"].pop()
+
+        # Diagnostic statements (e.g. EXPLAIN for the slow query log) are not app traffic
+        if conn.info.get("diagnostic_query"):
+            return
+
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.record(statement, duration)
+
+        if _budgets:
+            with _budgets_lock:
+                for budget in _budgets:
+                    budget.record(statement, duration)
+
+        for listener in _statement_listeners:
+            listener(conn, statement, parameters, duration, executemany)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(max_queries: int, route: Optional[str] = None) -> Iterator[QueryStats]:
+    """
+    Fail with QueryBudgetExceeded if more than max_queries statements run inside the block
+    """
+    stats = QueryStats(route)
+    with _budgets_lock:
+        _budgets.add(stats)
+    try:
+        yield stats
+    finally:
+        with _budgets_lock:
+            _budgets.discard(stats)
+
+    if stats.count > max_queries:
+        repeated = "\n".join(
+            f"  {n}x {' '.join(s.split())[:200]}" for s, n in stats.repeated_statements(2)
+        )
+        raise QueryBudgetExceeded(
+            f"Expected at most {max_queries} queries, {stats.count} were executed"
+            + (f"; repeated statements:\n{repeated}" if repeated else "")
+        )
@@ -0,0 +1,204 @@
+"""
+Read-only replica engine and read/write session routing.
+
+READ_REPLICA_MODE selects where read-only traffic goes:
+
+- ``none``: reads use the primary engine (previous behaviour)
+- ``readonly``: a separate ``mode=ro`` engine/pool on the primary SQLite file.
+  Under WAL readers never block the writer, so this is always fresh.
+- ``snapshot``: a copy of the primary file taken with the SQLite backup API
+  at least READ_REPLICA_REFRESH_SECONDS apart. The interval stretches with the
+  time a copy takes (i.e. with the file size), so copying never uses more than
+  READ_REPLICA_MAX_COPY_SHARE of the time. Reads fall back to the primary
+  whenever the copy is older than READ_REPLICA_MAX_STALENESS_SECONDS.
+
+READ_REPLICA_URL points the replica engine at any other database (e.g. a
+streaming Postgres replica) and is treated like ``readonly``.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..core.config import settings
+from .database import SessionLocal, build_engine, engine_profile, is_sqlite_url
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = {"GET", "HEAD"}
+
+
+def _sqlite_path(url: str) -> Optional[str]:
+    if not is_sqlite_url(url):
+        return None
+    return make_url(url).database
+
+
+def _readonly_url(path: str) -> str:
+    return f"sqlite:///file:{os.path.abspath(path)}?mode=ro&uri=true"
+
+
+class ReadReplica:
+    def __init__(self, mode: str, max_staleness_seconds: float, refresh_seconds: float,
+                 max_copy_share: float = 0.1):
+        if mode not in ("none", "readonly", "snapshot"):
+            raise ValueError(f"Unknown READ_REPLICA_MODE '{mode}', expected none, readonly or snapshot")
+
+        self.mode = mode
+        self.max_staleness_seconds = max_staleness_seconds
+        self.refresh_seconds = refresh_seconds
+        self.max_copy_share = max_copy_share
+        self.copy_seconds = 0.0
+        self.refreshed_at: Optional[float] = None
+        self.engine: Optional[Engine] = None
+        self.session_factory: Optional[sessionmaker] = None
+        self._primary_path = _sqlite_path(settings.DATABASE_URL)
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        url = None
+        if settings.READ_REPLICA_URL:
+            url = settings.READ_REPLICA_URL
+            self.mode = "readonly"
+        elif mode == "readonly" and self._primary_path:
+            url = _readonly_url(self._primary_path)
+        elif mode == "snapshot" and self._primary_path:
+            url = _readonly_url(settings.READ_REPLICA_PATH)
+        elif mode != "none":
+            logger.warning(f"READ_REPLICA_MODE={mode} needs a SQLite DATABASE_URL; reads use the primary")
+            self.mode = "none"
+
+        if url:
+            # The replica cannot change journal mode or durability, only read
+            profile = dict(engine_profile, journal_mode=None, synchronous=None)
+            self.engine = build_engine(url, profile, name="replica")
+            self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+    @property
+    def staleness_seconds(self) -> Optional[float]:
+        if self.mode != "snapshot":
+            return 0.0
+        if self.refreshed_at is None:
+            return None
+        return time.monotonic() - self.refreshed_at
+
+    def is_fresh(self) -> bool:
+        if self.session_factory is None:
+            return False
+        staleness = self.staleness_seconds
+        return staleness is not None and staleness <= self.max_staleness_seconds
+
+    def refresh(self) -> None:
+        """
+        Copy the primary into the snapshot file and swap it in atomically
+        """
+        if self.mode != "snapshot" or not self._primary_path:
+            return
+
+        with self._refresh_lock:
+            started = time.monotonic()
+            tmp_path = f"{settings.READ_REPLICA_PATH}.tmp"
+            source = sqlite3.connect(self._primary_path)
+            target = sqlite3.connect(tmp_path)
+            try:
+                # One step: a stepwise backup restarts whenever the primary is
+                # written between steps, so under steady writes it may never finish.
+                # A single step reads one consistent WAL snapshot without blocking writers.
+                source.backup(target, pages=-1)
+                target.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                target.close()
+                source.close()
+
+            os.replace(tmp_path, settings.READ_REPLICA_PATH)
+            # Pooled connections still point at the replaced file
+            self.engine.dispose()
+            self.refreshed_at = started
+            self.copy_seconds = time.monotonic() - started
+
+        logger.debug(f"Read replica refreshed in {self.copy_seconds:.3f}s")
+
+    def next_interval(self) -> float:
+        """
+        Seconds until the next refresh, stretched so copying stays within max_copy_share
+        """
+        if self.max_copy_share <= 0:
+            return self.refresh_seconds
+        return max(self.refresh_seconds, self.copy_seconds / self.max_copy_share)
+
+    def start(self) -> None:
+        if self.mode != "snapshot" or self._thread is not None:
+            return
+
+        self.refresh()
+
+        def _run():
+            warned = False
+            while not self._stop.wait(self.next_interval()):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error(f"Read replica refresh failed: {e}")
+                if not warned and self.next_interval() > self.max_staleness_seconds:
+                    warned = True
+                    logger.warning(
+                        f"Read replica copies take {self.copy_seconds:.1f}s, so refreshes are "
+                        f"{self.next_interval():.0f}s apart, beyond READ_REPLICA_MAX_STALENESS_SECONDS; "
+                        f"reads will often fall back to the primary (consider READ_REPLICA_MODE=readonly)"
+                    )
+
+        self._thread = threading.Thread(target=_run, name="read-replica-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.engine is not None:
+            self.engine.dispose()
+
+    def session(self) -> Session:
+        """
+        Session on the replica, or on the primary when the replica is unavailable or too stale
+        """
+        if self.is_fresh():
+            return self.session_factory()
+        return SessionLocal()
+
+
+read_replica = ReadReplica(
+    settings.READ_REPLICA_MODE,
+    max_staleness_seconds=settings.READ_REPLICA_MAX_STALENESS_SECONDS,
+    refresh_seconds=settings.READ_REPLICA_REFRESH_SECONDS,
+    max_copy_share=settings.READ_REPLICA_MAX_COPY_SHARE,
+)
+
+
+def get_read_db():
+    db = read_replica.session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_routed_db(request: Request):
+    """
+    Route GET/HEAD handlers to the read replica and everything else to the primary
+    """
+    if request.method in READ_METHODS:
+        db = read_replica.session()
+    else:
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
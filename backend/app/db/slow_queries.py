@@ -0,0 +1,124 @@
+"""
+Opt-in slow query log.
+
+When SLOW_QUERY_LOG_ENABLED is set, every statement slower than
+SLOW_QUERY_THRESHOLD_MS is recorded with its redacted parameters, duration,
+originating route and (on SQLite) its EXPLAIN QUERY PLAN. Entries go to a
+rotating JSONL file and to an in-memory ring buffer served by the admin API.
+"""
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import date, datetime
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+from ..core.config import settings
+from .query_stats import add_statement_listener, current_stats
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE_PREFIXES = ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")
+
+
+def redact_parameter(value: Any) -> Any:
+    """
+    Keep numbers, booleans, NULLs and dates (useful for plans); hide everything else
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, str):
+        return f"<str len={len(value)}>"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<bytes len={len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact_parameters(parameters: Any) -> Any:
+    if isinstance(parameters, dict):
+        return {key: redact_parameter(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact_parameter(value) for value in parameters]
+    return redact_parameter(parameters)
+
+
+class SlowQueryRecorder:
+    def __init__(self, threshold_ms: float, buffer_size: int, log_path: Optional[str]):
+        self.threshold_seconds = threshold_ms / 1000
+        self._entries: deque = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._file_logger: Optional[logging.Logger] = None
+
+        if log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+            handler = RotatingFileHandler(
+                log_path,
+                maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+                backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._file_logger = logging.getLogger(f"{__name__}.file")
+            self._file_logger.addHandler(handler)
+            self._file_logger.setLevel(logging.INFO)
+            self._file_logger.propagate = False
+
+    def explain(self, connection, statement: str, parameters: Any) -> Optional[List[str]]:
+        if connection.dialect.name != "sqlite":
+            return None
+        if not statement.lstrip().upper().startswith(EXPLAINABLE_PREFIXES):
+            return None
+
+        connection.info["diagnostic_query"] = True
+        try:
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            return [row[-1] for row in rows]
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+        finally:
+            connection.info["diagnostic_query"] = False
+
+    def on_statement(self, connection, statement, parameters, duration, executemany) -> None:
+        if duration < self.threshold_seconds:
+            return
+
+        stats = current_stats()
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "duration_ms": round(duration * 1000, 3),
+            "route": stats.route if stats is not None else None,
+            "statement": " ".join(statement.split()),
+            # executemany batches can be huge; the first row is representative
+            "parameters": redact_parameters(parameters[0] if executemany and parameters else parameters),
+            "executemany": bool(executemany),
+            "query_plan": None if executemany else self.explain(connection, statement, parameters),
+        }
+
+        with self._lock:
+            self._entries.append(entry)
+        if self._file_logger is not None:
+            self._file_logger.info(json.dumps(entry, default=str))
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._entries)
+        return list(reversed(entries))[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_recorder: Optional[SlowQueryRecorder] = None
+
+if settings.SLOW_QUERY_LOG_ENABLED:
+    slow_query_recorder = SlowQueryRecorder(
+        threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+        buffer_size=settings.SLOW_QUERY_BUFFER_SIZE,
+        log_path=settings.SLOW_QUERY_LOG_PATH,
+    )
+    add_statement_listener(slow_query_recorder.on_statement)
+    logger.info(f"Slow query log enabled (threshold {settings.SLOW_QUERY_THRESHOLD_MS}ms)")
@@ -0,0 +1,74 @@
+"""
+Write-behind buffer for users.last_login.
+
+Logins record their timestamp here instead of committing an UPDATE, so a
+login is a read-only transaction and never queues on SQLite's single writer
+behind enrollments. A lifespan task flushes the coalesced timestamps (one per
+user, the latest wins) in a single executemany UPDATE every
+LAST_LOGIN_FLUSH_SECONDS, and once more at shutdown. A crash loses at most one
+interval of last_login values.
+"""
+import logging
+import threading
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import bindparam, or_, update
+from sqlalchemy.engine import Engine
+
+from ..core.user_cache import user_cache
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginBuffer:
+    def __init__(self):
+        self._pending: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+
+    def record(self, user_id: int, timestamp: datetime) -> None:
+        with self._lock:
+            current = self._pending.get(user_id)
+            if current is None or timestamp > current:
+                self._pending[user_id] = timestamp
+
+    def flush(self, target_engine: Engine) -> int:
+        """
+        Write all buffered timestamps in one transaction; return the number of users
+        """
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+
+        statement = (
+            update(User)
+            .where(User.id == bindparam("user_id"))
+            # Never move last_login backwards if another worker flushed a newer one
+            .where(or_(User.last_login.is_(None), User.last_login < bindparam("timestamp")))
+            .values(last_login=bindparam("timestamp"))
+        )
+        try:
+            with target_engine.begin() as connection:
+                connection.execute(
+                    statement,
+                    [{"user_id": user_id, "timestamp": timestamp} for user_id, timestamp in batch.items()],
+                )
+        except Exception:
+            # Put the batch back (newer in-memory values win) and retry next interval
+            with self._lock:
+                for user_id, timestamp in batch.items():
+                    if user_id not in self._pending or self._pending[user_id] < timestamp:
+                        self._pending[user_id] = timestamp
+            raise
+
+        for user_id in batch:
+            user_cache.invalidate(user_id)
+        return len(batch)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+last_login_buffer = LastLoginBuffer()
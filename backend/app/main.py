@@ -1,10 +1,23 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
+from anyio import to_thread
+from sqlalchemy import select, text
+from datetime import datetime, timedelta
+import asyncio
 from .core.config import settings
-from .db.database import engine
-from .models import user, course, mentor, payment, podcast
+from .core.security import PasswordHashQueueFull, password_hasher, token_revocations
+from .core.metrics import registry, THREADPOOL_TOKENS
+from .core.middleware import RequestInstrumentationMiddleware
+from .db.database import engine, async_engine, get_effective_engine_settings
+from .db.leases import acquire_lease
+from .db.migrations import run_startup_migrations
+from .db.replica import read_replica
+from .db.write_behind import last_login_buffer
+from .services.progress import reconcile_progress_counters
+from .services.user_import import cancel_import_jobs
+from .models.user import DeletedUser, User
 from .api.endpoints import auth, users, courses
 import logging
 
@@ -13,6 +26,52 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def load_token_revocations():
+    """
+    Merge token_version bumps (covered by a partial index) and recent user deletions from the database
+    """
+    # Tokens issued before this have expired, so older deletions no longer matter
+    expired_before = datetime.utcnow() - timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(User.id, User.token_version).where(text("token_version > 0"))
+        ).all()
+        deleted = connection.execute(
+            select(DeletedUser.user_id, DeletedUser.deleted_at).where(DeletedUser.deleted_at >= expired_before)
+        ).all()
+    token_revocations.load(rows)
+    token_revocations.load_deleted(deleted, expired_before)
+
+
+async def refresh_token_revocations(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await to_thread.run_sync(load_token_revocations)
+        except Exception as e:
+            logger.warning(f"Error refreshing token revocations: {e}")
+
+
+async def reconcile_progress(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # Every worker wakes up; the lease lets one of them recount per interval
+            if await to_thread.run_sync(acquire_lease, engine, "progress-reconcile", interval):
+                await to_thread.run_sync(reconcile_progress_counters, engine)
+        except Exception as e:
+            logger.warning(f"Error reconciling progress counters: {e}")
+
+
+async def flush_last_logins(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await to_thread.run_sync(last_login_buffer.flush, engine)
+        except Exception as e:
+            logger.warning(f"Error flushing last_login updates: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -21,16 +80,45 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up TechStep API...")
     
-    # Create database tables
+    # Match the threadpool running sync endpoints to the DB pool sizing
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    
+    # Check schema version and apply pending migrations
     try:
-        user.Base.metadata.create_all(bind=engine)
-        course.Base.metadata.create_all(bind=engine)
-        mentor.Base.metadata.create_all(bind=engine)
-        payment.Base.metadata.create_all(bind=engine)
-        podcast.Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created successfully")
+        schema_version = run_startup_migrations(engine, auto_migrate=settings.DB_AUTO_MIGRATE)
+        logger.info(f"Database schema version {schema_version}")
     except Exception as e:
-        logger.error(f"Error creating database tables: {e}")
+        logger.error(f"Error migrating database schema: {e}")
+    
+    revocation_refresher = None
+    try:
+        load_token_revocations()
+        revocation_refresher = asyncio.create_task(
+            refresh_token_revocations(settings.TOKEN_REVOCATION_REFRESH_SECONDS)
+        )
+    except Exception as e:
+        logger.error(f"Error loading token revocations: {e}")
+    
+    last_login_flusher = asyncio.create_task(flush_last_logins(settings.LAST_LOGIN_FLUSH_SECONDS))
+    progress_reconciler = None
+    if settings.PROGRESS_RECONCILE_SECONDS > 0:
+        progress_reconciler = asyncio.create_task(reconcile_progress(settings.PROGRESS_RECONCILE_SECONDS))
+    
+    try:
+        password_hasher.start()
+    except Exception as e:
+        logger.error(f"Error starting password hash workers: {e}")
+    
+    try:
+        read_replica.start()
+        logger.info(f"Read replica mode: {read_replica.mode}")
+    except Exception as e:
+        logger.error(f"Error starting read replica: {e}")
+    
+    try:
+        logger.info(f"Database engine settings: {get_effective_engine_settings()}")
+    except Exception as e:
+        logger.error(f"Error reading database engine settings: {e}")
     
     logger.info("TechStep API started successfully!")
     
@@ -38,6 +126,20 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down TechStep API...")
+    if revocation_refresher is not None:
+        revocation_refresher.cancel()
+    last_login_flusher.cancel()
+    if progress_reconciler is not None:
+        progress_reconciler.cancel()
+    try:
+        flushed = last_login_buffer.flush(engine)
+        logger.info(f"Flushed {flushed} buffered last_login update(s)")
+    except Exception as e:
+        logger.error(f"Error flushing last_login updates: {e}")
+    read_replica.stop()
+    await cancel_import_jobs()
+    password_hasher.shutdown()
+    await async_engine.dispose()
 
 
 # Create FastAPI application
@@ -57,9 +159,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Catalog-Version"],
 )
 
 
+# Latency metrics and per-request SQL statement counting in one ASGI layer
+app.add_middleware(RequestInstrumentationMiddleware)
+
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -73,6 +180,31 @@ async def health_check():
     }
 
 
+@app.get("/health/db")
+def database_health_check():
+    """
+    Effective database engine profile, pool sizing and SQLite PRAGMAs
+    """
+    return get_effective_engine_settings()
+
+
+def collect_threadpool_metrics():
+    limiter = to_thread.current_default_thread_limiter()
+    THREADPOOL_TOKENS.set(limiter.total_tokens, state="total")
+    THREADPOOL_TOKENS.set(limiter.borrowed_tokens, state="borrowed")
+
+
+registry.add_collector(collect_threadpool_metrics)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus text-format metrics
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -98,6 +230,9 @@ app.include_router(courses.router, prefix=f"{settings.API_V1_STR}/courses", tags
 from .api.endpoints import payments
 app.include_router(payments.router, prefix=f"{settings.API_V1_STR}/payments", tags=["Payments"])
 
+from .api.endpoints import admin
+app.include_router(admin.router, prefix=f"{settings.API_V1_STR}/admin", tags=["Admin"])
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -108,6 +243,16 @@ async def global_exception_handler(request, exc):
     )
 
 
+@app.exception_handler(PasswordHashQueueFull)
+async def password_hash_queue_full_handler(request, exc):
+    logger.warning(f"Shedding {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,6 +1,6 @@
 # Import all models here for Alembic auto-generation
-from .user import User
-from .course import Course, CourseEnrollment, CourseProgress
+from .user import DeletedUser, User, UserImportJob
+from .course import Course, CourseEnrollment, CourseProgress, CourseTag
 from .mentor import Mentor, MentorBooking
 from .payment import Payment, Subscription
 from .podcast import Podcast, PodcastEpisode
\ No newline at end of file
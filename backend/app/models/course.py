@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum
@@ -25,6 +25,10 @@ class EnrollmentStatus(str, Enum):
 
 class Course(Base):
     __tablename__ = "courses"
+    __table_args__ = (
+        # get_courses: published catalog ordered by newest first
+        Index("ix_courses_status_created_at", "status", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False, index=True)
@@ -53,16 +57,50 @@ class Course(Base):
     
     # Relationships
     enrollments = relationship("CourseEnrollment", back_populates="course")
+    tag_index = relationship("CourseTag", cascade="all, delete-orphan")
+
+
+class CourseTag(Base):
+    """
+    Normalized copy of Course.tags (a JSON string) for indexed tag filters
+    """
+    __tablename__ = "course_tags"
+    __table_args__ = (
+        # tag filters: courses carrying a tag
+        Index("ix_course_tags_tag_course", "tag", "course_id"),
+    )
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String, primary_key=True)
+
+    @staticmethod
+    def normalize(tags) -> list:
+        """
+        Lower-cased, stripped, de-duplicated tags in their original order
+        """
+        normalized = []
+        for tag in tags or []:
+            tag = str(tag).strip().lower()
+            if tag and tag not in normalized:
+                normalized.append(tag)
+        return normalized
 
 
 class CourseEnrollment(Base):
     __tablename__ = "course_enrollments"
+    __table_args__ = (
+        # enroll_in_course duplicate check and per-user enrollment listings
+        Index("ix_course_enrollments_user_course", "user_id", "course_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
     status = Column(SQLEnum(EnrollmentStatus), default=EnrollmentStatus.ACTIVE, nullable=False)
     progress_percentage = Column(Float, default=0.0)
+    # Maintained with atomic deltas by progress writes; see services/progress.py
+    completed_lessons = Column(Integer, nullable=False, default=0, server_default="0")
+    total_lessons = Column(Integer, nullable=False, default=0, server_default="0")
     enrollment_date = Column(DateTime(timezone=True), server_default=func.now())
     completion_date = Column(DateTime(timezone=True), nullable=True)
     certificate_url = Column(String, nullable=True)
@@ -75,6 +113,10 @@ class CourseEnrollment(Base):
 
 class CourseProgress(Base):
     __tablename__ = "course_progress"
+    __table_args__ = (
+        # update_course_progress lesson lookup and per-enrollment counts
+        Index("ix_course_progress_enrollment_lesson", "enrollment_id", "lesson_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     enrollment_id = Column(Integer, ForeignKey("course_enrollments.id"), nullable=False)
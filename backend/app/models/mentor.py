@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum
@@ -54,9 +54,13 @@ class Mentor(Base):
 
 class MentorBooking(Base):
     __tablename__ = "mentor_bookings"
+    __table_args__ = (
+        # mentor schedule lookups ordered by session date
+        Index("ix_mentor_bookings_mentor_scheduled", "mentor_id", "scheduled_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     mentor_id = Column(Integer, ForeignKey("mentors.id"), nullable=False)
     session_title = Column(String, nullable=False)
     session_description = Column(Text, nullable=True)
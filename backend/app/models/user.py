@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Index, Enum as SQLEnum, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum
@@ -19,6 +19,13 @@ class UserStatus(str, Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # revocation loader: only users whose tokens were ever revoked
+        Index("ix_users_revoked_token_version", "id", "token_version", sqlite_where=text("token_version > 0")),
+        # case-insensitive existence checks (bulk import)
+        Index("ix_users_email_lower", func.lower(text("email"))),
+        Index("ix_users_username_lower", func.lower(text("username"))),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -36,9 +43,40 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     last_login = Column(DateTime(timezone=True), nullable=True)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped to revoke issued tokens
     
     # Relationships
     course_enrollments = relationship("CourseEnrollment", back_populates="user")
     mentor_bookings = relationship("MentorBooking", back_populates="user")
     payments = relationship("Payment", back_populates="user")
-    subscriptions = relationship("Subscription", back_populates="user")
\ No newline at end of file
+    subscriptions = relationship("Subscription", back_populates="user")
+
+
+class DeletedUser(Base):
+    """
+    Tombstone for a hard-deleted user, so every worker keeps rejecting the
+    claims tokens issued to that id until they expire
+    """
+    __tablename__ = "deleted_users"
+
+    user_id = Column(Integer, primary_key=True)
+    deleted_at = Column(DateTime, nullable=False, index=True)
+
+
+class UserImportJob(Base):
+    """
+    A bulk user import running in the background; the report is written when it finishes
+    """
+    __tablename__ = "user_import_jobs"
+
+    id = Column(String, primary_key=True)
+    status = Column(String, nullable=False, default="queued")  # queued, running, completed, failed
+    file_format = Column(String, nullable=False)
+    filename = Column(String, nullable=True)
+    created_by = Column(Integer, nullable=True)
+    totals = Column(Text, nullable=True)  # JSON, updated after every batch
+    report = Column(Text, nullable=True)  # JSON per-row results
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)  # heartbeat while running
+    finished_at = Column(DateTime, nullable=True)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 import json
 from ..models.course import CourseLevel, CourseStatus, EnrollmentStatus
@@ -77,6 +77,11 @@ class CourseResponse(CourseBase):
         from_attributes = True
 
 
+class CourseSearchResult(CourseResponse):
+    score: float
+    snippet: Optional[str] = None
+
+
 class CourseEnrollmentCreate(BaseModel):
     course_id: int
 
@@ -86,6 +91,8 @@ class CourseEnrollmentResponse(BaseModel):
     course_id: int
     status: EnrollmentStatus
     progress_percentage: float
+    completed_lessons: int = 0
+    total_lessons: int = 0
     enrollment_date: datetime
     completion_date: Optional[datetime] = None
     certificate_url: Optional[str] = None
@@ -101,4 +108,13 @@ class CourseProgressUpdate(BaseModel):
     completed: bool = False
     time_spent_minutes: int = 0
     quiz_score: Optional[float] = None
-    notes: Optional[str] = None
\ No newline at end of file
+    notes: Optional[str] = None
+
+
+class CourseProgressEvent(CourseProgressUpdate):
+    enrollment_id: int
+
+
+class CourseProgressBatch(BaseModel):
+    # Events are validated one by one so a bad event does not reject the batch
+    events: List[Dict[str, Any]] = Field(..., min_length=1, max_length=500)
@@ -22,6 +22,8 @@ class UserUpdate(BaseModel):
     linkedin_url: Optional[str] = None
     github_url: Optional[str] = None
     avatar_url: Optional[str] = None
+    role: Optional[UserRole] = None  # admin only
+    status: Optional[UserStatus] = None  # admin only
 
 
 class UserResponse(UserBase):
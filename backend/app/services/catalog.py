@@ -0,0 +1,237 @@
+"""
+Immutable in-memory snapshot of the published course catalog.
+
+get_courses serves the homepage listing from a CatalogSnapshot instead of
+querying and re-serializing every published course per request. Each entry
+holds the course's CourseResponse JSON, encoded once when the snapshot is
+built, plus the few fields the level, featured, tag and search filters need.
+Per-level and per-tag lists and the unfiltered facet counts are built with
+the snapshot, so filtering by them never scans the whole catalog.
+
+create_course, update_course and delete_course rebuild the snapshot after
+they commit. Counters that change outside those endpoints (enrollment_count,
+ratings) and writes made through other worker processes are picked up once
+the snapshot is older than CATALOG_MAX_AGE_SECONDS.
+
+The version is derived from the catalog content, so every worker holding the
+same catalog reports the same X-Catalog-Version and listing ETag; each entry
+has its own content digest for the course detail ETag.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.encoding import dumps
+from ..core.metrics import CATALOG_REBUILDS
+from ..db.database import AsyncSessionLocal
+from ..models.course import Course, CourseStatus, CourseTag
+from ..schemas.course import CourseResponse
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (exclusive) of the price facet bands; 0 is "free"
+PRICE_BANDS = ((50, "under_50"), (100, "50_to_100"), (200, "100_to_200"))
+PRICE_BAND_TOP = "200_plus"
+PRICE_BAND_LABELS = ("free", *(label for _, label in PRICE_BANDS), PRICE_BAND_TOP)
+
+CATALOG_QUERY = (
+    select(Course)
+    .where(Course.status == CourseStatus.PUBLISHED)
+    .order_by(Course.created_at.desc(), Course.id.desc())
+)
+
+
+class CatalogEntry:
+    __slots__ = ("id", "level", "is_featured", "price", "tags", "search_text", "sort_key", "body", "digest")
+
+    def __init__(self, course: Course):
+        self.id = course.id
+        # (created_at, id), the listing order and the keyset cursor
+        self.sort_key = (course.created_at or datetime.min, course.id)
+        self.level = course.level.value if course.level is not None else None
+        self.is_featured = bool(course.is_featured)
+        self.price = course.price or 0.0
+        response = CourseResponse.from_orm(course)
+        self.tags = frozenset(CourseTag.normalize(response.tags))
+        # Same fields get_courses used to ILIKE; NUL keeps matches inside one field
+        self.search_text = "\0".join(
+            (value or "").lower() for value in (course.title, course.description, course.instructor_name)
+        )
+        # Rendered once per rebuild; responses concatenate these bytes
+        self.body = dumps(response.model_dump(mode="json"))
+        # Content digest: the course detail ETag and the input to the catalog version
+        self.digest = hashlib.blake2b(self.body, digest_size=8).hexdigest()
+
+
+def price_band(price: float) -> str:
+    if price <= 0:
+        return "free"
+    for upper, label in PRICE_BANDS:
+        if price < upper:
+            return label
+    return PRICE_BAND_TOP
+
+
+def count_facets(entries: Sequence[CatalogEntry]) -> Dict[str, object]:
+    levels, tags, prices = Counter(), Counter(), Counter()
+    for entry in entries:
+        levels[entry.level] += 1
+        tags.update(entry.tags)
+        prices[price_band(entry.price)] += 1
+    return {
+        "total": len(entries),
+        "level": dict(levels.most_common()),
+        "tags": dict(sorted(tags.items(), key=lambda item: (-item[1], item[0]))),
+        "price": {band: prices[band] for band in PRICE_BAND_LABELS if prices[band]},
+    }
+
+
+class CatalogSnapshot:
+    __slots__ = ("version", "built_at", "entries", "by_id", "by_level", "by_tag", "featured", "facet_counts")
+
+    def __init__(self, entries: Sequence[CatalogEntry]):
+        # Sorted here rather than trusting SQL order: SQLite compares created_at as
+        # text, and rows written by CURRENT_TIMESTAMP and by Python differ in format
+        self.entries: Tuple[CatalogEntry, ...] = tuple(sorted(entries, key=lambda e: e.sort_key, reverse=True))
+        self.built_at = time.monotonic()
+        self.by_id = {entry.id: entry for entry in self.entries}
+        by_level: Dict[str, List[CatalogEntry]] = {}
+        for entry in self.entries:
+            by_level.setdefault(entry.level, []).append(entry)
+        self.by_level = {level: tuple(items) for level, items in by_level.items()}
+        by_tag: Dict[str, List[CatalogEntry]] = {}
+        for entry in self.entries:
+            for tag in entry.tags:
+                by_tag.setdefault(tag, []).append(entry)
+        self.by_tag = {tag: tuple(items) for tag, items in by_tag.items()}
+        self.featured = tuple(entry for entry in self.entries if entry.is_featured)
+        # Unfiltered facets are computed once per rebuild, not per request
+        self.facet_counts = count_facets(self.entries)
+        digest = hashlib.blake2b(digest_size=6)
+        for entry in self.entries:
+            digest.update(entry.digest.encode())
+        self.version = int.from_bytes(digest.digest(), "big")
+
+    def query(self, search: Optional[str] = None, level: Optional[str] = None,
+              featured: Optional[bool] = None, tags: Optional[Sequence[str]] = None,
+              tags_mode: str = "any") -> Sequence[CatalogEntry]:
+        """
+        Published courses matching the filters, newest first. tags_mode "all"
+        requires every tag, "any" at least one
+        """
+        wanted = set(CourseTag.normalize(tags))
+        if wanted:
+            if tags_mode == "all":
+                # Walk the rarest tag's courses and check the rest
+                rarest = min((self.by_tag.get(tag, ()) for tag in wanted), key=len)
+                entries = [entry for entry in rarest if wanted <= entry.tags]
+            else:
+                matched = {entry.id: entry for tag in wanted for entry in self.by_tag.get(tag, ())}
+                entries = sorted(matched.values(), key=lambda e: e.sort_key, reverse=True)
+            if level:
+                entries = [entry for entry in entries if entry.level == level]
+        elif level:
+            entries = self.by_level.get(level, ())
+        elif featured:
+            entries = self.featured
+        else:
+            entries = self.entries
+
+        if featured is not None:
+            entries = [entry for entry in entries if entry.is_featured == featured]
+        if search:
+            needle = search.lower()
+            entries = [entry for entry in entries if needle in entry.search_text]
+        return entries
+
+    def facets(self, entries: Optional[Sequence[CatalogEntry]] = None) -> Dict[str, object]:
+        """
+        Counts per level, tag and price band, for the whole catalog or a filtered result
+        """
+        return self.facet_counts if entries is None else count_facets(entries)
+
+    @staticmethod
+    def after(entries: Sequence[CatalogEntry], sort_key: Tuple[datetime, int]) -> Sequence[CatalogEntry]:
+        """
+        The entries following sort_key in newest-first order (binary search)
+        """
+        low, high = 0, len(entries)
+        while low < high:
+            middle = (low + high) // 2
+            if entries[middle].sort_key < sort_key:
+                high = middle
+            else:
+                low = middle + 1
+        return entries[low:]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class CourseCatalog:
+    def __init__(self, max_age_seconds: float):
+        self.max_age_seconds = max_age_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = asyncio.Lock()
+        # Bumped by every rebuild; a load that raced with one is not installed
+        self._generation = 0
+
+    def _fresh(self) -> Optional[CatalogSnapshot]:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.built_at < self.max_age_seconds:
+            return snapshot
+        return None
+
+    def _install(self, snapshot: CatalogSnapshot, generation: int) -> CatalogSnapshot:
+        with self._lock:
+            if generation == self._generation:
+                self._snapshot = snapshot
+                return snapshot
+        return self._snapshot or snapshot
+
+    async def get(self) -> CatalogSnapshot:
+        """
+        The current snapshot, loading it first if missing or too old
+        """
+        snapshot = self._fresh()
+        if snapshot is not None:
+            return snapshot
+        async with self._refresh_lock:
+            snapshot = self._fresh()
+            if snapshot is not None:
+                return snapshot
+            generation = self._generation
+            async with AsyncSessionLocal() as db:
+                courses = (await db.execute(CATALOG_QUERY)).scalars().all()
+                snapshot = CatalogSnapshot([CatalogEntry(course) for course in courses])
+            CATALOG_REBUILDS.inc(reason="expired")
+            return self._install(snapshot, generation)
+
+    def rebuild(self, db: Session) -> None:
+        """
+        Reload the snapshot after a committed course write
+        """
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._snapshot = None
+        try:
+            courses = db.execute(CATALOG_QUERY).scalars().all()
+            self._install(CatalogSnapshot([CatalogEntry(course) for course in courses]), generation)
+            CATALOG_REBUILDS.inc(reason="write")
+        except Exception as e:
+            # The snapshot stays cleared, so the next read loads it
+            logger.error(f"Error rebuilding course catalog: {e}")
+
+
+course_catalog = CourseCatalog(settings.CATALOG_MAX_AGE_SECONDS)
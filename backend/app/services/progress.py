@@ -0,0 +1,189 @@
+"""
+Lesson progress counters on course enrollments.
+
+CourseEnrollment.total_lessons and completed_lessons count the enrollment's
+course_progress rows (all / completed). Progress writes adjust them with a
+single UPDATE ... SET total_lessons = total_lessons + :delta that also
+recomputes progress_percentage, and only when a row is created or its
+completed flag actually flips, so a progress write costs O(1) instead of
+two COUNT(*) queries over the enrollment's lessons.
+
+Deltas can drift (concurrent flips of the same lesson, rows written outside
+the API), so reconcile_progress_counters() recounts in batches of enrollment
+ids and repairs only rows that disagree. The app runs it every
+PROGRESS_RECONCILE_SECONDS, in one worker per interval (see app.db.leases).
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import case, tuple_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from ..models.course import CourseEnrollment, CourseProgress, EnrollmentStatus
+from ..schemas.course import CourseProgressEvent
+
+logger = logging.getLogger(__name__)
+
+COUNT_TOTAL = "(SELECT COUNT(*) FROM course_progress p WHERE p.enrollment_id = course_enrollments.id)"
+COUNT_COMPLETED = (
+    "(SELECT COUNT(*) FROM course_progress p WHERE p.enrollment_id = course_enrollments.id AND p.completed)"
+)
+
+
+def completion_delta(was_completed: Optional[bool], completed: bool) -> Tuple[int, int]:
+    """
+    (total delta, completed delta) for a progress row going from was_completed
+    (None when the row is new) to completed
+    """
+    if was_completed is None:
+        return 1, int(bool(completed))
+    return 0, int(bool(completed)) - int(bool(was_completed))
+
+
+def apply_progress_delta(db: Session, enrollment: CourseEnrollment, total_delta: int, completed_delta: int) -> None:
+    """
+    Atomically shift the enrollment's counters and percentage in the current
+    transaction, completing the enrollment when it reaches 100%
+    """
+    if not total_delta and not completed_delta:
+        return
+
+    total = CourseEnrollment.total_lessons + total_delta
+    completed = CourseEnrollment.completed_lessons + completed_delta
+    # SET expressions see the pre-update row, so all three use the same counters
+    row = db.execute(
+        update(CourseEnrollment)
+        .where(CourseEnrollment.id == enrollment.id)
+        .values(
+            total_lessons=total,
+            completed_lessons=completed,
+            progress_percentage=case(
+                (total > 0, completed * 100.0 / total), else_=CourseEnrollment.progress_percentage
+            ),
+        )
+        .returning(CourseEnrollment.total_lessons, CourseEnrollment.completed_lessons,
+                   CourseEnrollment.progress_percentage)
+        .execution_options(synchronize_session=False)
+    ).one()
+    for name, value in zip(("total_lessons", "completed_lessons", "progress_percentage"), row):
+        set_committed_value(enrollment, name, value)
+
+    # Mark course as completed if 100% progress
+    if row.total_lessons > 0 and row.progress_percentage >= 100 and enrollment.status != EnrollmentStatus.COMPLETED:
+        enrollment.status = EnrollmentStatus.COMPLETED
+        enrollment.completion_date = datetime.utcnow()
+
+
+def ingest_progress_events(db: Session, user_id: int, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Apply a batch of lesson progress events for one user in the current
+    transaction and return per-event results.
+
+    Ownership of every referenced enrollment is checked with one query, the
+    existing progress rows with another; new rows are flushed as one batched
+    INSERT and changed rows as batched UPDATEs, and each affected enrollment
+    gets a single counter update however many of its lessons changed. Events
+    for the same lesson apply in order.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(events)
+    valid: List[Tuple[int, CourseProgressEvent]] = []
+    for index, raw in enumerate(events):
+        try:
+            valid.append((index, CourseProgressEvent(**raw)))
+        except ValidationError as e:
+            errors = [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+            results[index] = {"index": index, "status": "invalid", "errors": errors}
+
+    enrollment_ids = {event.enrollment_id for _, event in valid}
+    enrollments = {
+        enrollment.id: enrollment
+        for enrollment in db.query(CourseEnrollment).filter(
+            CourseEnrollment.id.in_(enrollment_ids), CourseEnrollment.user_id == user_id
+        )
+    } if enrollment_ids else {}
+
+    keys = {(event.enrollment_id, event.lesson_id) for _, event in valid if event.enrollment_id in enrollments}
+    progress_rows = {
+        (row.enrollment_id, row.lesson_id): row
+        for row in db.query(CourseProgress).filter(
+            tuple_(CourseProgress.enrollment_id, CourseProgress.lesson_id).in_(keys)
+        )
+    } if keys else {}
+    # Completion state before the batch; None for lessons the batch creates
+    initial = {key: row.completed for key, row in progress_rows.items()}
+
+    for index, event in valid:
+        key = (event.enrollment_id, event.lesson_id)
+        if event.enrollment_id not in enrollments:
+            results[index] = {"index": index, "enrollment_id": event.enrollment_id,
+                              "lesson_id": event.lesson_id, "status": "not_found"}
+            continue
+
+        fields = event.model_dump(exclude_unset=True, exclude={"enrollment_id"})
+        if event.completed:
+            fields["completion_date"] = datetime.utcnow()
+        progress = progress_rows.get(key)
+        if progress is None:
+            initial.setdefault(key, None)
+            progress = progress_rows[key] = CourseProgress(
+                enrollment_id=event.enrollment_id, **{**event.model_dump(exclude={"enrollment_id"}), **fields}
+            )
+            db.add(progress)
+            status = "created"
+        else:
+            for field, value in fields.items():
+                setattr(progress, field, value)
+            status = "updated"
+        results[index] = {"index": index, "enrollment_id": event.enrollment_id,
+                          "lesson_id": event.lesson_id, "status": status}
+
+    deltas: Dict[int, List[int]] = {}
+    for key, was_completed in initial.items():
+        total_delta, completed_delta = completion_delta(was_completed, progress_rows[key].completed)
+        delta = deltas.setdefault(key[0], [0, 0])
+        delta[0] += total_delta
+        delta[1] += completed_delta
+
+    db.flush()
+    for enrollment_id, (total_delta, completed_delta) in deltas.items():
+        apply_progress_delta(db, enrollments[enrollment_id], total_delta, completed_delta)
+
+    percentages = {enrollment_id: enrollments[enrollment_id].progress_percentage for enrollment_id, _ in keys}
+    for result in results:
+        if result["status"] in ("created", "updated"):
+            result["progress_percentage"] = percentages[result["enrollment_id"]]
+    return {"results": results, "enrollments": percentages}
+
+
+def reconcile_progress_counters(target_engine: Engine, batch_size: int = 1000, pause_seconds: float = 0.01) -> int:
+    """
+    Recount progress rows per enrollment in id-ranged batches and repair drifted
+    counters; return the number of enrollments fixed
+    """
+    with target_engine.connect() as connection:
+        max_id = connection.exec_driver_sql("SELECT MAX(id) FROM course_enrollments").scalar() or 0
+
+    repaired = 0
+    for start in range(0, max_id, batch_size):
+        with target_engine.begin() as connection:
+            result = connection.exec_driver_sql(
+                f"UPDATE course_enrollments SET "
+                f"total_lessons = {COUNT_TOTAL}, "
+                f"completed_lessons = {COUNT_COMPLETED}, "
+                f"progress_percentage = CASE WHEN {COUNT_TOTAL} > 0 "
+                f"THEN {COUNT_COMPLETED} * 100.0 / {COUNT_TOTAL} ELSE progress_percentage END "
+                f"WHERE id > {start} AND id <= {start + batch_size} "
+                f"AND (total_lessons != {COUNT_TOTAL} OR completed_lessons != {COUNT_COMPLETED})"
+            )
+            repaired += result.rowcount or 0
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    if repaired:
+        logger.warning(f"Repaired progress counters on {repaired} enrollment(s)")
+    return repaired
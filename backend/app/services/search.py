@@ -0,0 +1,159 @@
+"""
+Ranked full-text course search.
+
+On SQLite, searches run against the courses_fts FTS5 index (migration 5),
+which triggers keep in sync with the courses table. Results are ordered by
+BM25 with title and tag hits weighted above description hits, and carry a
+highlighted snippet of the best matching column. Course text is
+HTML-escaped before the <mark> tags are added, so snippets are safe to
+render as HTML.
+
+User input never reaches the FTS5 query grammar directly: it is split into
+word tokens, each quoted and turned into a prefix query, and the tokens are
+ANDed together. Tag filters are exact matches on the course_tags index.
+
+Other databases, and SQLite files where migration 5 is not recorded yet,
+fall back to the ILIKE filters without ranking or snippets. The migration
+runs online: the index exists but is empty until its rebuild backfill
+finishes, so the table existing is not enough.
+"""
+import html
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import column, func, literal_column, or_, select, table
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db.migrations import schema_migrations
+from ..models.course import Course, CourseStatus, CourseTag
+from ..schemas.course import CourseResponse
+
+TOKEN = re.compile(r"\w+")
+
+SNIPPET_OPEN = "<mark>"
+SNIPPET_CLOSE = "</mark>"
+SNIPPET_TOKENS = 16
+
+# snippet() copies column text verbatim, so it marks matches with private-use
+# characters that are swapped for the tags after escaping
+_MATCH_OPEN = "\ue000"
+_MATCH_CLOSE = "\ue001"
+
+# In courses_fts column order: title, short_description, description, instructor_name, tags
+BM25_WEIGHTS = (10.0, 4.0, 1.0, 2.0, 6.0)
+
+courses_fts = table("courses_fts", column("rowid"))
+
+# Migration that creates and fills courses_fts; recorded only after the rebuild
+COURSE_SEARCH_MIGRATION = 5
+
+# Set once the migration is seen; it is never rolled back, so this process stops checking
+_fts_ready = False
+
+
+def build_match(query: str) -> Optional[str]:
+    """
+    FTS5 MATCH expression requiring every query word as a prefix, or None
+    """
+    return " AND ".join(f'"{term}"*' for term in TOKEN.findall(query.lower())) or None
+
+
+def tag_filters(tags: Sequence[str]) -> list:
+    return [
+        Course.id.in_(select(CourseTag.course_id).where(CourseTag.tag == tag))
+        for tag in CourseTag.normalize(tags)
+    ]
+
+
+def highlight_snippet(raw: Optional[str]) -> Optional[str]:
+    """
+    HTML-escape an FTS5 snippet and turn its match markers into <mark> tags
+    """
+    if raw is None:
+        return None
+    return (
+        html.escape(raw)
+        .replace(_MATCH_OPEN, SNIPPET_OPEN)
+        .replace(_MATCH_CLOSE, SNIPPET_CLOSE)
+    )
+
+
+def _result(course: Course, score: float, snippet: Optional[str]) -> Dict[str, Any]:
+    return {**CourseResponse.from_orm(course).model_dump(), "score": score, "snippet": snippet}
+
+
+async def _fts_search(
+    db: AsyncSession, match: str, filters: list, skip: int, limit: int
+) -> List[Dict[str, Any]]:
+    fts = literal_column("courses_fts")
+    rank = func.bm25(fts, *BM25_WEIGHTS)
+    snippet = func.snippet(fts, -1, _MATCH_OPEN, _MATCH_CLOSE, "…", SNIPPET_TOKENS)
+    query = (
+        select(Course, rank.label("rank"), snippet.label("snippet"))
+        .select_from(courses_fts)
+        .join(Course, Course.id == courses_fts.c.rowid)
+        .where(fts.op("MATCH")(match))
+        .where(Course.status == CourseStatus.PUBLISHED, *filters)
+        .order_by(rank, Course.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    result = await db.execute(query)
+    # bm25() is lower-is-better; expose a higher-is-better score
+    return [
+        _result(course, round(-rank_value, 4), highlight_snippet(snippet_text))
+        for course, rank_value, snippet_text in result.all()
+    ]
+
+
+async def _ilike_search(
+    db: AsyncSession, query: str, filters: list, skip: int, limit: int
+) -> List[Dict[str, Any]]:
+    conditions = [
+        or_(
+            Course.title.ilike(f"%{term}%"),
+            Course.description.ilike(f"%{term}%"),
+            Course.instructor_name.ilike(f"%{term}%"),
+        )
+        for term in TOKEN.findall(query)
+    ]
+    result = await db.execute(
+        select(Course)
+        .where(Course.status == CourseStatus.PUBLISHED, *conditions, *filters)
+        .order_by(Course.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return [_result(course, 0.0, None) for course in result.scalars().all()]
+
+
+async def fts_ready(db: AsyncSession) -> bool:
+    """
+    Whether courses_fts is built and filled
+    """
+    global _fts_ready
+    if not _fts_ready:
+        try:
+            result = await db.execute(
+                select(schema_migrations.c.version).where(schema_migrations.c.version == COURSE_SEARCH_MIGRATION)
+            )
+        except OperationalError:
+            # Unmanaged database without schema_migrations
+            await db.rollback()
+            return False
+        _fts_ready = result.first() is not None
+    return _fts_ready
+
+
+async def search_courses(
+    db: AsyncSession, query: str, tags: Sequence[str] = (), skip: int = 0, limit: int = 20
+) -> List[Dict[str, Any]]:
+    match = build_match(query)
+    filters = tag_filters(tags)
+    if match is None and not filters:
+        return []
+    if match is not None and db.bind.dialect.name == "sqlite" and await fts_ready(db):
+        return await _fts_search(db, match, filters, skip, limit)
+    # Without query words this is a tag-only listing, newest first
+    return await _ilike_search(db, query, filters, skip, limit)
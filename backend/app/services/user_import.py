@@ -0,0 +1,392 @@
+"""
+Bulk user import for enterprise onboarding.
+
+Rows are read from a CSV or NDJSON upload one batch at a time, so memory is
+bounded by USER_IMPORT_BATCH_SIZE rather than the file size. Per batch:
+
+1. every row is validated with UserCreate and checked against emails and
+   usernames seen earlier in the file;
+2. existing emails and usernames are found with one IN query each;
+3. passwords are hashed concurrently through the password hash pool;
+4. the new users are inserted in one transaction.
+
+Emails and usernames are compared case-insensitively everywhere: within the
+file and against existing users (through the lower() expression indexes).
+
+The result is a per-row report (created, invalid, duplicate, exists,
+skipped) plus totals. Every row needs a bcrypt hash, so a large file takes
+far longer than an HTTP request may; start_import_job() spools the upload
+to disk and runs the import as a background task in this worker, recording
+progress in user_import_jobs where any worker can report it. A job that
+fails partway keeps the report of the rows it got through, so admins can
+see which users were already created.
+"""
+import asyncio
+import codecs
+import csv
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
+
+from anyio import to_thread
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..core.config import settings
+from ..core.security import PasswordHashQueueFull, password_hasher
+from ..models.user import User, UserImportJob, UserRole
+from ..schemas.user import UserCreate
+
+logger = logging.getLogger(__name__)
+
+CSV_FORMATS = {"csv", "text/csv", "application/csv"}
+NDJSON_FORMATS = {"ndjson", "jsonl", "application/x-ndjson", "application/jsonl", "application/json"}
+REQUIRED_COLUMNS = ("email", "username", "full_name", "password")
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str], requested: Optional[str]) -> str:
+    for candidate in (requested, (filename or "").rsplit(".", 1)[-1].lower(), content_type):
+        if candidate in CSV_FORMATS:
+            return "csv"
+        if candidate in NDJSON_FORMATS:
+            return "ndjson"
+    raise ImportFormatError("Unknown import format; upload a .csv or .ndjson file or pass format=csv|ndjson")
+
+
+def iter_rows(stream, file_format: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield (row number, raw row) lazily; a raw row that failed to parse is an Exception
+    """
+    text = codecs.getreader("utf-8-sig")(stream)
+    if file_format == "csv":
+        reader = csv.DictReader(text)
+        missing = [name for name in REQUIRED_COLUMNS if name not in (reader.fieldnames or ())]
+        if missing:
+            raise ImportFormatError(
+                f"CSV header must include {', '.join(REQUIRED_COLUMNS)}; missing {', '.join(missing)}"
+            )
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if key and value not in (None, "")}
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, e
+
+
+def _chunks(rows: Iterator[Tuple[int, Any]], size: int) -> Iterator[List[Tuple[int, Any]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _hash(password: str, semaphore: asyncio.Semaphore) -> str:
+    async with semaphore:
+        while True:
+            try:
+                return await password_hasher.hash(password)
+            except PasswordHashQueueFull:
+                # Yield to interactive traffic rather than failing the import
+                await asyncio.sleep(0.05)
+
+
+class UserImporter:
+    def __init__(self, async_engine: AsyncEngine, batch_size: int, max_rows: int, hash_concurrency: int):
+        self.engine = async_engine
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.hash_concurrency = hash_concurrency
+        self._seen_emails = set()
+        self._seen_usernames = set()
+        self.totals = {"created": 0, "invalid": 0, "duplicate": 0, "exists": 0, "skipped": 0}
+
+    def _result(self, row: int, status: str, email: Optional[str] = None, **extra) -> Dict[str, Any]:
+        self.totals[status] += 1
+        return {"row": row, "status": status, "email": email, **extra}
+
+    def _validate(self, row_number: int, raw: Any) -> Tuple[Optional[UserCreate], Optional[Dict[str, Any]]]:
+        if isinstance(raw, Exception):
+            return None, self._result(row_number, "invalid", errors=[f"Malformed JSON: {raw}"])
+        if not isinstance(raw, dict):
+            return None, self._result(row_number, "invalid", errors=["Row must be an object"])
+        try:
+            user = UserCreate(**raw)
+        except ValidationError as e:
+            errors = [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+            return None, self._result(row_number, "invalid", raw.get("email"), errors=errors)
+
+        email, username = user.email.lower(), user.username.lower()
+        if email in self._seen_emails or username in self._seen_usernames:
+            return None, self._result(row_number, "duplicate", user.email,
+                                      errors=["Email or username repeated earlier in the file"])
+        self._seen_emails.add(email)
+        self._seen_usernames.add(username)
+        return user, None
+
+    async def _existing(self, users: List[UserCreate]) -> Tuple[set, set]:
+        """
+        Lower-cased emails and usernames already registered, matched the same way as the in-file check
+        """
+        email = func.lower(User.email)
+        username = func.lower(User.username)
+        async with self.engine.connect() as connection:
+            emails = set((await connection.execute(
+                select(email).where(email.in_([u.email.lower() for u in users]))
+            )).scalars())
+            usernames = set((await connection.execute(
+                select(username).where(username.in_([u.username.lower() for u in users]))
+            )).scalars())
+        return emails, usernames
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> Dict[str, Optional[int]]:
+        """
+        Insert a batch in one transaction; on a unique conflict (a concurrent
+        registration since the existence check) fall back to row by row
+        """
+        statement = insert(User).returning(User.id, User.email)
+        try:
+            async with self.engine.begin() as connection:
+                result = await connection.execute(statement, rows)
+                return {email: user_id for user_id, email in result.all()}
+        except IntegrityError:
+            created: Dict[str, Optional[int]] = {}
+            for row in rows:
+                try:
+                    async with self.engine.begin() as connection:
+                        created[row["email"]] = (await connection.execute(statement, row)).scalar_one()
+                except IntegrityError:
+                    created[row["email"]] = None
+            return created
+
+    def _validate_batch(
+        self, batch: List[Tuple[int, Any]]
+    ) -> Tuple[Dict[int, Dict[str, Any]], List[Tuple[int, UserCreate]]]:
+        results: Dict[int, Dict[str, Any]] = {}
+        candidates: List[Tuple[int, UserCreate]] = []
+        for row_number, raw in batch:
+            user, failure = self._validate(row_number, raw)
+            if failure is not None:
+                results[row_number] = failure
+            else:
+                candidates.append((row_number, user))
+        return results, candidates
+
+    async def _import_batch(self, batch: List[Tuple[int, Any]]) -> List[Dict[str, Any]]:
+        results, candidates = await to_thread.run_sync(self._validate_batch, batch)
+
+        if candidates:
+            existing_emails, existing_usernames = await self._existing([user for _, user in candidates])
+            new_users = []
+            for row_number, user in candidates:
+                email_taken = user.email.lower() in existing_emails
+                if email_taken or user.username.lower() in existing_usernames:
+                    field = "Email" if email_taken else "Username"
+                    results[row_number] = self._result(row_number, "exists", user.email,
+                                                       errors=[f"{field} already registered"])
+                else:
+                    new_users.append((row_number, user))
+
+            semaphore = asyncio.Semaphore(self.hash_concurrency)
+            hashes = await asyncio.gather(*(_hash(user.password, semaphore) for _, user in new_users))
+            rows = [
+                {
+                    "email": user.email,
+                    "username": user.username,
+                    "full_name": user.full_name,
+                    "hashed_password": hashed_password,
+                    "role": user.role or UserRole.STUDENT,
+                }
+                for (_, user), hashed_password in zip(new_users, hashes)
+            ]
+            created = await self._insert(rows) if rows else {}
+            for row_number, user in new_users:
+                user_id = created.get(user.email)
+                if user_id is None:
+                    results[row_number] = self._result(row_number, "exists", user.email,
+                                                       errors=["Email or username already registered"])
+                else:
+                    results[row_number] = self._result(row_number, "created", user.email, user_id=user_id)
+
+        return [results[row_number] for row_number, _ in batch]
+
+    async def run(self, stream, file_format: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Import the upload batch by batch, yielding each row's result
+        """
+        batches = _chunks(iter_rows(stream, file_format), self.batch_size)
+        processed = 0
+        while True:
+            # Reading and parsing (like validating) a batch is blocking CPU work;
+            # run it in the threadpool so other requests keep being served
+            batch = await to_thread.run_sync(next, batches, None)
+            if batch is None:
+                break
+            if processed >= self.max_rows:
+                for row_number, _ in batch:
+                    yield self._result(row_number, "skipped", errors=[f"Import limit of {self.max_rows} rows reached"])
+                continue
+            allowed = batch[: self.max_rows - processed]
+            processed += len(allowed)
+            for result in await self._import_batch(allowed):
+                yield result
+            for row_number, _ in batch[len(allowed):]:
+                yield self._result(row_number, "skipped", errors=[f"Import limit of {self.max_rows} rows reached"])
+
+
+# Import tasks running in this worker; referenced so they are not garbage collected
+_running_jobs: Set[asyncio.Task] = set()
+
+
+async def _update_job(async_engine: AsyncEngine, job_id: str, **values) -> None:
+    async with async_engine.begin() as connection:
+        await connection.execute(
+            update(UserImportJob).where(UserImportJob.id == job_id).values(updated_at=datetime.utcnow(), **values)
+        )
+
+
+async def run_import_job(async_engine: AsyncEngine, job_id: str, path: str, file_format: str) -> None:
+    """
+    Import a spooled upload, recording totals after every batch and the report at the end
+    """
+    importer = UserImporter(
+        async_engine,
+        batch_size=settings.USER_IMPORT_BATCH_SIZE,
+        max_rows=settings.USER_IMPORT_MAX_ROWS,
+        hash_concurrency=max(settings.PASSWORD_HASH_WORKERS, 1) * 2,
+    )
+    rows: List[Dict[str, Any]] = []
+    try:
+        await _update_job(async_engine, job_id, status="running")
+        with open(path, "rb") as stream:
+            async for result in importer.run(stream, file_format):
+                rows.append(result)
+                if len(rows) % importer.batch_size == 0:
+                    await _update_job(async_engine, job_id, totals=json.dumps(importer.totals))
+        await _update_job(
+            async_engine, job_id, status="completed", totals=json.dumps(importer.totals),
+            report=json.dumps(rows), finished_at=datetime.utcnow(),
+        )
+        logger.info(f"User import {job_id} finished: {importer.totals}")
+    except asyncio.CancelledError:
+        await _fail_job(async_engine, job_id, importer, rows, "Interrupted by shutdown")
+        raise
+    except (ImportFormatError, UnicodeDecodeError) as e:
+        await _fail_job(async_engine, job_id, importer, rows, str(e))
+    except Exception as e:
+        logger.exception(f"User import {job_id} failed")
+        await _fail_job(async_engine, job_id, importer, rows, f"Import failed: {e}")
+    finally:
+        os.remove(path)
+
+
+async def _fail_job(
+    async_engine: AsyncEngine, job_id: str, importer: UserImporter, rows: List[Dict[str, Any]], error: str
+) -> None:
+    # Keep the rows reported so far: "created" ones are committed and must not be re-imported blindly
+    try:
+        await _update_job(
+            async_engine, job_id, status="failed", totals=json.dumps(importer.totals),
+            report=json.dumps(rows), error=error, finished_at=datetime.utcnow(),
+        )
+    except Exception as e:
+        logger.error(f"Could not record failure of user import {job_id}: {e}")
+
+
+def _spool(source, file_format: str) -> str:
+    handle, path = tempfile.mkstemp(prefix="user-import-", suffix=f".{file_format}")
+    with os.fdopen(handle, "wb") as target:
+        shutil.copyfileobj(source, target)
+    return path
+
+
+async def start_import_job(
+    async_engine: AsyncEngine, upload, file_format: str, created_by: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Copy the upload to disk (the request's file is closed once it returns),
+    record a queued job and start importing it in the background
+    """
+    path = await to_thread.run_sync(_spool, upload.file, file_format)
+    now = datetime.utcnow()
+    job = {
+        "id": uuid.uuid4().hex,
+        "status": "queued",
+        "file_format": file_format,
+        "filename": upload.filename,
+        "created_by": created_by,
+        "totals": json.dumps({}),
+        "created_at": now,
+        "updated_at": now,
+    }
+    try:
+        async with async_engine.begin() as connection:
+            await connection.execute(insert(UserImportJob).values(job))
+    except Exception:
+        os.remove(path)
+        raise
+
+    task = asyncio.create_task(run_import_job(async_engine, job["id"], path, file_format))
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+    return job
+
+
+async def cancel_import_jobs() -> None:
+    """
+    Cancel this worker's running imports at shutdown, letting them record the interruption
+    """
+    tasks = list(_running_jobs)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def get_import_job(async_engine: AsyncEngine, job_id: str, include_rows: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Job status, totals and (once finished) the per-row report
+    """
+    columns = [column for column in UserImportJob.__table__.columns if include_rows or column.name != "report"]
+    async with async_engine.connect() as connection:
+        job = (await connection.execute(select(*columns).where(UserImportJob.id == job_id))).mappings().first()
+    if job is None:
+        return None
+
+    status = job["status"]
+    # The worker running it died or restarted without recording the outcome
+    if status in ("queued", "running") and \
+            (datetime.utcnow() - job["updated_at"]).total_seconds() > settings.USER_IMPORT_STALE_SECONDS:
+        status = "interrupted"
+    result = {
+        "job_id": job["id"],
+        "status": status,
+        "format": job["file_format"],
+        "filename": job["filename"],
+        "totals": json.loads(job["totals"] or "{}"),
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "finished_at": job["finished_at"],
+    }
+    if include_rows:
+        result["rows"] = json.loads(job["report"]) if job["report"] else None
+    return result
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the TechStep API hot paths.
+
+Seeds a throwaway SQLite database, then drives concurrent scenarios against
+the ASGI app in-process (default) or a real uvicorn server, and reports
+throughput and latency percentiles per scenario.
+
+Usage (from backend/):
+    python benchmarks/api_load.py
+    python benchmarks/api_load.py --users 5000 --courses 200 --requests 2000 --concurrency 64
+    python benchmarks/api_load.py --scenarios catalog,progress --json results.json
+    python benchmarks/api_load.py --uvicorn --workers 4
+
+Scenarios: login, catalog, enroll, progress, confirm_payment. Stripe is
+stubbed in-process, so confirm_payment is skipped against uvicorn.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+SCENARIOS = ["login", "catalog", "enroll", "progress", "confirm_payment"]
+SEARCH_TERMS = ["security", "threat", "cloud", "incident", "network", "malware", None, None]
+BENCH_PASSWORD = "benchmark123"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="TechStep API load benchmark")
+    parser.add_argument("--users", type=int, default=500, help="Seeded users")
+    parser.add_argument("--courses", type=int, default=100, help="Seeded courses (90%% published)")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent in-flight requests")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios")
+    parser.add_argument("--database", default=None, help="SQLite file (default: temporary)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--uvicorn", action="store_true", help="Benchmark a real uvicorn server")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write results as JSON")
+    return parser.parse_args()
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def seed_database(users: int, courses: int, seed: int) -> Dict[str, list]:
+    """
+    Generate a skewed benchmark dataset and return the ids scenarios draw from
+    """
+    from sqlalchemy import select
+    from app.db.database import engine
+    from app.models.course import Course, CourseEnrollment
+    from app.models.user import User, UserStatus
+    from generate_scale_data import generate
+
+    generate(
+        engine,
+        users=users,
+        courses=courses,
+        mentors=0,
+        podcasts=0,
+        seed=seed,
+        email_prefix="bench",
+        password=BENCH_PASSWORD,
+    )
+
+    with engine.connect() as connection:
+        # Emails are bench<n> in id order; suspended users would only measure 400s
+        users_by_id = connection.execute(select(User.id, User.status).order_by(User.id)).all()
+        enrollments = connection.execute(
+            select(CourseEnrollment.id, CourseEnrollment.user_id, CourseEnrollment.course_id)
+        ).all()
+        course_ids = list(connection.execute(select(Course.id).where(Course.status == "published")).scalars())
+
+    active = {user_id for user_id, status in users_by_id if status == UserStatus.ACTIVE}
+    return {
+        "user_ids": sorted(active),
+        "email_index": {user_id: i for i, (user_id, _) in enumerate(users_by_id)},
+        "course_ids": course_ids,
+        "enrollments": [tuple(row) for row in enrollments if row.user_id in active],
+    }
+
+
+def build_scenarios(data: Dict[str, list], rng: random.Random, in_process: bool) -> Dict[str, Callable]:
+    from app.core.security import create_access_token
+
+    tokens = {user_id: create_access_token(subject=str(user_id)) for user_id in data["user_ids"]}
+    enrolled = {(user_id, course_id) for _, user_id, course_id in data["enrollments"]}
+    email_index = data["email_index"]
+
+    def auth(user_id):
+        return {"Authorization": f"Bearer {tokens[user_id]}"}
+
+    async def login(client, i):
+        user_id = rng.choice(data["user_ids"])
+        return await client.post("/api/v1/auth/login", json={
+            "email": f"bench{email_index[user_id]}@example.com", "password": BENCH_PASSWORD,
+        })
+
+    async def catalog(client, i):
+        params = {"limit": 20, "skip": rng.choice([0, 0, 20, 40])}
+        term = rng.choice(SEARCH_TERMS)
+        if term:
+            params["search"] = term
+        return await client.get("/api/v1/courses/", params=params)
+
+    async def enroll(client, i):
+        for _ in range(100):
+            user_id = rng.choice(data["user_ids"])
+            course_id = rng.choice(data["course_ids"])
+            if (user_id, course_id) not in enrolled:
+                enrolled.add((user_id, course_id))
+                break
+        return await client.post(f"/api/v1/courses/{course_id}/enroll", headers=auth(user_id))
+
+    async def progress(client, i):
+        enrollment_id, user_id, _ = rng.choice(data["enrollments"])
+        lesson = rng.randint(1, 40)
+        return await client.put(
+            f"/api/v1/courses/enrollments/{enrollment_id}/progress",
+            headers=auth(user_id),
+            json={"lesson_id": f"lesson-{lesson}", "lesson_title": f"Lesson {lesson}",
+                  "completed": rng.random() < 0.7, "time_spent_minutes": rng.randint(1, 30)},
+        )
+
+    async def confirm_payment(client, i):
+        # Half the purchases come from existing users, half create an account
+        if rng.random() < 0.5:
+            email = f"bench{rng.randrange(len(data['user_ids']))}@example.com"
+        else:
+            email = f"buyer{i}-{rng.randrange(10**9)}@example.com"
+        return await client.post("/api/v1/payments/confirm-payment", json={
+            "payment_intent_id": f"pi_bench_{i}_{rng.randrange(10**9)}",
+            "course_id": rng.choice(data["course_ids"]),
+            "customer_name": "Bench Buyer",
+            "customer_email": email,
+            "customer_phone": "555-0100",
+            "amount": 299900,
+        })
+
+    scenarios = {
+        "login": login,
+        "catalog": catalog,
+        "enroll": enroll,
+        "progress": progress,
+        "confirm_payment": confirm_payment,
+    }
+    if not in_process:
+        scenarios.pop("confirm_payment")
+    return scenarios
+
+
+def stub_stripe():
+    """
+    Make PaymentIntent.retrieve return a succeeded intent without network access
+    """
+    import stripe
+
+    class _Intent:
+        status = "succeeded"
+        amount = 299900
+        currency = "usd"
+
+        def __init__(self, intent_id):
+            self.id = intent_id
+            self.metadata = {}
+
+    stripe.PaymentIntent.retrieve = staticmethod(lambda intent_id, *args, **kwargs: _Intent(intent_id))
+
+
+async def run_scenario(client, name: str, scenario: Callable, total: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    statuses: Dict[int, int] = {}
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                response = await scenario(client, i)
+                status_code = response.status_code
+            except Exception:
+                status_code = -1
+            latencies.append(time.perf_counter() - started)
+            statuses[status_code] = statuses.get(status_code, 0) + 1
+            if not 200 <= status_code < 300:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": total,
+        "errors": errors,
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def print_report(results: List[Dict], args) -> None:
+    mode = f"uvicorn x{args.workers}" if args.uvicorn else "in-process ASGI"
+    print(f"\nTechStep API benchmark ({mode}, users={args.users}, courses={args.courses}, "
+          f"concurrency={args.concurrency})")
+    header = f"{'scenario':<16}{'reqs':>7}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['scenario']:<16}{r['requests']:>7}{r['errors']:>8}{r['throughput_rps']:>10}"
+              f"{r['p50_ms']:>10}{r['p90_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for_server(base_url: str, timeout: float = 30.0) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"uvicorn did not become healthy at {base_url}")
+
+
+async def run(args, data, selected: List[str]) -> List[Dict]:
+    import httpx
+
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    results = []
+
+    if args.uvicorn:
+        port = _free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=os.environ.copy(),
+        )
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            await _wait_for_server(base_url)
+            scenarios = build_scenarios(data, rng, in_process=False)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+                for name in selected:
+                    if name not in scenarios:
+                        print(f"Skipping {name}: Stripe can only be stubbed in-process")
+                        continue
+                    results.append(await run_scenario(client, name, scenarios[name], args.requests, args.concurrency))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+        return results
+
+    from app.main import app
+
+    stub_stripe()
+    scenarios = build_scenarios(data, rng, in_process=True)
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", limits=limits, timeout=60) as client:
+            for name in selected:
+                results.append(await run_scenario(client, name, scenarios[name], args.requests, args.concurrency))
+    return results
+
+
+def main() -> Optional[int]:
+    args = parse_args()
+    selected = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        return 2
+
+    # Settings are read at import time, so point the app at the benchmark DB first
+    database = args.database or os.path.join(tempfile.mkdtemp(prefix="techstep-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(database)}"
+    # Every simulated user logs in from one address; measure bcrypt, not the throttle
+    os.environ.setdefault("LOGIN_MAX_ATTEMPTS_PER_IP", "0")
+
+    # Per-request INFO logging would dominate the measurements
+    import logging
+    logging.disable(logging.INFO)
+
+    seed_started = time.perf_counter()
+    data = seed_database(args.users, args.courses, args.seed)
+    print(f"Seeded {args.users} users / {args.courses} courses into {database} "
+          f"in {time.perf_counter() - seed_started:.1f}s")
+
+    results = asyncio.run(run(args, data, selected))
+    print_report(results, args)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
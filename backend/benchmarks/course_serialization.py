@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for rendering the course listing body.
+
+Compares, per 1,000 courses:
+  - orm:       CourseResponse.from_orm per row (three json.loads in the tag /
+               objective / prerequisite validator) followed by FastAPI's
+               jsonable_encoder and JSONResponse rendering, what get_courses
+               paid on every request before the catalog snapshot;
+  - dicts:     json.dumps of cached JSON-ready dicts (the snapshot before
+               pre-encoding);
+  - fragments: joining the pre-encoded bytes held by the catalog snapshot.
+
+Usage (from backend/):
+    python benchmarks/course_serialization.py
+    python benchmarks/course_serialization.py --courses 5000 --repeat 50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Course listing serialization microbenchmark")
+    parser.add_argument("--courses", type=int, default=1000, help="Courses in the listing")
+    parser.add_argument("--repeat", type=int, default=20, help="Renders per variant")
+    return parser.parse_args()
+
+
+def make_courses(count: int):
+    from app.models.course import Course, CourseLevel, CourseStatus
+
+    levels = list(CourseLevel)
+    started = datetime(2024, 1, 1)
+    return [
+        Course(
+            id=i,
+            title=f"Course {i}: Threat Hunting with Open Source Tooling",
+            slug=f"course-{i}",
+            description="Hands-on labs covering detection engineering, log pipelines and triage. " * 4,
+            short_description="Detection engineering from first principles",
+            thumbnail_url=f"https://cdn.example.com/courses/{i}.png",
+            level=levels[i % len(levels)],
+            status=CourseStatus.PUBLISHED,
+            price=49.0 + i % 50,
+            duration_hours=10 + i % 30,
+            instructor_name="Ada Lovelace",
+            instructor_bio="Incident responder and trainer.",
+            learning_objectives=json.dumps([f"Objective {n}" for n in range(5)]),
+            prerequisites=json.dumps(["Networking basics", "Linux command line"]),
+            tags=json.dumps(["soc", "blue team", f"t{i % 20}"]),
+            is_featured=i % 10 == 0,
+            enrollment_count=i * 3,
+            rating=4.5,
+            rating_count=i,
+            created_at=started + timedelta(minutes=i),
+            updated_at=started + timedelta(days=1, minutes=i),
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def measure(label: str, render, repeat: int, courses: int, baseline: float = None) -> float:
+    render()  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = render()
+    elapsed = (time.perf_counter() - started) / repeat
+    per_thousand_ms = elapsed / courses * 1000 * 1000
+    speedup = f"{baseline / per_thousand_ms:>7.1f}x" if baseline else ""
+    print(f"{label:<38} {per_thousand_ms:>9.2f} ms/1k courses {len(body) / 1024:>9.0f} KiB {speedup}")
+    return per_thousand_ms
+
+
+def main() -> int:
+    args = parse_args()
+    import logging
+    import warnings
+    logging.disable(logging.INFO)
+    warnings.filterwarnings("ignore", category=DeprecationWarning)  # from_orm is the measured baseline
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from app.core.encoding import dumps, join_array, orjson
+    from app.schemas.course import CourseResponse
+    from app.services.catalog import CatalogEntry
+
+    courses = make_courses(args.courses)
+    entries = [CatalogEntry(course) for course in courses]
+    dicts = [CourseResponse.from_orm(course).model_dump(mode="json") for course in courses]
+
+    def orm():
+        models = [CourseResponse.from_orm(course) for course in courses]
+        return JSONResponse(content=jsonable_encoder(models)).body
+
+    def cached_dicts():
+        return JSONResponse(content=dicts).body
+
+    def fragments():
+        return join_array(entry.body for entry in entries)
+
+    def render_entries():
+        return join_array(CatalogEntry(course).body for course in courses)
+
+    encoder = "orjson" if orjson is not None else "json (orjson not installed)"
+    print(f"Course listing serialization ({args.courses:,} courses, {args.repeat} renders, encoder: {encoder})")
+    baseline = measure("from_orm + jsonable_encoder", orm, args.repeat, args.courses)
+    measure("cached dicts + json.dumps", cached_dicts, args.repeat, args.courses, baseline)
+    measure("pre-encoded fragments", fragments, args.repeat, args.courses, baseline)
+    measure("snapshot rebuild (one-off per write)", render_entries, args.repeat, args.courses, baseline)
+    assert json.loads(fragments()) == json.loads(orm())
+    assert dumps(dicts[0]) == entries[0].body
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for bearer token verification.
+
+Compares a full python-jose decode and HMAC check (what every authenticated
+request paid before) with a lookup in the verified-token cache, for a
+realistic number of distinct live tokens.
+
+Usage (from backend/):
+    python benchmarks/token_verification.py
+    python benchmarks/token_verification.py --tokens 10000 --iterations 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Token verification microbenchmark")
+    parser.add_argument("--tokens", type=int, default=1000, help="Distinct live tokens")
+    parser.add_argument("--iterations", type=int, default=100_000, help="Verifications per variant")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    return parser.parse_args()
+
+
+def measure(label: str, verify, tokens, iterations: int, rng: random.Random) -> float:
+    sample = [rng.choice(tokens) for _ in range(iterations)]
+    started = time.perf_counter()
+    for token in sample:
+        if verify(token) is None:
+            raise RuntimeError(f"{label}: token failed verification")
+    elapsed = time.perf_counter() - started
+    per_call_us = elapsed / iterations * 1e6
+    print(f"{label:<28} {iterations / elapsed:>12,.0f}/s {per_call_us:>9.2f} us/call")
+    return per_call_us
+
+
+def main() -> int:
+    args = parse_args()
+    import logging
+    logging.disable(logging.INFO)
+
+    from jose import jwt
+    from app.core.config import settings
+    from app.core.security import ALGORITHM, create_access_token, token_cache, verify_token
+
+    rng = random.Random(args.seed)
+    tokens = [create_access_token(subject=str(user_id)) for user_id in range(1, args.tokens + 1)]
+
+    def uncached(token):
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+
+    print(f"Token verification ({args.tokens:,} live tokens, {args.iterations:,} iterations)")
+    baseline = measure("jose decode (uncached)", uncached, tokens, args.iterations, rng)
+
+    token_cache.clear()
+    for token in tokens:
+        verify_token(token)
+    cached = measure("verify_token (cached)", verify_token, tokens, args.iterations, rng)
+
+    print(f"\nspeedup: {baseline / cached:.1f}x, cache entries: {len(token_cache):,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+Generate a production-scale dataset for load testing and query plan checks.
+
+Rows are built in memory in batches and written with Core executemany
+inserts, one transaction per batch. Popularity is skewed the way real
+traffic is: course and mentor demand follows a Zipf distribution and
+learner activity a Pareto one, so a few courses hold most enrollments and
+a few heavy learners hold most progress rows. Timestamps are anchored to
+--now (a fixed epoch by default), so the same --seed and --now always
+produce the same data and benchmark runs stay comparable.
+
+Usage (from backend/):
+    python generate_scale_data.py --users 100000
+    python generate_scale_data.py --users 2000000 --courses 2000 --batch-size 20000
+    DATABASE_URL=sqlite:///./scale.db python generate_scale_data.py --users 500000
+    python generate_scale_data.py --now "$(date -u +%Y-%m-%dT%H:%M:%S)"  # anchor to today
+
+All generated users share the password printed at the end.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.security import get_password_hash
+from app.db.database import engine as default_engine
+from app.db.migrations import upgrade
+from app.models.course import (
+    Course, CourseEnrollment, CourseLevel, CourseProgress, CourseStatus, CourseTag, EnrollmentStatus,
+)
+from app.models.mentor import BookingStatus, Mentor, MentorBooking
+from app.models.payment import Payment, PaymentMethod, PaymentStatus, PaymentType
+from app.models.podcast import EpisodeStatus, Podcast, PodcastEpisode, PodcastStatus
+from app.models.user import User, UserRole, UserStatus
+
+DEFAULT_PASSWORD = "scale123"
+# Reference "now" for generated timestamps; fixed so reruns are reproducible
+DEFAULT_NOW = datetime(2025, 1, 1, tzinfo=timezone.utc)
+TOPICS = [
+    "SOC Operations", "Threat Hunting", "Cloud Security", "Incident Response", "Network Forensics",
+    "Malware Analysis", "Penetration Testing", "Web Security", "Compliance", "Identity and Access",
+]
+SPECIALTIES = [
+    "penetration_testing", "network_security", "web_security", "cloud_security",
+    "incident_response", "compliance", "threat_hunting", "malware_analysis",
+]
+PODCAST_CATEGORIES = ["Threat Intel", "Careers", "Blue Team", "Red Team", "News"]
+LESSON_TIME_MINUTES = (5, 60)
+
+
+def parse_now(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a TechStep dataset at production scale")
+    parser.add_argument("--users", type=int, default=100_000, help="Learners to create")
+    parser.add_argument("--courses", type=int, default=500, help="Courses to create (90%% published)")
+    parser.add_argument("--lessons-per-course", type=int, default=40, help="Lessons per course")
+    parser.add_argument("--enrollments-per-user", type=float, default=3.0, help="Mean enrollments per learner")
+    parser.add_argument("--paid-ratio", type=float, default=0.6, help="Share of enrollments with a payment")
+    parser.add_argument("--mentors", type=int, default=200, help="Mentors (taken from the user pool)")
+    parser.add_argument("--bookings-per-mentor", type=float, default=25.0, help="Mean bookings per mentor")
+    parser.add_argument("--podcasts", type=int, default=20, help="Podcasts to create")
+    parser.add_argument("--episodes-per-podcast", type=int, default=100, help="Episodes per podcast")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for course/mentor popularity")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Rows per insert batch")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--now", type=parse_now, default=DEFAULT_NOW,
+                        help=f"ISO timestamp the data is generated relative to (default {DEFAULT_NOW.isoformat()})")
+    parser.add_argument("--email-prefix", default="scale", help="Users get <prefix><n>@example.com")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="Password shared by generated users")
+    return parser.parse_args()
+
+
+class ZipfSampler:
+    """
+    Draw items with probability proportional to 1 / rank ** skew
+    """
+
+    def __init__(self, items: List[int], skew: float, rng: random.Random):
+        self.items = items
+        self.rng = rng
+        self.cumulative = list(itertools.accumulate(1.0 / (rank ** skew) for rank in range(1, len(items) + 1)))
+
+    def sample(self) -> int:
+        index = bisect_left(self.cumulative, self.rng.random() * self.cumulative[-1])
+        return self.items[min(index, len(self.items) - 1)]
+
+    def sample_distinct(self, k: int) -> List[int]:
+        k = min(k, len(self.items))
+        chosen: Dict[int, None] = {}
+        # Rejection sampling is cheap while k is small relative to the catalog
+        for _ in range(k * 20):
+            chosen.setdefault(self.sample(), None)
+            if len(chosen) == k:
+                break
+        return list(chosen)
+
+
+class ThroughputReport:
+    def __init__(self):
+        self.tables: Dict[str, List[float]] = {}
+
+    def record(self, table: str, rows: int, seconds: float) -> None:
+        totals = self.tables.setdefault(table, [0, 0.0])
+        totals[0] += rows
+        totals[1] += seconds
+
+    def print(self, elapsed: float) -> None:
+        print(f"\n{'table':<20} {'rows':>12} {'seconds':>9} {'rows/s':>10}")
+        total_rows = 0
+        for table, (rows, seconds) in self.tables.items():
+            total_rows += rows
+            print(f"{table:<20} {int(rows):>12,} {seconds:>9.1f} {rows / seconds if seconds else 0:>10,.0f}")
+        print(f"{'total':<20} {int(total_rows):>12,} {elapsed:>9.1f} {total_rows / elapsed if elapsed else 0:>10,.0f}")
+
+
+def batched(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_insert(connection: Connection, model, rows: Iterable[dict], batch_size: int, report: ThroughputReport) -> int:
+    """
+    executemany one batch per transaction so the WAL stays small on huge loads
+    """
+    inserted = 0
+    for batch in batched(rows, batch_size):
+        started = time.perf_counter()
+        connection.execute(insert(model), batch)
+        connection.commit()
+        report.record(model.__tablename__, len(batch), time.perf_counter() - started)
+        inserted += len(batch)
+    return inserted
+
+
+def new_ids(connection: Connection, model, after_id: int) -> List[int]:
+    return list(connection.execute(select(model.id).where(model.id > after_id).order_by(model.id)).scalars())
+
+
+def max_id(connection: Connection, model) -> int:
+    return connection.execute(select(func.max(model.id))).scalar() or 0
+
+
+def generate(
+    target_engine: Engine = default_engine,
+    users: int = 100_000,
+    courses: int = 500,
+    lessons_per_course: int = 40,
+    enrollments_per_user: float = 3.0,
+    paid_ratio: float = 0.6,
+    mentors: int = 200,
+    bookings_per_mentor: float = 25.0,
+    podcasts: int = 20,
+    episodes_per_podcast: int = 100,
+    skew: float = 1.1,
+    batch_size: int = 10_000,
+    seed: int = 42,
+    now: datetime = DEFAULT_NOW,
+    email_prefix: str = "scale",
+    password: str = DEFAULT_PASSWORD,
+    report: Optional[ThroughputReport] = None,
+) -> Dict[str, int]:
+    """
+    Append a skewed dataset to the database and return row counts per table
+    """
+    rng = random.Random(seed)
+    report = report or ThroughputReport()
+    now = now.replace(microsecond=0)
+    hashed_password = get_password_hash(password)
+    counts: Dict[str, int] = {}
+
+    upgrade(target_engine)
+
+    with target_engine.connect() as connection:
+        if target_engine.dialect.name == "sqlite":
+            # Bulk load only: a crash mid-run just means regenerating
+            connection.exec_driver_sql("PRAGMA synchronous = OFF")
+
+        # --- Users: the first `mentors` users become mentors ----------------------
+        first_user_id = max_id(connection, User)
+        user_offset = connection.execute(select(func.count(User.id))).scalar()
+        signup_window = timedelta(days=730)
+
+        def user_rows() -> Iterator[dict]:
+            for i in range(users):
+                n = user_offset + i
+                created_at = now - signup_window * (1 - i / max(users, 1)) ** 2
+                yield {
+                    "email": f"{email_prefix}{n}@example.com",
+                    "username": f"{email_prefix}{n}",
+                    "full_name": f"Scale User {n}",
+                    "hashed_password": hashed_password,
+                    "role": UserRole.MENTOR if i < mentors else UserRole.STUDENT,
+                    "status": UserStatus.SUSPENDED if rng.random() < 0.01 else UserStatus.ACTIVE,
+                    "is_verified": rng.random() < 0.8,
+                    "created_at": created_at,
+                    "last_login": created_at + (now - created_at) * rng.random() if rng.random() < 0.7 else None,
+                }
+
+        counts["users"] = bulk_insert(connection, User, user_rows(), batch_size, report)
+        user_ids = new_ids(connection, User, first_user_id)
+
+        # --- Courses -------------------------------------------------------------
+        first_course_id = max_id(connection, Course)
+        course_offset = connection.execute(select(func.count(Course.id))).scalar()
+
+        def course_rows() -> Iterator[dict]:
+            levels = list(CourseLevel)
+            for i in range(courses):
+                n = course_offset + i
+                topic = rng.choice(TOPICS)
+                tags = rng.sample(TOPICS, k=rng.randint(1, 3))
+                yield {
+                    "title": f"{topic} {rng.choice(['Foundations', 'Practitioner', 'Masterclass', 'Bootcamp'])} {n}",
+                    "slug": f"{email_prefix}-course-{n}",
+                    "description": f"Hands-on {topic.lower()} course with {lessons_per_course} lessons and labs.",
+                    "short_description": f"{topic} in {lessons_per_course} lessons",
+                    "level": rng.choice(levels),
+                    "status": CourseStatus.PUBLISHED if rng.random() < 0.9 else CourseStatus.DRAFT,
+                    "price": rng.choice([0.0, 499.0, 999.0, 1999.0, 2999.0]),
+                    "duration_hours": lessons_per_course * rng.randint(1, 18),
+                    "instructor_name": f"Instructor {rng.randrange(max(courses // 5, 1))}",
+                    "tags": json.dumps(tags),
+                    "learning_objectives": json.dumps([f"Objective {k}" for k in range(1, 4)]),
+                    "is_featured": rng.random() < 0.05,
+                    "sort_order": i,
+                    "enrollment_count": 0,
+                    "rating": round(rng.uniform(3.0, 5.0), 1),
+                    "rating_count": rng.randrange(0, 500),
+                    "created_at": now - timedelta(days=rng.randrange(0, 730)),
+                }
+
+        counts["courses"] = bulk_insert(connection, Course, course_rows(), batch_size, report)
+        course_ids = new_ids(connection, Course, first_course_id)
+
+        def course_tag_rows() -> Iterator[dict]:
+            for course_id, tags in connection.execute(select(Course.id, Course.tags).where(Course.id > first_course_id)).all():
+                for tag in CourseTag.normalize(json.loads(tags)):
+                    yield {"course_id": course_id, "tag": tag}
+
+        counts["course_tags"] = bulk_insert(connection, CourseTag, course_tag_rows(), batch_size, report)
+        prices = dict(connection.execute(select(Course.id, Course.price).where(Course.id > first_course_id)).all())
+
+        # Popular courses are a random subset, not simply the oldest ids
+        ranked_courses = course_ids[:]
+        rng.shuffle(ranked_courses)
+        course_sampler = ZipfSampler(ranked_courses, skew, rng)
+
+        # --- Enrollments, progress and course payments, per slice of learners -------
+        # Pareto(1.5) has mean 3, so scale activity to the requested mean
+        activity = {user_id: rng.paretovariate(1.5) / 3.0 for user_id in user_ids}
+        counts.update({"course_enrollments": 0, "course_progress": 0, "payments": 0})
+        payment_seq = itertools.count(max_id(connection, Payment))
+        user_slice = max(batch_size // max(int(enrollments_per_user), 1), 1)
+
+        for start in range(0, len(user_ids), user_slice):
+            first_enrollment_id = max_id(connection, CourseEnrollment)
+            planned = []
+            for user_id in user_ids[start:start + user_slice]:
+                wanted = int(round(activity[user_id] * enrollments_per_user * rng.random() * 2))
+                for course_id in course_sampler.sample_distinct(wanted):
+                    started = min(lessons_per_course, int(lessons_per_course * min(1.0, activity[user_id] * rng.random())) + 1)
+                    completed = sum(1 for _ in range(started) if rng.random() < 0.85)
+                    enrolled_at = now - timedelta(days=rng.randrange(0, 365), seconds=rng.randrange(86400))
+                    planned.append((user_id, course_id, started, completed, enrolled_at))
+
+            enrollment_rows = [
+                {
+                    "user_id": user_id,
+                    "course_id": course_id,
+                    "status": EnrollmentStatus.COMPLETED if completed == started == lessons_per_course else EnrollmentStatus.ACTIVE,
+                    "progress_percentage": completed / started * 100,
+                    "completed_lessons": completed,
+                    "total_lessons": started,
+                    "enrollment_date": enrolled_at,
+                    "completion_date": enrolled_at + timedelta(days=30) if completed == started == lessons_per_course else None,
+                }
+                for user_id, course_id, started, completed, enrolled_at in planned
+            ]
+            counts["course_enrollments"] += bulk_insert(connection, CourseEnrollment, enrollment_rows, batch_size, report)
+
+            # SQLite assigns rowids in insert order, so ids line up with `planned`
+            enrollment_ids = new_ids(connection, CourseEnrollment, first_enrollment_id)
+
+            def progress_rows() -> Iterator[dict]:
+                for enrollment_id, (_, _, started, completed, enrolled_at) in zip(enrollment_ids, planned):
+                    for lesson in range(1, started + 1):
+                        done = lesson <= completed
+                        yield {
+                            "enrollment_id": enrollment_id,
+                            "lesson_id": f"lesson-{lesson}",
+                            "lesson_title": f"Lesson {lesson}",
+                            "completed": done,
+                            "completion_date": enrolled_at + timedelta(days=lesson) if done else None,
+                            "time_spent_minutes": rng.randint(*LESSON_TIME_MINUTES),
+                            "quiz_score": round(rng.uniform(50, 100), 1) if done and rng.random() < 0.3 else None,
+                            "created_at": enrolled_at + timedelta(days=lesson),
+                        }
+
+            counts["course_progress"] += bulk_insert(connection, CourseProgress, progress_rows(), batch_size, report)
+
+            def payment_rows() -> Iterator[dict]:
+                for user_id, course_id, _, _, enrolled_at in planned:
+                    price = prices.get(course_id, 0.0)
+                    if not price or rng.random() >= paid_ratio:
+                        continue
+                    status = PaymentStatus.COMPLETED if rng.random() < 0.95 else rng.choice(
+                        [PaymentStatus.FAILED, PaymentStatus.REFUNDED]
+                    )
+                    yield {
+                        "user_id": user_id,
+                        "payment_intent_id": f"pi_{email_prefix}_{next(payment_seq)}",
+                        "payment_method": PaymentMethod.STRIPE,
+                        "payment_type": PaymentType.COURSE_PURCHASE,
+                        "status": status,
+                        "amount": price,
+                        "currency": "USD",
+                        "course_id": course_id,
+                        "transaction_fee": round(price * 0.029 + 0.30, 2),
+                        "net_amount": round(price * 0.971 - 0.30, 2),
+                        "refund_amount": price if status == PaymentStatus.REFUNDED else 0.0,
+                        "created_at": enrolled_at,
+                        "processed_at": enrolled_at if status == PaymentStatus.COMPLETED else None,
+                    }
+
+            counts["payments"] += bulk_insert(connection, Payment, payment_rows(), batch_size, report)
+
+        # --- Mentors and bookings ---------------------------------------------------
+        first_mentor_id = max_id(connection, Mentor)
+
+        def mentor_rows() -> Iterator[dict]:
+            for user_id in user_ids[:mentors]:
+                yield {
+                    "user_id": user_id,
+                    "title": rng.choice(["Security Consultant", "SOC Lead", "Red Team Operator", "CISO"]),
+                    "company": f"Company {rng.randrange(100)}",
+                    "years_experience": rng.randint(3, 25),
+                    "specialties": json.dumps(rng.sample(SPECIALTIES, k=rng.randint(1, 3))),
+                    "hourly_rate": float(rng.choice([75, 100, 150, 200, 300])),
+                    "rating": round(rng.uniform(3.5, 5.0), 1),
+                    "rating_count": rng.randrange(0, 200),
+                    "bio": "Experienced practitioner mentoring the next generation of defenders.",
+                    "languages": json.dumps(["en"]),
+                    "timezone": rng.choice(["UTC", "America/New_York", "Europe/London", "Asia/Singapore"]),
+                    "is_featured": rng.random() < 0.1,
+                    "is_active": rng.random() < 0.95,
+                }
+
+        counts["mentors"] = bulk_insert(connection, Mentor, mentor_rows(), batch_size, report)
+        mentor_ids = new_ids(connection, Mentor, first_mentor_id)
+        counts["mentor_bookings"] = 0
+
+        if mentor_ids:
+            mentor_sampler = ZipfSampler(mentor_ids, skew, rng)
+            rates = dict(connection.execute(
+                select(Mentor.id, Mentor.hourly_rate).where(Mentor.id > first_mentor_id)
+            ).all())
+            learner_ids = user_ids[mentors:] or user_ids
+            learner_weights = list(itertools.accumulate(activity[user_id] for user_id in learner_ids))
+
+            def booking_rows() -> Iterator[dict]:
+                for _ in range(int(len(mentor_ids) * bookings_per_mentor)):
+                    mentor_id = mentor_sampler.sample()
+                    scheduled = now + timedelta(hours=rng.randint(-24 * 365, 24 * 30))
+                    if scheduled > now:
+                        status = rng.choice([BookingStatus.PENDING, BookingStatus.CONFIRMED])
+                    else:
+                        status = BookingStatus.COMPLETED if rng.random() < 0.9 else BookingStatus.CANCELLED
+                    duration = rng.choice([30, 60, 90])
+                    yield {
+                        "user_id": rng.choices(learner_ids, cum_weights=learner_weights)[0],
+                        "mentor_id": mentor_id,
+                        "session_title": f"{rng.choice(TOPICS)} session",
+                        "scheduled_date": scheduled,
+                        "duration_minutes": duration,
+                        "status": status,
+                        "rating": rng.randint(3, 5) if status == BookingStatus.COMPLETED else None,
+                        "total_amount": rates[mentor_id] * duration / 60,
+                        "payment_status": "paid" if status != BookingStatus.PENDING else "pending",
+                        "created_at": min(scheduled, now) - timedelta(days=rng.randint(1, 14)),
+                    }
+
+            counts["mentor_bookings"] = bulk_insert(connection, MentorBooking, booking_rows(), batch_size, report)
+
+        # --- Podcasts and episodes ---------------------------------------------------
+        first_podcast_id = max_id(connection, Podcast)
+        podcast_offset = connection.execute(select(func.count(Podcast.id))).scalar()
+
+        def podcast_rows() -> Iterator[dict]:
+            for i in range(podcasts):
+                n = podcast_offset + i
+                yield {
+                    "title": f"TechStep {rng.choice(PODCAST_CATEGORIES)} {n}",
+                    "slug": f"{email_prefix}-podcast-{n}",
+                    "description": "Conversations with practitioners about the realities of security work.",
+                    "host_name": f"Host {n}",
+                    "category": rng.choice(PODCAST_CATEGORIES),
+                    "status": PodcastStatus.PUBLISHED,
+                    "is_featured": rng.random() < 0.2,
+                    "subscriber_count": int(rng.paretovariate(1.2) * 100),
+                    "rating": round(rng.uniform(3.5, 5.0), 1),
+                }
+
+        counts["podcasts"] = bulk_insert(connection, Podcast, podcast_rows(), batch_size, report)
+        podcast_ids = new_ids(connection, Podcast, first_podcast_id)
+
+        def episode_rows() -> Iterator[dict]:
+            for podcast_id in podcast_ids:
+                for number in range(1, episodes_per_podcast + 1):
+                    published_at = now - timedelta(days=7 * (episodes_per_podcast - number))
+                    plays = int(rng.paretovariate(1.3) * 50)
+                    yield {
+                        "podcast_id": podcast_id,
+                        "title": f"Episode {number}: {rng.choice(TOPICS)}",
+                        "slug": f"episode-{number}",
+                        "description": "Show notes and links.",
+                        "audio_url": f"https://cdn.example.com/podcasts/{podcast_id}/{number}.mp3",
+                        "duration_seconds": rng.randint(900, 5400),
+                        "episode_number": number,
+                        "season_number": (number - 1) // 25 + 1,
+                        "status": EpisodeStatus.PUBLISHED,
+                        "published_at": published_at,
+                        "play_count": plays,
+                        "download_count": plays // 3,
+                        "likes_count": plays // 20,
+                    }
+
+        counts["podcast_episodes"] = bulk_insert(connection, PodcastEpisode, episode_rows(), batch_size, report)
+
+        # --- Denormalized counters ------------------------------------------------------
+        started = time.perf_counter()
+        connection.execute(
+            update(Course)
+            .where(Course.id > first_course_id)
+            .values(enrollment_count=select(func.count(CourseEnrollment.id))
+                    .where(CourseEnrollment.course_id == Course.id)
+                    .scalar_subquery())
+        )
+        connection.execute(
+            update(Mentor)
+            .where(Mentor.id > first_mentor_id)
+            .values(total_sessions=select(func.count(MentorBooking.id))
+                    .where(MentorBooking.mentor_id == Mentor.id,
+                           MentorBooking.status == BookingStatus.COMPLETED)
+                    .scalar_subquery())
+        )
+        connection.execute(
+            update(Podcast)
+            .where(Podcast.id > first_podcast_id)
+            .values(total_plays=select(func.coalesce(func.sum(PodcastEpisode.play_count), 0))
+                    .where(PodcastEpisode.podcast_id == Podcast.id)
+                    .scalar_subquery())
+        )
+        connection.commit()
+        report.record("(counters)", 0, time.perf_counter() - started)
+
+        if target_engine.dialect.name == "sqlite":
+            # Fresh statistics so the planner sees the skew
+            connection.execute(text("ANALYZE"))
+            connection.commit()
+
+    return counts
+
+
+def main() -> int:
+    args = parse_args()
+    report = ThroughputReport()
+    started = time.perf_counter()
+
+    print(f"Generating {args.users:,} users / {args.courses:,} courses into {default_engine.url} (seed {args.seed}, now {args.now.isoformat()})")
+    generate(
+        default_engine,
+        users=args.users,
+        courses=args.courses,
+        lessons_per_course=args.lessons_per_course,
+        enrollments_per_user=args.enrollments_per_user,
+        paid_ratio=args.paid_ratio,
+        mentors=min(args.mentors, args.users),
+        bookings_per_mentor=args.bookings_per_mentor,
+        podcasts=args.podcasts,
+        episodes_per_podcast=args.episodes_per_podcast,
+        skew=args.skew,
+        batch_size=args.batch_size,
+        seed=args.seed,
+        now=args.now,
+        email_prefix=args.email_prefix,
+        password=args.password,
+        report=report,
+    )
+
+    report.print(time.perf_counter() - started)
+    print(f"\nGenerated users log in as {args.email_prefix}<n>@example.com / {args.password}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory course catalog snapshot.
+"""
+import json
+import sys
+from datetime import datetime
+
+sys.path.append('backend')
+
+from backend.app.models.course import Course, CourseLevel, CourseStatus
+from backend.app.services.catalog import CatalogEntry, CatalogSnapshot
+
+
+def make_course(course_id, title, level=CourseLevel.BEGINNER, featured=False, tags='["soc", "blue team"]', price=10.0):
+    return Course(
+        id=course_id, title=title, slug=f"c{course_id}", description="Hands-on labs", level=level,
+        status=CourseStatus.PUBLISHED, price=price, duration_hours=5, instructor_name="Ada",
+        tags=tags, is_featured=featured, enrollment_count=0, rating=0.0,
+        rating_count=0, created_at=datetime(2024, 1, course_id),
+    )
+
+
+def build(*courses):
+    return CatalogSnapshot([CatalogEntry(course) for course in courses])
+
+
+def test_filters_match_the_database_query():
+    snapshot = build(
+        make_course(3, "Malware Analysis", CourseLevel.ADVANCED, featured=True),
+        make_course(2, "Threat Hunting", CourseLevel.INTERMEDIATE),
+        make_course(1, "SOC Basics", featured=True),
+    )
+    assert [c.id for c in snapshot.query()] == [3, 2, 1]
+    assert [c.id for c in snapshot.query(level="advanced")] == [3]
+    assert [c.id for c in snapshot.query(featured=True)] == [3, 1]
+    assert [c.id for c in snapshot.query(featured=False)] == [2]
+    assert [c.id for c in snapshot.query(search="threat")] == [2]
+    assert [c.id for c in snapshot.query(search="ADA", level="beginner")] == [1]
+    assert snapshot.query(level="expert") == ()
+    assert json.loads(snapshot.entries[0].body)["tags"] == ["soc", "blue team"]
+
+
+def test_version_follows_content():
+    assert build(make_course(1, "SOC Basics")).version == build(make_course(1, "SOC Basics")).version
+    assert build(make_course(1, "SOC Basics")).version != build(make_course(1, "SOC Advanced")).version
+
+
+def test_tag_filters_and_facets():
+    snapshot = build(
+        make_course(3, "Cloud IR", tags='["Cloud", "SOC"]', price=0),
+        make_course(2, "Threat Hunting", CourseLevel.ADVANCED, tags='["soc"]', price=150),
+        make_course(1, "Pentest", tags='["red team"]', price=250),
+    )
+    assert [c.id for c in snapshot.query(tags=["soc"])] == [3, 2]
+    assert [c.id for c in snapshot.query(tags=["cloud", "red team"])] == [3, 1]
+    assert [c.id for c in snapshot.query(tags=["cloud", "soc"], tags_mode="all")] == [3]
+    assert [c.id for c in snapshot.query(tags=["soc"], level="advanced")] == [2]
+    assert snapshot.facets() == {
+        "total": 3,
+        "level": {"beginner": 2, "advanced": 1},
+        "tags": {"soc": 2, "cloud": 1, "red team": 1},
+        "price": {"free": 1, "100_to_200": 1, "200_plus": 1},
+    }
+    assert snapshot.facets(snapshot.query(tags=["soc"]))["total"] == 2
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the FTS5 course search index and query building.
+"""
+import asyncio
+import sys
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+sys.path.append('backend')
+
+from backend.app.db.database import Base
+from backend.app.db.migrations import COURSE_SEARCH_DDL, migration_metadata, schema_migrations
+from backend.app.models.course import Course, CourseLevel, CourseStatus
+from backend.app.services import search as search_service
+from backend.app.services.search import _MATCH_CLOSE, _MATCH_OPEN, build_match, highlight_snippet, search_courses
+
+
+def test_build_match_quotes_user_input():
+    assert build_match("Threat hunt") == '"threat"* AND "hunt"*'
+    assert build_match('"bad) OR *') == '"bad"* AND "or"*'
+    assert build_match("  !") is None
+
+
+def test_triggers_keep_index_in_sync():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE courses (id INTEGER PRIMARY KEY, title TEXT, short_description TEXT, "
+            "description TEXT, instructor_name TEXT, tags TEXT)"
+        )
+        for statement in COURSE_SEARCH_DDL:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql(
+            "INSERT INTO courses VALUES (1, 'Threat Hunting', NULL, 'Logs', 'Ada', '[\"SOC\"]'), "
+            "(2, 'Cloud Security', NULL, 'IAM and threat models', 'Bob', '[\"cloud\"]')"
+        )
+
+        def search(match):
+            return [row[0] for row in connection.exec_driver_sql(
+                "SELECT rowid FROM courses_fts WHERE courses_fts MATCH ? ORDER BY bm25(courses_fts, 10.0, 4.0, 1.0, 2.0, 6.0)",
+                (match,),
+            )]
+
+        assert search(build_match("threat")) == [1, 2]
+        assert search('tags : "soc"') == [1]
+
+        connection.exec_driver_sql("UPDATE courses SET title = 'Incident Response' WHERE id = 1")
+        connection.exec_driver_sql("DELETE FROM courses WHERE id = 2")
+        assert search(build_match("threat")) == []
+        assert search(build_match("incid")) == [1]
+
+
+def test_snippets_escape_course_text():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE courses (id INTEGER PRIMARY KEY, title TEXT, short_description TEXT, "
+            "description TEXT, instructor_name TEXT, tags TEXT)"
+        )
+        for statement in COURSE_SEARCH_DDL:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql(
+            "INSERT INTO courses VALUES (1, '<script>alert(1)</script> XSS basics', NULL, NULL, NULL, NULL)"
+        )
+        raw = connection.exec_driver_sql(
+            "SELECT snippet(courses_fts, -1, ?, ?, '…', 16) FROM courses_fts WHERE courses_fts MATCH ?",
+            (_MATCH_OPEN, _MATCH_CLOSE, build_match("xss")),
+        ).scalar_one()
+
+    assert highlight_snippet(raw) == "&lt;script&gt;alert(1)&lt;/script&gt; <mark>XSS</mark> basics"
+    assert highlight_snippet(None) is None
+
+
+def test_search_uses_ilike_until_the_index_is_filled(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_service, "_fts_ready", False)
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    Base.metadata.create_all(engine)
+    migration_metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(Course.__table__.insert().values(
+            title="Threat Hunting", slug="threat-hunting", description="Logs", level=CourseLevel.BEGINNER,
+            status=CourseStatus.PUBLISHED, price=0.0, duration_hours=1, instructor_name="Ada",
+        ))
+        # Migration 5's DDL ran, its rebuild backfill has not: the index is empty
+        for statement in COURSE_SEARCH_DDL:
+            connection.exec_driver_sql(statement)
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'search.db'}")
+
+    async def search():
+        async with AsyncSession(async_engine) as db:
+            return [(course["title"], course["snippet"]) for course in await search_courses(db, "threat")]
+
+    assert asyncio.run(search()) == [("Threat Hunting", None)]
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql("INSERT INTO courses_fts(courses_fts) VALUES ('rebuild')")
+        connection.execute(schema_migrations.insert().values(
+            version=5, description="Course full-text search index", applied_at=datetime.utcnow()
+        ))
+    assert asyncio.run(search()) == [("Threat Hunting", "<mark>Threat</mark> Hunting")]
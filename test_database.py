@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for engine construction from the engine profiles and the session dependencies.
+"""
+import asyncio
+import sys
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+sys.path.append('backend')
+
+from backend.app.db import database
+from backend.app.db.database import build_async_engine, build_engine, get_async_db, get_engine_profile
+
+
+@pytest.fixture
+def profile():
+    return dict(get_engine_profile("development"), synchronous="full", busy_timeout_ms=1234, cache_size=-4096)
+
+
+def test_every_pooled_connection_gets_the_profile_pragmas(tmp_path, profile):
+    engine = build_engine(f"sqlite:///{tmp_path / 'pragmas.db'}", profile, name="pragma-test")
+    try:
+        # Two connections checked out together are two separate DBAPI connections
+        with engine.connect() as first, engine.connect() as second:
+            assert first.connection.dbapi_connection is not second.connection.dbapi_connection
+            for connection in (first, second):
+                def pragma(name):
+                    return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+                assert pragma("journal_mode") == "wal"
+                assert pragma("synchronous") == 2  # FULL
+                assert pragma("busy_timeout") == 1234
+                assert pragma("cache_size") == -4096
+    finally:
+        engine.dispose()
+        database.engines.pop("pragma-test", None)
+
+
+def test_async_session_dependency_queries_and_closes(tmp_path, profile, monkeypatch):
+    async_engine = build_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}", profile, name="async-test")
+    monkeypatch.setattr(database, "AsyncSessionLocal", async_sessionmaker(async_engine, class_=AsyncSession))
+    pool = async_engine.sync_engine.pool
+
+    async def scenario():
+        sessions = get_async_db()
+        db = await anext(sessions)
+        assert (await db.execute(text("SELECT sqlite_version()"))).scalar()
+        assert (await db.execute(text("PRAGMA busy_timeout"))).scalar() == 1234
+        assert db.in_transaction() and pool.checkedout() == 1
+
+        # Finishing the request closes the session and returns its connection
+        with pytest.raises(StopAsyncIteration):
+            await anext(sessions)
+        assert not db.in_transaction()
+        assert pool.checkedout() == 0
+        await async_engine.dispose()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        database.engines.pop("async-test", None)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for the sliding-window login throttle.
+"""
+import asyncio
+import sys
+
+import pytest
+
+sys.path.append('backend')
+
+from backend.app.core.rate_limit import (
+    LoginThrottle, _estimate, _retry_after, forwarded_client, parse_trusted_proxies
+)
+
+
+def test_email_is_throttled_after_limit_and_reset_on_success():
+    throttle = LoginThrottle(window=60, max_per_email=3, max_per_ip=0, backend="memory")
+
+    async def attempts(n):
+        return [await throttle.check("Someone@Example.com", "10.0.0.1") for _ in range(n)]
+
+    results = asyncio.run(attempts(4))
+    assert results[:3] == [None, None, None]
+    assert results[3] >= 1
+
+    asyncio.run(throttle.reset_email("someone@example.com"))
+    assert asyncio.run(throttle.check("someone@example.com", "10.0.0.1")) is None
+
+
+def test_ip_limit_spans_emails():
+    throttle = LoginThrottle(window=60, max_per_email=100, max_per_ip=2, backend="memory")
+
+    async def stuffing():
+        return [await throttle.check(f"user{i}@example.com", "10.0.0.2") for i in range(3)]
+
+    assert asyncio.run(stuffing())[-1] is not None
+
+
+def test_previous_window_decays():
+    # Halfway through the window, half of the previous window still counts
+    assert _estimate(previous=10, current=1, elapsed=30, window=60) == 6
+    # Waiting the returned time lets exactly one more attempt under the limit
+    wait = _retry_after(previous=10, current=1, elapsed=30, window=60, limit=5)
+    assert _estimate(10, 2, 30 + wait, 60) <= 5
+
+
+def test_client_is_right_most_untrusted_forwarded_hop():
+    proxies = parse_trusted_proxies("10.0.0.0/8, 127.0.0.1")
+    # Client-supplied hops left of the real client are ignored
+    assert forwarded_client("10.0.0.5", "6.6.6.6, 203.0.113.9, 10.0.0.7", proxies) == "203.0.113.9"
+    # Headers from an untrusted peer are ignored entirely
+    assert forwarded_client("198.51.100.1", "203.0.113.9", proxies) == "198.51.100.1"
+    assert forwarded_client("127.0.0.1", None, proxies) == "127.0.0.1"
+    assert forwarded_client("127.0.0.1", "10.0.0.9", proxies) == "10.0.0.9"
+    with pytest.raises(ValueError, match="TRUSTED_PROXIES"):
+        parse_trusted_proxies("10.0.0.0/33")
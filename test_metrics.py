@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus text rendering and request instrumentation labels.
+"""
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.append('backend')
+
+from backend.app.core.metrics import HTTP_REQUEST_DURATION, Counter, Histogram, MetricsRegistry
+from backend.app.core.middleware import UNMATCHED_ROUTE, RequestInstrumentationMiddleware
+
+
+def test_histogram_buckets_are_cumulative_and_end_with_inf():
+    registry = MetricsRegistry()
+    latency = registry.register(Histogram("latency_seconds", "Latency", ["route"], buckets=(0.1, 1.0)))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, route="/a")
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="1"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 3.65',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    errors = Counter("errors_total", "Errors", ["message"])
+    errors.inc(message='bad "quote"\\path\nnext')
+    assert errors.render()[-1] == 'errors_total{message="bad \\"quote\\"\\\\path\\nnext"} 1'
+
+
+def _samples(route: str, method: str, status: int) -> int:
+    prefix = f'{HTTP_REQUEST_DURATION.name}_count{{route="{route}",method="{method}",status="{status}"}} '
+    lines = [line for line in HTTP_REQUEST_DURATION.render() if line.startswith(prefix)]
+    return int(lines[0][len(prefix):]) if lines else 0
+
+
+def test_requests_are_labelled_by_route_template():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        return {"id": item_id}
+
+    app.add_middleware(RequestInstrumentationMiddleware)
+    client = TestClient(app)
+
+    before = _samples("/items/{item_id}", "GET", 200)
+    unmatched_before = _samples(UNMATCHED_ROUTE, "GET", 404)
+    for item_id in range(3):
+        assert client.get(f"/items/{item_id}").status_code == 200
+    assert client.get("/nowhere/12345").status_code == 404
+
+    # One series for all item ids, and unknown paths never become labels
+    assert _samples("/items/{item_id}", "GET", 200) == before + 3
+    assert _samples(UNMATCHED_ROUTE, "GET", 404) == unmatched_before + 1
+    rendered = "\n".join(HTTP_REQUEST_DURATION.render())
+    assert "/items/1" not in rendered and "/nowhere" not in rendered
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the versioned schema migrations.
+"""
+import sys
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, inspect
+
+sys.path.append('backend')
+
+from backend.app.db import leases, migrations
+from backend.app.db.leases import acquire_lease, process_leases, release_lease
+from backend.app.db.migrations import (
+    LATEST_VERSION, MIGRATIONS, Migration, apply_migration, get_applied_versions, get_schema_version,
+    run_startup_migrations, upgrade,
+)
+
+
+def wait_for_latest(engine, timeout=10):
+    deadline = time.monotonic() + timeout
+    while get_schema_version(engine) != LATEST_VERSION and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return get_schema_version(engine)
+
+
+@pytest.mark.parametrize("at_startup", [False, True])
+def test_hot_path_indexes_dedupe_rows_written_before_them(tmp_path, at_startup):
+    # At startup migration 2 runs in the background after the lesson counters exist
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}", connect_args={"timeout": 5})
+    apply_migration(MIGRATIONS[0], engine)
+    with engine.begin() as connection:
+        # A database from before migration 2: no unique indexes, duplicate rows
+        connection.exec_driver_sql("DROP INDEX ix_course_enrollments_user_course")
+        connection.exec_driver_sql("DROP INDEX ix_course_progress_enrollment_lesson")
+        connection.exec_driver_sql(
+            "INSERT INTO course_enrollments (id, user_id, course_id, status, progress_percentage) "
+            "VALUES (1, 1, 1, 'ACTIVE', 0), (2, 1, 1, 'ACTIVE', 0), (3, 2, 1, 'ACTIVE', 0)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO course_progress (id, enrollment_id, lesson_id, lesson_title, completed) "
+            "VALUES (1, 1, 'l1', 'L1', 1), (2, 2, 'l1', 'L1', 0), (3, 2, 'l2', 'L2', 1), (4, 3, 'l1', 'L1', 0)"
+        )
+
+    if at_startup:
+        run_startup_migrations(engine)
+        assert wait_for_latest(engine) == LATEST_VERSION
+    else:
+        assert upgrade(engine) == LATEST_VERSION
+
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT id FROM course_enrollments ORDER BY id").scalars().all() == [1, 3]
+        assert connection.exec_driver_sql(
+            "SELECT id, enrollment_id, lesson_id FROM course_progress ORDER BY id"
+        ).all() == [(1, 1, 'l1'), (3, 1, 'l2'), (4, 3, 'l1')]
+        assert connection.exec_driver_sql(
+            "SELECT total_lessons, completed_lessons FROM course_enrollments WHERE id = 1"
+        ).one() == (2, 2)
+    unique = {index["name"] for index in inspect(engine).get_indexes("course_progress") if index["unique"]}
+    assert "ix_course_progress_enrollment_lesson" in unique
+
+
+def test_lease_has_one_holder_until_it_expires(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'leases.db'}")
+    process_leases.create(bind=engine)
+
+    assert acquire_lease(engine, "job", 60, holder="a")
+    assert not acquire_lease(engine, "job", 60, holder="b")
+    assert acquire_lease(engine, "job", 60, holder="a")
+    release_lease(engine, "job", holder="a")
+    assert acquire_lease(engine, "job", -1, holder="b")
+    assert acquire_lease(engine, "job", 60, holder="a")
+
+
+def test_backfill_runs_in_one_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(migrations, "MIGRATION_LEASE_POLL_SECONDS", 0.05)
+    # Each thread stands in for a worker process
+    monkeypatch.setattr(leases, "lease_holder", lambda: f"worker-{threading.get_ident()}")
+    engine = create_engine(f"sqlite:///{tmp_path / 'workers.db'}", connect_args={"timeout": 5})
+    calls = []
+
+    def slow_backfill(target_engine):
+        calls.append(threading.get_ident())
+        time.sleep(0.3)
+
+    migration = Migration(99, "Slow backfill", lambda connection: None, backfill=slow_backfill)
+    results = []
+    workers = [
+        threading.Thread(target=lambda: results.append(apply_migration(migration, engine)))
+        for _ in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [False, False, True]
+
+
+def test_startup_serves_before_online_migrations_below_blocking_ones(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'v1.db'}", connect_args={"timeout": 5})
+    apply_migration(MIGRATIONS[0], engine)
+
+    hot_path = MIGRATIONS[1]
+    assert hot_path.online
+    release = threading.Event()
+    original = hot_path.upgrade
+
+    def held_upgrade(target_engine):
+        assert release.wait(10)
+        original(target_engine)
+
+    monkeypatch.setattr(hot_path, "upgrade", held_upgrade)
+
+    # Returns while migration 2 is still held, with every blocking migration applied
+    assert run_startup_migrations(engine) == 1
+    applied = get_applied_versions(engine)
+    assert hot_path.version not in applied
+    assert {m.version for m in MIGRATIONS if not m.online} <= applied
+
+    release.set()
+    assert wait_for_latest(engine) == LATEST_VERSION
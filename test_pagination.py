@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Tests for keyset pagination cursors.
+"""
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.append('backend')
+
+from backend.app.core.pagination import InvalidCursor, decode_cursor, encode_cursor, next_page
+
+
+def test_cursor_round_trip_and_kind_check():
+    key = (datetime(2024, 5, 1, 12, 30, 15, 250), 42)
+    cursor = encode_cursor("courses", key)
+    assert decode_cursor(cursor, "courses", (datetime, int)) == key
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "payments", (int,))
+    for garbage in ("", "abc", "!!!!", encode_cursor("courses", ("not a date", 1))):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(garbage, "courses", (datetime, int))
+
+
+def test_next_page_only_issues_cursor_when_more_rows_exist():
+    assert next_page([1, 2], 2, "users", lambda row: (row,)) == ([1, 2], None)
+    page, cursor = next_page([1, 2, 3], 2, "users", lambda row: (row,))
+    assert page == [1, 2] and decode_cursor(cursor, "users", (int,)) == (2,)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded password hash queue, run in the threadpool (no worker processes).
+"""
+import asyncio
+import json
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append('backend')
+
+from backend.app.core import security
+from backend.app.core.security import PasswordHasher, PasswordHashQueueFull
+
+
+@pytest.fixture
+def held(monkeypatch):
+    """
+    Make every hash block until the returned event is set
+    """
+    release = threading.Event()
+
+    def _held_operation(operation, *args):
+        assert release.wait(5)
+        return f"{operation}-done", 0.0
+
+    monkeypatch.setattr(security, "_timed_operation", _held_operation)
+    yield release
+    release.set()
+
+
+async def _until_in_flight(hasher, count):
+    while hasher._in_flight < count:
+        await asyncio.sleep(0.01)
+
+
+def test_full_queue_is_rejected_with_503(held):
+    from backend.app.main import app
+
+    async def scenario():
+        hasher = PasswordHasher(workers=0, max_queue=2)
+        running = [asyncio.create_task(hasher.hash("secret12")) for _ in range(2)]
+        await _until_in_flight(hasher, 2)
+        with pytest.raises(PasswordHashQueueFull) as raised:
+            await hasher.hash("secret12")
+        held.set()
+        assert await asyncio.gather(*running) == ["hash-done", "hash-done"]
+        return raised.value
+
+    error = asyncio.run(scenario())
+    handler = app.exception_handlers[PasswordHashQueueFull]
+    response = asyncio.run(handler(SimpleNamespace(url=SimpleNamespace(path="/api/v1/auth/login")), error))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert json.loads(response.body) == {"detail": "Server busy, please retry shortly"}
+
+
+def test_login_reserve_keeps_slots_for_other_hashing(held):
+    # Logins pass reserve=PASSWORD_HASH_LOGIN_RESERVE: once they fill their share,
+    # further logins are shed while registration and payment hashing still run
+    async def scenario():
+        hasher = PasswordHasher(workers=0, max_queue=3)
+        login = asyncio.create_task(hasher.verify("secret12", "hash", reserve=2))
+        await _until_in_flight(hasher, 1)
+        with pytest.raises(PasswordHashQueueFull):
+            await hasher.verify("secret12", "hash", reserve=2)
+
+        other = asyncio.create_task(hasher.hash("secret12"))
+        await _until_in_flight(hasher, 2)
+        held.set()
+        assert await asyncio.gather(login, other) == ["verify-done", "hash-done"]
+
+    asyncio.run(scenario())
+
+
+def test_slots_are_released_when_hashes_complete(held):
+    held.set()
+
+    async def scenario():
+        hasher = PasswordHasher(workers=0, max_queue=1)
+        for _ in range(3):
+            assert await hasher.hash("secret12") == "hash-done"
+        assert hasher._in_flight == 0
+        assert hasher.hash_sync("secret12") == "hash-done"
+        assert hasher._in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_slots_are_released_when_the_caller_cancels(held):
+    async def scenario():
+        hasher = PasswordHasher(workers=0, max_queue=1)
+        task = asyncio.create_task(hasher.hash("secret12"))
+        await _until_in_flight(hasher, 1)
+        task.cancel()
+        # The thread cannot be interrupted; the slot frees once its hash ends
+        held.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert hasher._in_flight == 0
+        assert await hasher.hash("secret12") == "hash-done"
+
+    asyncio.run(scenario())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental enrollment progress counters and their reconciliation.
+"""
+import sys
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+sys.path.append('backend')
+
+from backend.app.api.endpoints.courses import update_course_progress
+from backend.app.db.database import Base
+from backend.app.models.course import CourseEnrollment, CourseProgress, EnrollmentStatus
+from backend.app.schemas.course import CourseProgressUpdate
+from backend.app.services.progress import (
+    apply_progress_delta, completion_delta, ingest_progress_events, reconcile_progress_counters
+)
+
+
+def test_completion_delta_counts_only_flips():
+    assert completion_delta(None, False) == (1, 0)
+    assert completion_delta(None, True) == (1, 1)
+    assert completion_delta(False, True) == (0, 1)
+    assert completion_delta(True, False) == (0, -1)
+    assert completion_delta(True, True) == (0, 0)
+
+
+def test_deltas_and_reconciliation():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        enrollment = CourseEnrollment(user_id=1, course_id=1)
+        db.add(enrollment)
+        db.commit()
+
+        for lesson, done in (("l1", False), ("l2", True), ("l3", False)):
+            db.add(CourseProgress(enrollment_id=enrollment.id, lesson_id=lesson, lesson_title=lesson, completed=done))
+            apply_progress_delta(db, enrollment, *completion_delta(None, done))
+        db.commit()
+        assert (enrollment.total_lessons, enrollment.completed_lessons) == (3, 1)
+        assert round(enrollment.progress_percentage, 2) == 33.33
+        assert enrollment.status == EnrollmentStatus.ACTIVE
+
+        # Drift is repaired by recounting, and only drifted rows are touched
+        db.execute(CourseEnrollment.__table__.update().values(total_lessons=7, completed_lessons=0))
+        db.commit()
+    assert reconcile_progress_counters(engine, batch_size=1, pause_seconds=0) == 1
+    assert reconcile_progress_counters(engine, batch_size=1, pause_seconds=0) == 0
+
+    with Session(engine) as db:
+        enrollment = db.get(CourseEnrollment, 1)
+        assert (enrollment.total_lessons, enrollment.completed_lessons) == (3, 1)
+        apply_progress_delta(db, enrollment, 0, 2)
+        db.commit()
+        assert enrollment.progress_percentage == 100
+        assert enrollment.status == EnrollmentStatus.COMPLETED
+
+
+def test_ingest_progress_events_batches_per_enrollment():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        mine, other = CourseEnrollment(user_id=1, course_id=1), CourseEnrollment(user_id=2, course_id=1)
+        db.add_all([mine, other])
+        db.commit()
+
+        report = ingest_progress_events(db, 1, [
+            {"enrollment_id": mine.id, "lesson_id": "l1", "lesson_title": "L1"},
+            {"enrollment_id": mine.id, "lesson_id": "l1", "lesson_title": "L1", "completed": True},
+            {"enrollment_id": mine.id, "lesson_id": "l2", "lesson_title": "L2"},
+            {"enrollment_id": other.id, "lesson_id": "l1", "lesson_title": "L1"},
+            {"enrollment_id": mine.id, "lesson_id": "l3"},
+        ])
+        db.commit()
+
+        assert [r["status"] for r in report["results"]] == ["created", "updated", "created", "not_found", "invalid"]
+        assert report["enrollments"] == {mine.id: 50}
+        assert (mine.total_lessons, mine.completed_lessons) == (2, 1)
+        assert db.query(CourseProgress).count() == 2
+    assert reconcile_progress_counters(engine, pause_seconds=0) == 0
+
+
+def _race_first_writes(engine, db, times):
+    """
+    Insert the same lesson from another connection right before the session's next `times` flushes
+    """
+    remaining = [times]
+
+    @event.listens_for(db, "before_flush")
+    def _concurrent_insert(session, flush_context, instances):
+        if remaining[0]:
+            remaining[0] -= 1
+            with engine.begin() as connection:
+                connection.execute(CourseProgress.__table__.insert().values(
+                    enrollment_id=1, lesson_id="l1", lesson_title="L1", completed=False
+                ))
+
+
+def test_update_progress_retries_a_concurrent_first_write(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(CourseEnrollment(user_id=1, course_id=1))
+        db.commit()
+        _race_first_writes(engine, db, 1)
+
+        response = update_course_progress(
+            1, CourseProgressUpdate(lesson_id="l1", lesson_title="L1", completed=True), db, SimpleNamespace(id=1)
+        )
+        assert response["message"] == "Progress updated successfully"
+
+    with Session(engine) as db:
+        rows = db.query(CourseProgress).all()
+        assert [(row.lesson_id, row.completed) for row in rows] == [("l1", True)]
+
+
+def test_update_progress_conflicts_when_the_retry_races_again(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(CourseEnrollment(user_id=1, course_id=1))
+        db.commit()
+        # The competing row is gone again when the retry looks, then reappears before its insert
+        _race_first_writes(engine, db, 2)
+
+        @event.listens_for(db, "after_rollback")
+        def _concurrent_delete(session):
+            with engine.begin() as connection:
+                connection.execute(CourseProgress.__table__.delete())
+
+        with pytest.raises(HTTPException) as raised:
+            update_course_progress(
+                1, CourseProgressUpdate(lesson_id="l1", lesson_title="L1"), db, SimpleNamespace(id=1)
+            )
+        assert raised.value.status_code == 409
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-request query counter and the query_budget helper.
+"""
+import sys
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+sys.path.append('backend')
+
+from backend.app.db.database import Base
+from backend.app.db.query_stats import (
+    QueryBudgetExceeded, current_stats, instrument_engine, query_budget, track_request
+)
+from backend.app.models.course import Course
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def test_budget_counts_statements(engine):
+    with query_budget(2) as stats:
+        with Session(engine) as db:
+            db.execute(select(Course)).all()
+            db.execute(select(Course).where(Course.id == 1)).all()
+    assert stats.count == 2
+    assert stats.total_time > 0
+
+
+def test_budget_exceeded_reports_repeated_statements(engine):
+    with pytest.raises(QueryBudgetExceeded, match="repeated statements"):
+        with query_budget(2):
+            with Session(engine) as db:
+                for course_id in range(3):
+                    db.execute(select(Course).where(Course.id == course_id)).all()
+
+
+def test_request_stats_flag_repeated_statements(engine):
+    with track_request("GET /api/v1/users/profile/dashboard") as stats:
+        with Session(engine) as db:
+            for course_id in range(5):
+                db.execute(select(Course).where(Course.id == course_id)).all()
+    assert current_stats() is None
+    assert stats.count == 5
+    assert stats.repeated_statements(5)[0][1] == 5
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Query plan regression tests for the API hot paths.
+
+Each hot query is built the same way the endpoint builds it and run through
+SQLite's EXPLAIN QUERY PLAN against the schema defined by the models. A test
+fails if the plan falls back to a full table scan or a temp B-tree sort.
+"""
+import re
+import sys
+
+import pytest
+from sqlalchemy import and_, create_engine, select, func
+
+sys.path.append('backend')
+
+from backend.app.db.database import Base
+from backend.app.models.course import Course, CourseEnrollment, CourseProgress
+from backend.app.models.mentor import MentorBooking
+from backend.app.models.payment import Payment
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+@pytest.fixture(scope="module")
+def connection():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        yield conn
+    engine.dispose()
+
+
+def explain(connection, statement):
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").fetchall()
+    return [row[-1] for row in rows]
+
+
+def assert_indexed(plan, ordered=False):
+    scans = [step for step in plan if FULL_SCAN.match(step)]
+    assert not scans, f"full table scan in plan: {plan}"
+    if ordered:
+        sorts = [step for step in plan if "USE TEMP B-TREE" in step]
+        assert not sorts, f"temp B-tree sort in plan: {plan}"
+
+
+def test_get_courses_published_catalog(connection):
+    statement = (
+        select(Course)
+        .where(Course.status == "published")
+        .order_by(Course.created_at.desc())
+        .offset(0)
+        .limit(100)
+    )
+    assert_indexed(explain(connection, statement), ordered=True)
+
+
+def test_get_courses_level_filter(connection):
+    statement = (
+        select(Course)
+        .where(Course.status == "published", Course.level == "beginner")
+        .order_by(Course.created_at.desc())
+        .limit(100)
+    )
+    assert_indexed(explain(connection, statement), ordered=True)
+
+
+def test_enroll_existing_enrollment_check(connection):
+    statement = select(CourseEnrollment).where(
+        and_(CourseEnrollment.user_id == 1, CourseEnrollment.course_id == 2)
+    )
+    plan = explain(connection, statement)
+    assert_indexed(plan)
+    assert any("ix_course_enrollments_user_course" in step for step in plan), plan
+
+
+def test_update_progress_lesson_lookup(connection):
+    statement = select(CourseProgress).where(
+        and_(CourseProgress.enrollment_id == 1, CourseProgress.lesson_id == "lesson-1")
+    )
+    plan = explain(connection, statement)
+    assert_indexed(plan)
+    assert any("ix_course_progress_enrollment_lesson" in step for step in plan), plan
+
+
+def test_update_progress_lesson_counts(connection):
+    total = select(func.count()).select_from(CourseProgress).where(CourseProgress.enrollment_id == 1)
+    completed = select(func.count()).select_from(CourseProgress).where(
+        and_(CourseProgress.enrollment_id == 1, CourseProgress.completed == True)
+    )
+    assert_indexed(explain(connection, total))
+    assert_indexed(explain(connection, completed))
+
+
+def test_dashboard_enrollments(connection):
+    statement = (
+        select(CourseEnrollment)
+        .join(CourseEnrollment.course)
+        .where(CourseEnrollment.user_id == 1)
+    )
+    assert_indexed(explain(connection, statement))
+
+
+def test_dashboard_bookings(connection):
+    statement = select(MentorBooking).where(MentorBooking.user_id == 1)
+    assert_indexed(explain(connection, statement))
+
+
+def test_dashboard_completed_payments(connection):
+    statement = select(Payment).where(Payment.user_id == 1, Payment.status == "completed")
+    plan = explain(connection, statement)
+    assert_indexed(plan)
+    assert any("ix_payments_user_status" in step for step in plan), plan
+
+
+def test_mentor_schedule(connection):
+    statement = (
+        select(MentorBooking)
+        .where(MentorBooking.mentor_id == 1)
+        .order_by(MentorBooking.scheduled_date)
+    )
+    assert_indexed(explain(connection, statement), ordered=True)
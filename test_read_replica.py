@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for the read replica modes and read/write session routing.
+"""
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+sys.path.append('backend')
+
+from backend.app.core.config import settings
+from backend.app.db import database, replica
+from backend.app.db.replica import ReadReplica, get_routed_db
+
+
+@pytest.fixture
+def primary(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'primary.db'}"
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+    monkeypatch.setattr(settings, "READ_REPLICA_URL", None)
+    monkeypatch.setattr(settings, "READ_REPLICA_PATH", str(tmp_path / "replica.db"))
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("PRAGMA journal_mode = WAL")
+        connection.exec_driver_sql("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT)")
+        connection.exec_driver_sql("INSERT INTO notes (body) VALUES ('first')")
+    yield engine
+    engine.dispose()
+
+
+def notes(session):
+    with session:
+        return session.execute(text("SELECT body FROM notes ORDER BY id")).scalars().all()
+
+
+def test_readonly_replica_reads_the_primary_file_and_rejects_writes(primary):
+    read_replica = ReadReplica("readonly", max_staleness_seconds=15, refresh_seconds=5)
+    try:
+        assert read_replica.is_fresh()
+        with primary.begin() as connection:
+            connection.exec_driver_sql("INSERT INTO notes (body) VALUES ('second')")
+        # Same file under WAL: always current
+        assert notes(read_replica.session()) == ["first", "second"]
+
+        with read_replica.session() as session:
+            with pytest.raises(OperationalError, match="readonly"):
+                session.execute(text("INSERT INTO notes (body) VALUES ('nope')"))
+    finally:
+        read_replica.stop()
+
+
+def test_snapshot_replica_serves_the_last_copy(primary):
+    read_replica = ReadReplica("snapshot", max_staleness_seconds=15, refresh_seconds=5)
+    try:
+        # Nothing copied yet: reads go to the primary
+        assert not read_replica.is_fresh()
+        assert read_replica.session().get_bind() is database.engine
+
+        read_replica.refresh()
+        assert read_replica.is_fresh()
+        with primary.begin() as connection:
+            connection.exec_driver_sql("INSERT INTO notes (body) VALUES ('second')")
+        assert notes(read_replica.session()) == ["first"]
+
+        read_replica.refresh()
+        assert notes(read_replica.session()) == ["first", "second"]
+    finally:
+        read_replica.stop()
+
+
+def test_stale_snapshot_falls_back_to_the_primary(primary):
+    read_replica = ReadReplica("snapshot", max_staleness_seconds=15, refresh_seconds=5)
+    try:
+        read_replica.refresh()
+        assert read_replica.session().get_bind() is read_replica.engine
+
+        read_replica.refreshed_at = time.monotonic() - 60
+        assert not read_replica.is_fresh()
+        assert read_replica.session().get_bind() is database.engine
+    finally:
+        read_replica.stop()
+
+
+def test_refresh_interval_stretches_with_copy_time(primary):
+    read_replica = ReadReplica("snapshot", max_staleness_seconds=15, refresh_seconds=5, max_copy_share=0.1)
+    try:
+        read_replica.copy_seconds = 0.1
+        assert read_replica.next_interval() == 5
+        # A 2s copy may only take a tenth of the time: 20s apart
+        read_replica.copy_seconds = 2.0
+        assert read_replica.next_interval() == pytest.approx(20.0)
+        read_replica.max_copy_share = 0
+        assert read_replica.next_interval() == 5
+    finally:
+        read_replica.stop()
+
+
+def test_reads_route_to_the_replica_and_writes_to_the_primary(primary, monkeypatch):
+    read_replica = ReadReplica("readonly", max_staleness_seconds=15, refresh_seconds=5)
+    monkeypatch.setattr(replica, "read_replica", read_replica)
+    try:
+        for method, bind in (("GET", read_replica.engine), ("HEAD", read_replica.engine),
+                             ("POST", database.engine), ("PUT", database.engine), ("DELETE", database.engine)):
+            sessions = get_routed_db(SimpleNamespace(method=method))
+            assert next(sessions).get_bind() is bind, method
+            sessions.close()
+    finally:
+        read_replica.stop()
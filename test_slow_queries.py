@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the slow query recorder.
+"""
+import sys
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+sys.path.append('backend')
+
+from backend.app.db import query_stats
+from backend.app.db.database import Base
+from backend.app.db.query_stats import instrument_engine, track_request
+from backend.app.db.slow_queries import SlowQueryRecorder, redact_parameters
+from backend.app.models.user import User
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def record_with(monkeypatch, threshold_ms):
+    recorder = SlowQueryRecorder(threshold_ms=threshold_ms, buffer_size=10, log_path=None)
+    monkeypatch.setattr(query_stats, "_statement_listeners", [recorder.on_statement])
+    return recorder
+
+
+def test_only_statements_over_the_threshold_are_recorded(engine, monkeypatch):
+    recorder = record_with(monkeypatch, threshold_ms=60_000)
+    with Session(engine) as db:
+        db.execute(select(User)).all()
+    assert recorder.recent() == []
+
+    recorder = record_with(monkeypatch, threshold_ms=0)
+    with Session(engine) as db:
+        db.execute(select(User)).all()
+    assert [entry["statement"].split()[0] for entry in recorder.recent()] == ["SELECT"]
+
+
+def test_parameters_are_redacted():
+    assert redact_parameters({"email": "a@x.com", "id": 7, "active": True, "bio": None}) == {
+        "email": "<str len=7>", "id": 7, "active": True, "bio": None
+    }
+    assert redact_parameters((b"\x00\x01", datetime(2025, 1, 1), 1.5, object())) == [
+        "<bytes len=2>", "2025-01-01T00:00:00", 1.5, "<object>"
+    ]
+
+
+def test_entries_carry_redacted_parameters_and_the_query_plan(engine, monkeypatch):
+    recorder = record_with(monkeypatch, threshold_ms=0)
+    with track_request("GET /api/v1/users/{user_id}"):
+        with Session(engine) as db:
+            db.execute(select(User).where(User.email == "secret@x.com", User.id == 3)).all()
+
+    entry, = recorder.recent()
+    assert entry["route"] == "GET /api/v1/users/{user_id}"
+    assert "secret@x.com" not in str(entry["parameters"])
+    assert "<str len=12>" in entry["parameters"] and 3 in entry["parameters"]
+    assert entry["executemany"] is False
+    assert any(step.startswith(("SEARCH", "SCAN")) for step in entry["query_plan"])
+
+
+def test_explain_is_kept_out_of_request_counts(engine, monkeypatch):
+    recorder = record_with(monkeypatch, threshold_ms=0)
+    with track_request("GET /courses") as stats:
+        with Session(engine) as db:
+            db.execute(select(User)).all()
+
+    # One statement for the request and the log, although EXPLAIN ran too
+    assert stats.count == 1
+    assert not any("EXPLAIN" in statement for statement in stats.statements)
+    assert len(recorder.recent()) == 1
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the verified-token cache and self-contained token claims.
+"""
+import hashlib
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append('backend')
+
+from backend.app.core.security import (
+    TokenRevocations, VerifiedTokenCache, create_access_token, decode_token, token_cache, verify_token
+)
+from backend.app.models.user import UserRole, UserStatus
+
+
+def test_valid_token_is_cached_and_forged_token_is_not():
+    token_cache.clear()
+    token = create_access_token(subject="7")
+    assert verify_token(token) == "7"
+    assert len(token_cache) == 1
+
+    forged = token[:-2] + ("AA" if token[-2:] != "AA" else "BB")
+    assert verify_token(forged) is None
+    assert len(token_cache) == 1
+
+
+def test_entry_is_dropped_at_exp():
+    cache = VerifiedTokenCache(max_entries=10)
+    digest = hashlib.sha256(b"token").digest()
+    cache.put(digest, {"sub": "1", "exp": time.time() + 0.01})
+    assert cache.get(digest)["sub"] == "1"
+    time.sleep(0.02)
+    assert cache.get(digest) is None
+
+
+def test_expired_token_is_rejected():
+    token = create_access_token(subject="7", expires_delta=timedelta(seconds=-1))
+    assert decode_token(token) is None
+
+
+def test_cache_is_bounded():
+    cache = VerifiedTokenCache(max_entries=2)
+    for n in range(3):
+        cache.put(bytes([n]), {"sub": str(n), "exp": time.time() + 60})
+    assert len(cache) == 2
+    assert cache.get(bytes([0])) is None
+
+
+def test_token_carries_authorization_claims():
+    token = create_access_token(subject="7", role=UserRole.ADMIN, status=UserStatus.ACTIVE, token_version=3)
+    payload = decode_token(token)
+    assert (payload["role"], payload["status"], payload["ver"]) == ("admin", "active", 3)
+
+
+def test_revocations_only_move_forward():
+    revocations = TokenRevocations()
+    revocations.revoke(7, 2)
+    revocations.load([(7, 1), (8, 1)])
+
+    assert revocations.is_revoked(7, 1)
+    assert not revocations.is_revoked(7, 2)
+    assert revocations.is_revoked(8, 0)
+    assert not revocations.is_revoked(9, 0)
+
+
+def test_deleted_user_tokens_stay_revoked_until_they_expire():
+    revocations = TokenRevocations()
+    deleted_at = datetime(2026, 1, 1, 12, 0, 0)
+    revocations.load_deleted([(7, deleted_at)], expired_before=deleted_at - timedelta(minutes=30))
+    issued = int((deleted_at - datetime(1970, 1, 1)).total_seconds())
+
+    assert revocations.is_revoked(7, 0, issued - 60)
+    assert revocations.is_revoked(7, 0, None)
+    # A new user reusing the id logs in after the deletion
+    assert not revocations.is_revoked(7, 0, issued + 1)
+
+    revocations.load_deleted([], expired_before=deleted_at + timedelta(minutes=1))
+    assert not revocations.is_revoked(7, 0, issued - 60)
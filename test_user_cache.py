@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the authenticated-user cache.
+"""
+import sys
+import time
+
+import pytest
+
+sys.path.append('backend')
+
+from backend.app.core.user_cache import UserCache, UserSnapshot
+
+
+def snapshot(user_id, **fields):
+    return UserSnapshot(id=user_id, email=f"user{user_id}@example.com", role="student", status="active", **fields)
+
+
+def test_hit_after_put_and_miss_after_invalidate():
+    cache = UserCache(ttl_seconds=60, max_entries=10)
+    _, generation = cache.get(1)
+    cache.put(snapshot(1), generation)
+
+    cached, _ = cache.get(1)
+    assert cached.email == "user1@example.com"
+
+    cache.invalidate(1)
+    assert cache.get(1)[0] is None
+
+
+def test_entries_expire():
+    cache = UserCache(ttl_seconds=0.01, max_entries=10)
+    cache.put(snapshot(1), cache.get(1)[1])
+    time.sleep(0.02)
+    assert cache.get(1)[0] is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = UserCache(ttl_seconds=60, max_entries=2)
+    for user_id in (1, 2):
+        cache.put(snapshot(user_id), cache.get(user_id)[1])
+    cache.get(1)
+    cache.put(snapshot(3), cache.get(3)[1])
+
+    assert cache.get(2)[0] is None
+    assert cache.get(1)[0] is not None
+    assert len(cache) == 2
+
+
+def test_miss_racing_an_invalidation_is_not_stored():
+    cache = UserCache(ttl_seconds=60, max_entries=10)
+    _, generation = cache.get(1)
+    # The row is updated while the miss is still loading the old version
+    cache.invalidate(1)
+    cache.put(snapshot(1, full_name="Stale"), generation)
+    assert cache.get(1)[0] is None
+
+
+def test_snapshot_is_read_only():
+    with pytest.raises(AttributeError):
+        snapshot(1).role = "admin"
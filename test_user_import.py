@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for parsing and validating bulk user import files.
+"""
+import asyncio
+import io
+import sys
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+sys.path.append('backend')
+
+from backend.app.db.database import Base
+from backend.app.models.user import User
+from backend.app.core.config import settings
+from backend.app.models.user import UserImportJob
+from backend.app.services import user_import
+from backend.app.services.user_import import (
+    ImportFormatError, UserImporter, detect_format, get_import_job, iter_rows, run_import_job
+)
+
+
+def test_detect_format_prefers_explicit_then_extension():
+    assert detect_format("people.txt", "text/plain", "csv") == "csv"
+    assert detect_format("people.ndjson", "application/octet-stream", None) == "ndjson"
+    assert detect_format("export", "text/csv", None) == "csv"
+    with pytest.raises(ImportFormatError):
+        detect_format("people.xlsx", "application/octet-stream", None)
+
+
+def test_iter_rows_reports_line_numbers_and_parse_errors():
+    csv_rows = list(iter_rows(
+        io.BytesIO(b"\xef\xbb\xbfemail,username,full_name,password\na@x.com,aaa,A,secret12\nb@x.com,,,\n"), "csv"
+    ))
+    assert csv_rows == [
+        (2, {"email": "a@x.com", "username": "aaa", "full_name": "A", "password": "secret12"}),
+        (3, {"email": "b@x.com"}),
+    ]
+    with pytest.raises(ImportFormatError, match="missing full_name, password"):
+        list(iter_rows(io.BytesIO(b"email,username\na@x.com,aaa\n"), "csv"))
+
+    ndjson_rows = list(iter_rows(io.BytesIO(b'{"email": "a@x.com"}\n\n{broken\n'), "ndjson"))
+    assert ndjson_rows[0] == (1, {"email": "a@x.com"})
+    assert ndjson_rows[1][0] == 3 and isinstance(ndjson_rows[1][1], ValueError)
+
+
+def test_validation_flags_invalid_rows_and_in_file_duplicates():
+    importer = UserImporter(None, batch_size=10, max_rows=10, hash_concurrency=1)
+    row = {"email": "new@x.com", "username": "newbie", "full_name": "New", "password": "secret12"}
+
+    user, failure = importer._validate(2, row)
+    assert user is not None and failure is None
+    _, failure = importer._validate(3, {**row, "email": "NEW@x.com", "username": "other"})
+    assert failure["status"] == "duplicate"
+    _, failure = importer._validate(4, {**row, "password": "123"})
+    assert failure["status"] == "invalid" and failure["errors"][0].startswith("password")
+    assert importer.totals["duplicate"] == 1 and importer.totals["invalid"] == 1
+
+
+def test_existing_users_match_case_insensitively(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert().values(
+            email="Foo@x.com", username="FooBar", full_name="Foo", hashed_password="x", role="STUDENT", status="ACTIVE"
+        ))
+
+    importer = UserImporter(create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'users.db'}"),
+                            batch_size=10, max_rows=10, hash_concurrency=1)
+    user, _ = importer._validate(2, {"email": "foo@X.com", "username": "foobar", "full_name": "F", "password": "secret12"})
+    emails, usernames = asyncio.run(importer._existing([user]))
+    assert user.email.lower() in emails and user.username.lower() in usernames
+
+
+class FakeHasher:
+    async def hash(self, password):
+        return f"hashed-{password}"
+
+
+def test_failed_job_keeps_the_report_of_rows_already_imported(tmp_path, monkeypatch):
+    monkeypatch.setattr(user_import, "password_hasher", FakeHasher())
+    monkeypatch.setattr(settings, "USER_IMPORT_BATCH_SIZE", 1)
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(UserImportJob.__table__.insert().values(
+            id="job", status="queued", file_format="csv", totals="{}",
+            created_at=datetime.utcnow(), updated_at=datetime.utcnow(),
+        ))
+
+    upload = tmp_path / "users.csv"
+    valid = "".join(f"user{i}@x.com,user{i},User {i},secret12\n" for i in range(20))
+    upload.write_bytes(b"email,username,full_name,password\n" + valid.encode() + b"bad\xff@x.com,bad,Bad,secret12\n")
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'users.db'}")
+    asyncio.run(run_import_job(async_engine, "job", str(upload), "csv"))
+    job = asyncio.run(get_import_job(async_engine, "job"))
+
+    assert job["status"] == "failed" and "utf-8" in job["error"]
+    assert job["totals"]["created"] > 0
+    created = [row for row in job["rows"] if row["status"] == "created"]
+    assert len(created) == job["totals"]["created"]
+    assert created[0]["email"] == "user0@x.com"
+    assert not upload.exists()
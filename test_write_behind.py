@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the write-behind last_login buffer.
+"""
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.exc import OperationalError
+
+sys.path.append('backend')
+
+from backend.app.db.database import Base
+from backend.app.db.write_behind import LastLoginBuffer
+from backend.app.models.user import User
+
+T0 = datetime(2025, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for user_id in (1, 2):
+            connection.execute(User.__table__.insert().values(
+                id=user_id, email=f"u{user_id}@x.com", username=f"user{user_id}", full_name="U",
+                hashed_password="x", role="STUDENT", status="ACTIVE",
+            ))
+    yield engine
+    engine.dispose()
+
+
+def last_logins(engine):
+    with engine.connect() as connection:
+        return dict(connection.execute(select(User.id, User.last_login).order_by(User.id)).all())
+
+
+def test_latest_timestamp_per_user_wins(engine):
+    buffer = LastLoginBuffer()
+    buffer.record(1, T0 + timedelta(seconds=5))
+    buffer.record(1, T0)
+    buffer.record(2, T0)
+    buffer.record(2, T0 + timedelta(seconds=9))
+    assert len(buffer) == 2
+
+    assert buffer.flush(engine) == 2
+    assert len(buffer) == 0
+    assert last_logins(engine) == {1: T0 + timedelta(seconds=5), 2: T0 + timedelta(seconds=9)}
+    assert buffer.flush(engine) == 0
+
+
+def test_flush_never_moves_last_login_backwards(engine):
+    # Another worker already flushed a newer login for user 1
+    with engine.begin() as connection:
+        connection.execute(User.__table__.update().where(User.id == 1).values(last_login=T0 + timedelta(minutes=1)))
+
+    buffer = LastLoginBuffer()
+    buffer.record(1, T0)
+    buffer.record(2, T0)
+    buffer.flush(engine)
+    assert last_logins(engine) == {1: T0 + timedelta(minutes=1), 2: T0}
+
+
+def test_failed_flush_requeues_without_overwriting_newer_logins(engine):
+    buffer = LastLoginBuffer()
+    buffer.record(1, T0)
+    buffer.record(2, T0 + timedelta(seconds=3))
+
+    def fail_once(conn, cursor, statement, parameters, context, executemany):
+        event.remove(engine, "before_cursor_execute", fail_once)
+        # A login arrives while the batch is out, then the write fails
+        buffer.record(1, T0 + timedelta(seconds=30))
+        raise OperationalError(statement, parameters, Exception("database is locked"))
+
+    event.listen(engine, "before_cursor_execute", fail_once)
+    with pytest.raises(OperationalError):
+        buffer.flush(engine)
+    assert last_logins(engine) == {1: None, 2: None}
+    assert len(buffer) == 2
+
+    assert buffer.flush(engine) == 2
+    assert last_logins(engine) == {1: T0 + timedelta(seconds=30), 2: T0 + timedelta(seconds=3)}